@@ -1,16 +1,15 @@
-from nltk.stem import WordNetLemmatizer
-from nltk.corpus import stopwords
-import nltk
+import os
+import sys
 import json
 from sortedcontainers import SortedSet
 import time
 from memory_profiler import memory_usage
 
-# nltk.download("wordnet")
-# nltk.download("stopwords")
+# the analyzer shared with IR_Project; this assignment keeps non-alphabetic words
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "IR_Project"))
+from analyzer import get_analyzer
 
-lemmatizer = WordNetLemmatizer()
-stop_words = set(stopwords.words("english"))
+analyzer = get_analyzer(alpha_only=False)
 
 OPERATORS = {'AND', 'OR', 'NOT'}
 
@@ -26,11 +25,7 @@ def preprocesing(input_data_path, output_index_path):
     i = 1
 
     for obj in data:
-        words = obj["Abstract"].lower().split()  
-        processed_words = [
-            lemmatizer.lemmatize(word, pos="v")  
-            for word in words if word not in stop_words  
-        ]
+        processed_words = analyzer.analyze(obj["Abstract"])
         for word in processed_words:
             if word not in inverted_index:
                 inverted_index[word] = SortedSet([i])
@@ -53,10 +48,7 @@ def preprocesing(input_data_path, output_index_path):
 
 
 def preprocess_term(term):
-    term = term.lower()
-    if term not in stop_words:
-        return lemmatizer.lemmatize(term, pos="v")
-    return ""
+    return analyzer.analyze_term(term)
 
 
 def evaluate_query(query, inverted_index, all_docs):
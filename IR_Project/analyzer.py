@@ -0,0 +1,152 @@
+'''
+The text analyzer shared by indexing and querying: lowercase, split on whitespace, drop stopwords (and, by
+default, non-alphabetic tokens), lemmatize as verbs with WordNet.
+
+Lemmas are memoized per surface form in a bounded cache, which can be persisted between runs. NLTK data is read
+from a local directory only (NLTK_DATA_DIR, default IR_Project/nltk_data) and nothing is downloaded at import.
+Fetch it once with:
+python analyzer.py --download
+'''
+import os
+import json
+import gzip
+import argparse
+import threading
+from typing import Dict, List, Optional
+
+NLTK_DATA_DIR = os.environ.get("NLTK_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "nltk_data"))
+NLTK_RESOURCES = ["stopwords", "wordnet", "omw-1.4"]
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lemma_cache.json.gz")
+CACHE_VERSION = 1
+
+
+def download_resources(data_dir: str = NLTK_DATA_DIR) -> None:
+    import nltk
+    os.makedirs(data_dir, exist_ok=True)
+    for resource in NLTK_RESOURCES:
+        nltk.download(resource, download_dir=data_dir)
+
+def _load_nltk():
+    # the only place NLTK data is touched; the local directory goes first so no other location is needed
+    import nltk
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+    from nltk.corpus import stopwords
+    from nltk.stem import WordNetLemmatizer
+    try:
+        stop_words = set(stopwords.words("english"))
+        lemmatizer = WordNetLemmatizer()
+        lemmatizer.lemmatize("warm", pos="v")  # loads wordnet now instead of on the first real token
+    except LookupError as e:
+        raise LookupError(f"NLTK data not found in {NLTK_DATA_DIR}, run `python analyzer.py --download` once") from e
+    return stop_words, lemmatizer
+
+
+class Analyzer:
+    """
+    Maps surface forms to index terms. Every distinct word is lemmatized once; after that a token costs a dict
+    lookup. The cache holds up to max_entries surface forms, dropping the oldest entries first when full.
+    """
+
+    def __init__(self, alpha_only: bool = True, max_entries: int = 200_000, cache_path: Optional[str] = None):
+        self.alpha_only = alpha_only
+        self.max_entries = max_entries
+        self.cache_path = cache_path
+        self.lemmas: Dict[str, str] = {}  # surface form -> term, "" for dropped words
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.stop_words = None
+        self.lemmatizer = None
+        if cache_path and os.path.exists(cache_path):
+            self.load(cache_path)
+
+    def _term(self, word: str) -> str:
+        # cache miss: the actual analysis of one lowercased word
+        with self.lock:
+            if self.lemmatizer is None:
+                self.stop_words, self.lemmatizer = _load_nltk()
+            self.misses += 1
+            if (self.alpha_only and not word.isalpha()) or word in self.stop_words:
+                term = ""
+            else:
+                term = self.lemmatizer.lemmatize(word, pos="v")
+            if len(self.lemmas) >= self.max_entries:
+                del self.lemmas[next(iter(self.lemmas))]
+            self.lemmas[word] = term
+        return term
+
+    def analyze(self, text: str) -> List[str]:
+        lemmas = self.lemmas
+        terms = []
+        for word in text.lower().split():
+            term = lemmas.get(word)
+            if term is None:
+                term = self._term(word)
+            else:
+                self.hits += 1
+            if term:
+                terms.append(term)
+        return terms
+
+    def analyze_term(self, word: str) -> str:
+        """The index term for a single query word, "" when the analyzer drops it."""
+        word = word.lower()
+        term = self.lemmas.get(word)
+        return self._term(word) if term is None else term
+
+    def merge(self, lemmas) -> None:
+        """Adds (surface form, term) pairs analyzed elsewhere, e.g. by index build workers."""
+        with self.lock:
+            for word, term in lemmas:
+                if word in self.lemmas:
+                    continue
+                if len(self.lemmas) >= self.max_entries:
+                    del self.lemmas[next(iter(self.lemmas))]
+                self.lemmas[word] = term
+
+    def load(self, path: str) -> None:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable lemma cache {path}: {e}")
+            return
+        if data.get("version") == CACHE_VERSION and data.get("alpha_only") == self.alpha_only:
+            self.lemmas.update(list(data["lemmas"].items())[-self.max_entries:])
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.cache_path
+        if not path:
+            return
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "alpha_only": self.alpha_only, "lemmas": self.lemmas}, f)
+        os.replace(tmp_path, path)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self.lemmas), "hits": self.hits, "misses": self.misses}
+
+
+_analyzers: Dict[bool, Analyzer] = {}
+_analyzers_lock = threading.Lock()
+
+
+def get_analyzer(alpha_only: bool = True) -> Analyzer:
+    """Process-wide analyzer, memo cache loaded from DEFAULT_CACHE_PATH when one was saved (alpha_only only)."""
+    with _analyzers_lock:
+        if alpha_only not in _analyzers:
+            _analyzers[alpha_only] = Analyzer(alpha_only, cache_path=DEFAULT_CACHE_PATH if alpha_only else None)
+    return _analyzers[alpha_only]
+
+def tokenize(text: str) -> List[str]:
+    """Index terms of text, the same at index and query time."""
+    return get_analyzer().analyze(text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--download", action="store_true", help=f"fetch {', '.join(NLTK_RESOURCES)} into {NLTK_DATA_DIR}")
+    args = parser.parse_args()
+    if args.download:
+        download_resources()
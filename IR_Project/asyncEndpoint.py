@@ -0,0 +1,76 @@
+'''
+Async version of endpoint.py (same routes) for serving many chat requests at once.
+Requests are coroutines on one event loop instead of one thread each, and every embedding/completion call
+goes through one pooled AsyncOpenAI client per process (openaiClients.py), so connections are reused.
+
+to run:
+hypercorn asyncEndpoint:app --bind 0.0.0.0:5000
+(several processes: add --workers 4, each loads its own memory-mapped retriever)
+'''
+import os
+import json
+import time
+from quart import Quart, request, jsonify, Response
+from query import query_async, query_stream_async, user_query_text
+from retriever import FaissRetriever
+from embeddingCache import get_default_cache
+from openaiClients import close_async_clients
+
+app = Quart(__name__)
+
+api_key = os.environ.get("OPENAI_API_KEY", "")
+
+# loaded once per process at startup, every request is served from memory
+retriever = FaissRetriever("vector_index4.faiss", "chunks_metadata4.pkl")
+print(f"Retriever loaded: {retriever.stats()}")
+
+@app.after_request
+async def allow_cors(response):
+    # the React dev server runs on another origin (flask_cors does this for endpoint.py)
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+    return response
+
+@app.after_serving
+async def shutdown():
+    await close_async_clients()
+
+@app.route("/respond", methods=['POST'])
+async def respond():
+    data = await request.get_json(force=True)
+    userQuery = user_query_text(data.get('message'))
+    return await query_async(userQuery, api_key, retriever=retriever)
+
+def sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.route("/respond/stream", methods=['POST'])
+async def respond_stream():
+    '''Same events as endpoint.respond_stream: "token" events, then "done" with ttft_ms/total_ms.'''
+    data = await request.get_json(force=True)
+    userQuery = user_query_text(data.get('message'))
+    start = time.perf_counter()
+
+    async def generate():
+        first_token_ms = None
+        try:
+            async for text in query_stream_async(userQuery, api_key, retriever=retriever):
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - start) * 1000
+                yield sse("token", {"text": text})
+        except Exception as e:
+            print("Error during streaming:", e)
+            yield sse("error", {"message": str(e)})
+        timings = {"ttft_ms": round(first_token_ms, 1) if first_token_ms is not None else None, "total_ms": round((time.perf_counter() - start) * 1000, 1)}
+        yield sse("done", timings)
+
+    response = Response(generate(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.timeout = None # a long answer must not be cut off by the default response timeout
+    return response
+
+@app.route("/stats", methods=['GET'])
+async def stats():
+    return jsonify({**retriever.stats(), "embedding_cache": get_default_cache().stats()})
+
+if __name__ == '__main__':
+    app.run()
@@ -0,0 +1,64 @@
+'''
+Analyzer throughput (tokens/sec) on the full PDF corpus: the old per-occurrence analysis (WordNet lemmatize
+called for every token) against the shared memoized analyzer with an empty cache and with a cache persisted
+by a previous run. Checks that all three produce the same terms. Needs the NLTK data (python analyzer.py --download).
+
+to run:
+python benchmarkAnalyzer.py --pdf_dir pdfs --repeats 3
+'''
+import os
+import time
+import argparse
+import tempfile
+from analyzer import Analyzer, _load_nltk
+from pdfExtraction import extract_contents
+
+
+def per_token(texts, stop_words, lemmatizer):
+    # what booleanRetrievalNew.tokenize did before analyzer.py
+    return [[lemmatizer.lemmatize(word, pos="v") for word in text.lower().split() if word.isalpha() and word not in stop_words] for text in texts]
+
+def best_seconds(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def run_benchmark(pdf_dir, repeats):
+    pdf_paths = [os.path.join(pdf_dir, name) for name in sorted(os.listdir(pdf_dir)) if name.endswith(".pdf")]
+    texts = list(extract_contents(pdf_paths, table_format="marked").values())
+    num_tokens = sum(len(text.split()) for text in texts)
+    print(f"{len(pdf_paths)} PDFs, {num_tokens} whitespace tokens")
+
+    stop_words, lemmatizer = _load_nltk()
+    expected, before = best_seconds(lambda: per_token(texts, stop_words, lemmatizer), repeats)
+
+    # a fresh analyzer per run, so every repeat starts from an empty cache
+    cold_analyzers = []
+    def cold():
+        analyzer = Analyzer()
+        cold_analyzers.append(analyzer)
+        return [analyzer.analyze(text) for text in texts]
+    cold_terms, cold_seconds = best_seconds(cold, repeats)
+
+    cache_path = os.path.join(tempfile.mkdtemp(), "lemma_cache.json.gz")
+    cold_analyzers[-1].save(cache_path)
+    warm_analyzer = Analyzer(cache_path=cache_path)
+    warm_terms, warm_seconds = best_seconds(lambda: [warm_analyzer.analyze(text) for text in texts], repeats)
+    assert cold_terms == expected and warm_terms == expected, "analyzer output differs from per-token lemmatization"
+
+    stats = cold_analyzers[-1].stats()
+    print(f"{stats['entries']} distinct surface forms, {stats['misses']} lemmatized, {stats['hits']} from cache")
+    print(f"{'analysis':<28} {'seconds':>8} {'tokens/sec':>12}")
+    for name, seconds in [("per token (before)", before), ("memoized, empty cache", cold_seconds), ("memoized, persisted cache", warm_seconds)]:
+        print(f"{name:<28} {seconds:>8.3f} {num_tokens / seconds:>12,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdf_dir", default="pdfs")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.pdf_dir, args.repeats)
@@ -0,0 +1,86 @@
+'''
+Boolean queries over dense terms (the "student" / "phd" / "leave" kind, present in a large share of all chunks)
+as the chunk count grows: Python sets, sorted doc id arrays only, and the hybrid store where terms above
+bitmapPostings.DENSE_FRACTION are bitmaps. Also prints the memory of the dense posting lists in both shapes.
+Posting lists are synthetic so the chunk count can go well past the current index.
+
+to run:
+python benchmarkBitmaps.py --docs 10000 100000 1000000 --repeats 5
+'''
+import time
+import random
+import argparse
+from array import array
+from types import SimpleNamespace
+from bitmapPostings import Bitmap, is_dense
+from booleanQueryNew import tokenize_query, infix_to_postfix, evaluate_postfix
+
+# fraction of chunks containing each synthetic term
+TERM_DENSITIES = {"student": 0.4, "phd": 0.2, "leave": 0.1, "thesis": 0.005}
+
+QUERIES = [
+    "student && phd",
+    "student || phd || leave",
+    "phd && ~student",
+    "~leave",
+    "(student || leave) && phd && ~thesis",
+    "thesis && student",
+]
+
+
+def synthetic_indexes(num_docs, rng):
+    postings = {
+        term: array('i', sorted(rng.sample(range(num_docs), max(1, int(num_docs * density)))))
+        for term, density in TERM_DENSITIES.items()
+    }
+    bitmaps = {term: Bitmap.from_docs(docs, num_docs) for term, docs in postings.items() if is_dense(len(docs), num_docs)}
+    lookup = lambda term: postings.get(term, array('i'))
+    arrays_only = SimpleNamespace(num_docs=num_docs, boolean_postings=lookup)
+    hybrid = SimpleNamespace(num_docs=num_docs, boolean_postings=lambda term: bitmaps.get(term) or lookup(term))
+    return postings, bitmaps, arrays_only, hybrid
+
+def evaluate_with_sets(postfix, postings, num_docs):
+    stack = []
+    for token in postfix:
+        if token == 'AND':
+            op2, op1 = stack.pop(), stack.pop()
+            stack.append(op1 & op2)
+        elif token == 'OR':
+            op2, op1 = stack.pop(), stack.pop()
+            stack.append(op1 | op2)
+        elif token == 'NOT':
+            stack.append(set(range(num_docs)) - stack.pop())
+        else:
+            stack.append(set(postings.get(token, ())))
+    return sorted(stack[0]) if stack else []
+
+def best_ms(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+def run_benchmark(doc_counts, repeats):
+    for num_docs in doc_counts:
+        postings, bitmaps, arrays_only, hybrid = synthetic_indexes(num_docs, random.Random(0))
+        array_kb = sum(len(postings[term]) * 4 for term in bitmaps) / 1024
+        bitmap_kb = sum(bitmap.words.nbytes for bitmap in bitmaps.values()) / 1024
+        print(f"\n{num_docs} chunks, dense terms {sorted(bitmaps)}: {array_kb:.0f} KB as arrays, {bitmap_kb:.0f} KB as bitmaps")
+        print(f"{'query':<40} {'sets ms':>9} {'arrays ms':>10} {'hybrid ms':>10} {'vs sets':>8} {'hits':>8}")
+        for query in QUERIES:
+            postfix = infix_to_postfix(tokenize_query(query))
+            expected, sets_ms = best_ms(lambda: evaluate_with_sets(postfix, postings, num_docs), repeats)
+            sorted_result, arrays_ms = best_ms(lambda: evaluate_postfix(postfix, arrays_only, None), repeats)
+            result, hybrid_ms = best_ms(lambda: evaluate_postfix(postfix, hybrid, None), repeats)
+            assert list(sorted_result) == expected and list(result) == expected, f"results differ for {query!r}"
+            print(f"{query:<40} {sets_ms:>9.2f} {arrays_ms:>10.2f} {hybrid_ms:>10.2f} {sets_ms / max(hybrid_ms, 1e-6):>7.1f}x {len(result):>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    run_benchmark(args.docs, args.repeats)
@@ -0,0 +1,148 @@
+'''
+Size and load time of the chunk boolean index as JSON (chunk_boolean_index.json, string chunk ids) versus the
+compact binary index (chunk_index.bin, dense integer ids with delta+varint postings), plus the time of the
+same boolean queries on both representations. Checks that both return the same chunks.
+Startup compares parsing chunk_boolean_index.json + chunk_id_table.json against memory-mapping chunk_index.bin +
+chunk_texts.chunks; --scale repeats the startup and first-query timing on synthetic indexes of growing size.
+
+to run (defaults to the shipped index in BooleanRetrievalModel/):
+python benchmarkBooleanIndex.py --index_dir BooleanRetrievalModel --repeats 20
+python benchmarkBooleanIndex.py --scale 10000 100000
+'''
+import os
+import json
+import time
+import argparse
+import random
+import tempfile
+from compactIndex import CompactIndex
+from chunkStore import ChunkStore, write_chunk_store
+from booleanQueryNew import tokenize_query, infix_to_postfix, evaluate_postfix
+
+QUERIES = [
+    "leave && casual",
+    "phd || thesis || supervisor",
+    "drc && (examination || qualify) && ~fee",
+    "travel && grant && international",
+]
+
+
+def timed(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+def evaluate_json(index, all_chunks, query):
+    # the old evaluation: sets of "file.pdf::chunk_n" strings
+    stack = []
+    for token in infix_to_postfix(tokenize_query(query)):
+        if token in ('AND', 'OR'):
+            op2, op1 = stack.pop(), stack.pop()
+            stack.append(op1 & op2 if token == 'AND' else op1 | op2)
+        elif token == 'NOT':
+            stack.append(all_chunks - stack.pop())
+        else:
+            stack.append(set(index.get(token, ())))
+    return stack[0] if stack else set()
+
+def evaluate_compact(index, query):
+    return evaluate_postfix(infix_to_postfix(tokenize_query(query)), index, None)
+
+def run_benchmark(index_dir, repeats):
+    json_path = os.path.join(index_dir, "chunk_boolean_index.json")
+    table_path = os.path.join(index_dir, "chunk_id_table.json")
+    with open(table_path) as f:
+        chunk_table = json.load(f)
+    chunk_ids = list(chunk_table)
+
+    def load_json():
+        with open(json_path) as f:
+            return json.load(f)
+    json_index, json_ms = timed(load_json, repeats)
+
+    out_dir = tempfile.mkdtemp()
+    compact_path = os.path.join(out_dir, "chunk_index.bin")
+    store_path = os.path.join(out_dir, "chunk_texts.chunks")
+    CompactIndex.from_inverted_index(json_index, chunk_ids).save(compact_path)
+    write_chunk_store(store_path, list(chunk_table.values()))
+    compact_index, compact_ms = timed(lambda: CompactIndex.load(compact_path), repeats)
+
+    json_mb = os.path.getsize(json_path) / (1024 * 1024)
+    compact_mb = os.path.getsize(compact_path) / (1024 * 1024)
+    print(f"{len(json_index)} terms, {len(chunk_ids)} chunks, {sum(len(p) for p in json_index.values())} postings")
+    print(f"{'format':<8} {'size MB':>9} {'load ms':>9}")
+    print(f"{'json':<8} {json_mb:>9.3f} {json_ms:>9.2f}")
+    print(f"{'compact':<8} {compact_mb:>9.3f} {compact_ms:>9.3f}   ({json_mb / compact_mb:.1f}x smaller, {json_ms / compact_ms:.1f}x faster to load)")
+
+    def startup_json():
+        with open(table_path) as f:
+            json.load(f)
+        return load_json()
+    _, json_startup_ms = timed(startup_json, repeats)
+    _, mapped_startup_ms = timed(lambda: (CompactIndex.load(compact_path), ChunkStore(store_path)), repeats)
+    print(f"startup (index + chunk texts): json {json_startup_ms:.2f} ms, mapped {mapped_startup_ms:.3f} ms")
+
+    all_chunks = set(chunk_ids)
+    print(f"\n{'query':<45} {'json ms':>9} {'compact ms':>11} {'hits':>6}")
+    for query in QUERIES:
+        json_result, json_query_ms = timed(lambda: evaluate_json(json_index, all_chunks, query), repeats)
+        compact_result, compact_query_ms = timed(lambda: evaluate_compact(compact_index, query), repeats)
+        assert {compact_index.chunk_ids[doc] for doc in compact_result} == json_result, f"results differ for {query!r}"
+        print(f"{query:<45} {json_query_ms:>9.3f} {compact_query_ms:>11.3f} {len(json_result):>6}")
+
+def run_scaling(doc_counts, vocabulary=20000, terms_per_chunk=60):
+    # synthetic chunks with Zipf-like term choice; time from nothing loaded to the first answered query
+    rng = random.Random(0)
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    print(f"\n{'chunks':>8} {'json MB':>9} {'bin MB':>8} {'json startup ms':>16} {'mapped startup ms':>18} {'first query ms':>15}")
+    for num_docs in doc_counts:
+        chunk_ids = [f"doc{doc // 10}.pdf::chunk_{doc}" for doc in range(num_docs)]
+        inverted_index = {}
+        for chunk_id in chunk_ids:
+            for term in set(rng.choices(range(vocabulary), weights, k=terms_per_chunk)):
+                inverted_index.setdefault(f"t{term}", {})[chunk_id] = 1
+        texts = [f"text of {chunk_id}" for chunk_id in chunk_ids]
+
+        out_dir = tempfile.mkdtemp()
+        json_path, table_path = os.path.join(out_dir, "index.json"), os.path.join(out_dir, "table.json")
+        compact_path, store_path = os.path.join(out_dir, "chunk_index.bin"), os.path.join(out_dir, "chunk_texts.chunks")
+        with open(json_path, "w") as f:
+            json.dump(inverted_index, f)
+        with open(table_path, "w") as f:
+            json.dump(dict(zip(chunk_ids, texts)), f)
+        CompactIndex.from_inverted_index(inverted_index, chunk_ids).save(compact_path)
+        write_chunk_store(store_path, texts)
+
+        start = time.perf_counter()
+        with open(json_path) as f:
+            json.load(f)
+        with open(table_path) as f:
+            json.load(f)
+        json_startup_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        index, store = CompactIndex.load(compact_path), ChunkStore(store_path)
+        mapped_startup_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        docs = evaluate_compact(index, "t5 && t50 && ~t500")
+        [store.text(doc) for doc in docs[:10]]
+        first_query_ms = (time.perf_counter() - start) * 1000
+
+        json_mb = (os.path.getsize(json_path) + os.path.getsize(table_path)) / (1024 * 1024)
+        bin_mb = (os.path.getsize(compact_path) + os.path.getsize(store_path)) / (1024 * 1024)
+        print(f"{num_docs:>8} {json_mb:>9.1f} {bin_mb:>8.1f} {json_startup_ms:>16.1f} {mapped_startup_ms:>18.3f} {first_query_ms:>15.2f}")
+        store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index_dir", default="BooleanRetrievalModel")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--scale", type=int, nargs="*", help="chunk counts of synthetic indexes for the startup comparison")
+    args = parser.parse_args()
+    run_benchmark(args.index_dir, args.repeats)
+    if args.scale:
+        run_scaling(args.scale)
@@ -0,0 +1,33 @@
+'''
+Throughput of pdfExtraction.extract_pages (pages/sec) against the number of worker processes.
+
+to run:
+python benchmarkExtraction.py --pdf_dir pdfs --workers 1 2 4 8
+'''
+import os
+import time
+import argparse
+from pdfExtraction import extract_pages
+
+
+def run_benchmark(pdf_dir, worker_counts, pages_per_task):
+    pdf_paths = sorted(os.path.join(pdf_dir, f) for f in os.listdir(pdf_dir) if f.endswith(".pdf"))
+    print(f"{len(pdf_paths)} PDFs, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'pages':>7} {'seconds':>9} {'pages/sec':>10} {'speedup':>8}")
+    baseline = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        pages = extract_pages(pdf_paths, workers=workers, pages_per_task=pages_per_task, cache=False) # measure parsing, not cache hits
+        elapsed = time.perf_counter() - start
+        num_pages = sum(len(records) for records in pages.values())
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {num_pages:>7} {elapsed:>9.2f} {num_pages / elapsed:>10.1f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdf_dir", default="pdfs")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--pages_per_task", type=int, default=8)
+    args = parser.parse_args()
+    run_benchmark(args.pdf_dir, args.workers, args.pages_per_task)
@@ -0,0 +1,63 @@
+'''
+Per-stage latency of queryNew.hybrid_search: query embedding, FAISS search and BM25 run concurrently, then fusion.
+Compares the wall time of the fan-out with running dense and BM25 one after the other, and shows how many of the
+fused chunks both searches, only the dense search and only BM25 found. Every query is embedded for real (a fresh embedding cache per run), so
+point OPENAI_BASE_URL at stubOpenAIServer.py to run it without an API key.
+
+to run (after main.py has built the FAISS index and the BM25 index over the same chunks):
+python benchmarkHybrid.py --index vector_index4.faiss --metadata chunks_metadata4.pkl --method rrf
+'''
+import os
+import argparse
+import tempfile
+import numpy as np
+from retriever import FaissRetriever
+from embeddingCache import EmbeddingCache
+from analyzer import tokenize
+from maxScore import max_score_top_k
+from queryNew import hybrid_search, get_lexical_index, get_embedding
+
+QUERIES = [
+    "DRC composition and meeting frequency",
+    "INR 25,000 contingency grant",
+    "PhD thesis submission checklist",
+    "leave policy for institute supported PhD students",
+    "minimum CGPA for PhD proposal approval",
+    "number of days of medical leave",
+]
+
+
+def run_benchmark(index_path, metadata_path, method, candidates, top_k):
+    retriever = FaissRetriever(index_path, metadata_path)
+    lexical_index = get_lexical_index(metadata_path)
+    cache = EmbeddingCache(os.path.join(tempfile.mkdtemp(), "embedding_cache.sqlite"))
+    api_key = os.environ.get("OPENAI_API_KEY", "")
+
+    stages = ["embed_ms", "faiss_ms", "dense_ms", "bm25_ms", "retrieval_ms", "fusion_ms"]
+    print(f"{'query':<50} " + " ".join(f"{stage:>12}" for stage in stages) + f" {'both/dense/bm25':>16}")
+    overheads = []
+    for query in QUERIES:
+        fused, timings = hybrid_search(query, api_key, top_k, retriever, lexical_index, candidates, method, embedding_cache=cache)
+        overheads.append(timings["retrieval_ms"] - max(timings["dense_ms"], timings["bm25_ms"]))
+
+        # which search found each fused chunk (the embedding is a cache hit by now), chunk texts are unique per id
+        dense_texts = {text for _, text, _, _ in retriever.search_with_ids(get_embedding(query, api_key, cache=cache), candidates)}
+        top, _ = max_score_top_k(lexical_index, tokenize(query), candidates)
+        bm25_texts = {retriever.lookup(int(lexical_index.chunk_ids[doc]))[0] for doc, _ in top}
+        both = sum(text in dense_texts and text in bm25_texts for text, _, _ in fused)
+        in_dense = sum(text in dense_texts for text, _, _ in fused)
+        sources = f"{both}/{in_dense - both}/{len(fused) - in_dense}"
+        print(f"{query[:50]:<50} " + " ".join(f"{timings[stage]:>12.2f}" for stage in stages) + f" {sources:>16}")
+
+    print(f"\nfan-out overhead over the slower search: mean {np.mean(overheads):.2f} ms, max {max(overheads):.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index", default="vector_index4.faiss")
+    parser.add_argument("--metadata", default="chunks_metadata4.pkl")
+    parser.add_argument("--method", choices=["rrf", "weighted"], default="rrf")
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--top_k", type=int, default=7)
+    args = parser.parse_args()
+    run_benchmark(args.index, args.metadata, args.method, args.candidates, args.top_k)
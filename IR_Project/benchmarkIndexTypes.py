@@ -0,0 +1,61 @@
+'''
+Compares the index types of faissIndexes.py on synthetic clustered vectors (so no API key or real corpus is needed).
+For every corpus size it reports, per index type: recall@k against the exact flat index, build time,
+serialized index size and single-query latency.
+
+to run:
+python benchmarkIndexTypes.py --sizes 1000 10000 50000 --dimension 1536 --k 7
+'''
+import time
+import argparse
+import faiss
+import numpy as np
+from faissIndexes import INDEX_TYPES, build_faiss_index
+
+
+def synthetic_corpus(num_vectors, dimension, num_queries, rng):
+    # chunks of the same document/topic sit close together, uniform noise would make every ANN index look bad
+    num_topics = max(10, num_vectors // 100)
+    centers = rng.normal(size=(num_topics, dimension)).astype('float32')
+    vectors = centers[rng.integers(num_topics, size=num_vectors)] + 0.3 * rng.normal(size=(num_vectors, dimension)).astype('float32')
+    queries = centers[rng.integers(num_topics, size=num_queries)] + 0.3 * rng.normal(size=(num_queries, dimension)).astype('float32')
+    return vectors.astype('float32'), queries.astype('float32')
+
+def recall_at_k(found, truth):
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+
+def run_benchmark(sizes, dimension, k, num_queries):
+    rng = np.random.default_rng(0)
+    print(f"{'size':>8} {'type':<9} {'recall@' + str(k):>9} {'build s':>9} {'size MB':>9} {'query ms':>9}")
+    for num_vectors in sizes:
+        vectors, queries = synthetic_corpus(num_vectors, dimension, num_queries, rng)
+        ids = np.arange(num_vectors, dtype='int64')
+        truth = None
+        for index_type in INDEX_TYPES:
+            start = time.perf_counter()
+            index = build_faiss_index(vectors, ids, index_type)
+            build_time = time.perf_counter() - start
+
+            size_mb = faiss.serialize_index(index).nbytes / (1024 * 1024)
+
+            # one query at a time, the way the server issues them
+            found = []
+            start = time.perf_counter()
+            for query in queries:
+                _, indices = index.search(query.reshape(1, -1), k)
+                found.append(indices[0])
+            latency_ms = (time.perf_counter() - start) / num_queries * 1000
+
+            if index_type == "flat":
+                truth = found
+            print(f"{num_vectors:>8} {index_type:<9} {recall_at_k(found, truth):>9.3f} {build_time:>9.2f} {size_mb:>9.1f} {latency_ms:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--k", type=int, default=7)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+    run_benchmark(args.sizes, args.dimension, args.k, args.queries)
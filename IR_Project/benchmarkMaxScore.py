@@ -0,0 +1,91 @@
+'''
+Top-k BM25 for long disjunctive queries: exhaustive term-at-a-time scoring (booleanQueryNew.bm25_scores, every
+posting of every query term) against MaxScore pruning (maxScore.py). Reports latency and how many postings each
+one scores, and checks that both return the same top-k scores. Runs the evaluation-style questions on the
+shipped index, then 20-term queries on a synthetic Zipf-distributed index to show how skipping grows with size.
+
+to run (defaults to the shipped index in BooleanRetrievalModel/):
+python benchmarkMaxScore.py --index_dir BooleanRetrievalModel --top_k 7 --docs 200000
+'''
+import os
+import json
+import time
+import heapq
+import random
+import argparse
+from compactIndex import CompactIndex
+from analyzer import tokenize
+from booleanQueryNew import bm25_scores
+from maxScore import max_score_top_k
+
+QUESTIONS = [
+    "What are the guidelines for availing casual leaves by a PhD student?",
+    "What is the difference between casual leaves and special casual leaves?",
+    "What is a PhD student's responsibility after bill clearance for the National Institute Travel Grant?",
+    "What are the items which can be purchased under the contingency (with Institute PhD Fellowship)?",
+    "How many credits should a PhD candidate holding only a first degree be prescribed?",
+    "What steps should be taken in case of a change in supervisor of a PhD student?",
+    "Q. Can you please give some ideas about the leave that a PhD student can avail?",
+]
+
+
+def best_ms(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+def exhaustive_top_k(index, terms, top_k):
+    return heapq.nlargest(top_k, bm25_scores(index, terms).items(), key=lambda item: item[1])
+
+def compare(index, queries, top_k, repeats):
+    print(f"{'terms':>5} {'exhaustive ms':>14} {'maxscore ms':>12} {'postings':>9} {'scored':>8} {'skipped':>8}")
+    totals = {"postings": 0, "scored": 0}
+    for terms in queries:
+        expected, exhaustive_ms = best_ms(lambda: exhaustive_top_k(index, terms, top_k), repeats)
+        (top, stats), pruned_ms = best_ms(lambda: max_score_top_k(index, terms, top_k), repeats)
+        assert [round(score, 9) for _, score in top] == [round(score, 9) for _, score in expected], f"top-k differs for {terms}"
+        totals["postings"] += stats["postings"]
+        totals["scored"] += stats["scored"]
+        print(f"{len(terms):>5} {exhaustive_ms:>14.2f} {pruned_ms:>12.2f} {stats['postings']:>9} {stats['scored']:>8} {stats['skipped']:>8}")
+    print(f"scored {totals['scored']} of {totals['postings']} postings ({1 - totals['scored'] / max(totals['postings'], 1):.0%} skipped)")
+
+def synthetic_index(num_docs, rng, vocabulary=20000, tokens_per_chunk=150):
+    # Zipf-like term choice, so a few terms are in most chunks and most terms in few
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    chunk_ids = [f"doc{doc // 10}.pdf::chunk_{doc}" for doc in range(num_docs)]
+    inverted_index = {}
+    for chunk_id in chunk_ids:
+        for term in rng.choices(range(vocabulary), weights, k=tokens_per_chunk):
+            postings = inverted_index.setdefault(f"t{term}", {})
+            postings[chunk_id] = postings.get(chunk_id, 0) + 1
+    return CompactIndex.from_inverted_index(inverted_index, chunk_ids)
+
+def run_benchmark(index_dir, top_k, num_docs, repeats):
+    with open(os.path.join(index_dir, "chunk_boolean_index.json")) as f:
+        inverted_index = json.load(f)
+    with open(os.path.join(index_dir, "chunk_id_table.json")) as f:
+        chunk_ids = list(json.load(f))
+    index = CompactIndex.from_inverted_index(inverted_index, chunk_ids)
+    print(f"shipped index: {index.num_docs} chunks, top {top_k}")
+    compare(index, [tokenize(question) for question in QUESTIONS], top_k, repeats)
+
+    if num_docs:
+        rng = random.Random(0)
+        index = synthetic_index(num_docs, rng)
+        # 20-term questions: a few very common words, the rest from the long tail
+        queries = [[f"t{rng.randint(0, 20)}" for _ in range(5)] + [f"t{rng.randint(20, 5000)}" for _ in range(15)] for _ in range(10)]
+        print(f"\nsynthetic index: {index.num_docs} chunks, top {top_k}")
+        compare(index, queries, top_k, repeats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index_dir", default="BooleanRetrievalModel")
+    parser.add_argument("--top_k", type=int, default=7)
+    parser.add_argument("--docs", type=int, default=200_000, help="chunks in the synthetic index, 0 to skip it")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.index_dir, args.top_k, args.docs, args.repeats)
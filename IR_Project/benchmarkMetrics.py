@@ -0,0 +1,67 @@
+'''
+Metrics stage of the evaluation scripts on a growing number of answer pairs: scoring pair by pair the way
+evaluation.py used to (one encode call per answer, a RougeScorer per pair) against evaluationMetrics.compute_metrics
+(one batched encode, a matrix cosine, BLEU/ROUGE on a process pool). Pairs are the benchmark_qna references with
+word-shuffled copies as model answers, repeated up to --pairs. Checks that both give the same scores.
+
+to run:
+python benchmarkMetrics.py --pairs 45 1000 5000 --workers 4
+'''
+import time
+import random
+import argparse
+from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
+from rouge_score import rouge_scorer
+from sentence_transformers import util
+from evaluation import benchmark_qna
+from evaluationMetrics import compute_metrics, get_sentence_model
+
+
+def synthetic_pairs(num_pairs, rng):
+    references = list(benchmark_qna.values())
+    expected, hypotheses = [], []
+    for i in range(num_pairs):
+        words = references[i % len(references)].split()
+        rng.shuffle(words)
+        expected.append(references[i % len(references)])
+        hypotheses.append(" ".join(words[:max(1, len(words) * 3 // 4)]))
+    return expected, hypotheses
+
+def per_pair(expected, hypotheses):
+    model = get_sentence_model()
+    results = []
+    for expected_answer, hypothesis_answer in zip(expected, hypotheses):
+        emb1 = model.encode(expected_answer, convert_to_tensor=True)
+        emb2 = model.encode(hypothesis_answer, convert_to_tensor=True)
+        scorer = rouge_scorer.RougeScorer(['rouge1', 'rouge2', 'rougeL'], use_stemmer=True)
+        rouge_scores = scorer.score(expected_answer, hypothesis_answer)
+        results.append({
+            "bert_score": util.pytorch_cos_sim(emb1, emb2).item(),
+            "bleu_score": sentence_bleu([expected_answer.split()], hypothesis_answer.split(), smoothing_function=SmoothingFunction().method1),
+            "rouge1": rouge_scores['rouge1'].fmeasure,
+            "rouge2": rouge_scores['rouge2'].fmeasure,
+            "rougeL": rouge_scores['rougeL'].fmeasure,
+        })
+    return results
+
+def run_benchmark(pair_counts, workers):
+    get_sentence_model() # model load time is not part of either column
+    print(f"{'pairs':>8} {'per pair s':>11} {'batched s':>10} {'speedup':>8} {'max diff':>9}")
+    for num_pairs in pair_counts:
+        expected, hypotheses = synthetic_pairs(num_pairs, random.Random(0))
+        start = time.perf_counter()
+        before = per_pair(expected, hypotheses)
+        before_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        after = compute_metrics(expected, hypotheses, workers=workers)
+        after_seconds = time.perf_counter() - start
+        max_diff = max(abs(old[name] - new[name]) for old, new in zip(before, after) for name in old)
+        print(f"{num_pairs:>8} {before_seconds:>11.2f} {after_seconds:>10.2f} {before_seconds / after_seconds:>7.1f}x {max_diff:>9.1e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, nargs="+", default=[45, 1000, 5000])
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    run_benchmark(args.pairs, args.workers)
@@ -0,0 +1,76 @@
+'''
+Boolean index build time, serial (parallel extraction only) against the map-reduce build at several worker
+counts, and a check that every build writes byte-identical index files. The PDFs are copied --copies times to get
+a larger corpus; each copy gets a trailing PDF comment so it has its own content hash and is really extracted.
+Every build runs with an empty extraction cache and an empty lemma cache.
+
+to run:
+python benchmarkParallelBuild.py --pdf_dir pdfs --copies 40 --workers 1 2 4 8
+'''
+import os
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import analyzer
+import extractionCache
+from booleanRetrievalNew import build_boolean_index
+
+INDEX_FILES = ["chunk_boolean_index.json", "chunk_id_table.json", "chunk_stats.json", "chunk_index.bin", "chunk_texts.chunks"]
+
+
+def make_corpus(pdf_dir, copies, corpus_dir):
+    names = sorted(name for name in os.listdir(pdf_dir) if name.endswith(".pdf"))
+    for copy in range(copies):
+        for name in names:
+            target = os.path.join(corpus_dir, f"{copy:04d}_{name}")
+            shutil.copyfile(os.path.join(pdf_dir, name), target)
+            with open(target, "ab") as f:
+                f.write(f"\n% copy {copy}\n".encode())
+    return copies * len(names)
+
+def timed_build(corpus_dir, parallel, workers):
+    run_dir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(run_dir)  # the default extraction cache lives under the working directory, so it starts empty
+    extractionCache._default_cache = None
+    analyzer._analyzers.clear()
+    analyzer.DEFAULT_CACHE_PATH = os.path.join(run_dir, "lemma_cache.json.gz")
+    try:
+        start = time.perf_counter()
+        build_boolean_index(corpus_dir, workers=workers, parallel=parallel, output_dir=run_dir)
+        seconds = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+    digests = {}
+    for name in INDEX_FILES:
+        with open(os.path.join(run_dir, name), "rb") as f:
+            digests[name] = hashlib.sha256(f.read()).hexdigest()
+    shutil.rmtree(run_dir)
+    return seconds, digests
+
+def run_benchmark(pdf_dir, copies, worker_counts):
+    corpus_dir = tempfile.mkdtemp()
+    num_pdfs = make_corpus(pdf_dir, copies, corpus_dir)
+    runs = [("serial", False, max(worker_counts))] + [(f"parallel x{workers}", True, workers) for workers in worker_counts]
+    results = []
+    for name, parallel, workers in runs:
+        seconds, digests = timed_build(corpus_dir, parallel, workers)
+        results.append((name, workers, seconds, digests))
+    shutil.rmtree(corpus_dir)
+
+    print(f"\n{num_pdfs} PDFs")
+    print(f"{'build':<14} {'workers':>8} {'seconds':>9} {'speedup':>8} {'same files':>11}")
+    base_seconds = next(seconds for name, workers, seconds, _ in results if name == "parallel x1") if 1 in worker_counts else results[0][2]
+    for name, workers, seconds, digests in results:
+        print(f"{name:<14} {workers:>8} {seconds:>9.2f} {base_seconds / seconds:>7.2f}x {str(digests == results[0][3]):>11}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdf_dir", default="pdfs")
+    parser.add_argument("--copies", type=int, default=40)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    run_benchmark(args.pdf_dir, args.copies, args.workers)
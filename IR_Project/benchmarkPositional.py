@@ -0,0 +1,88 @@
+'''
+Phrase and NEAR/k queries on a positional chunk index against their AND approximation on the non-positional
+index: index size, load time, query latency and hits (every hit of the approximation beyond the phrase hits is
+a false match that would end up in the LLM context). Both indexes are built from the chunk texts in
+chunk_id_table.json with the indexing analyzer; phrase hits are checked against a scan of the token lists.
+
+to run (defaults to the shipped chunk texts in BooleanRetrievalModel/):
+python benchmarkPositional.py --index_dir BooleanRetrievalModel --repeats 20
+'''
+import os
+import json
+import time
+import argparse
+import tempfile
+from collections import Counter
+from compactIndex import CompactIndex
+from analyzer import tokenize
+from booleanQueryNew import tokenize_query, infix_to_postfix
+from queryPlanner import plan, execute
+from postingLists import to_array
+
+# (positional query, AND approximation)
+QUERIES = [
+    ('"casual leave"', "casual && leave"),
+    ('"special casual leave"', "special && casual && leave"),
+    ('"thesis submission"', "thesis && submission"),
+    ("phd NEAR/3 supervisor", "phd && supervisor"),
+    ('"casual leave" NEAR/5 sanction', "casual && leave && sanction"),
+]
+
+
+def timed(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+def run_query(index, query):
+    return to_array(execute(plan(infix_to_postfix(tokenize_query(query)), index), index))
+
+def scan_phrase(chunk_tokens, words):
+    # reference answer: docs whose token list contains words consecutively
+    n = len(words)
+    return [doc for doc, tokens in enumerate(chunk_tokens) if any(tokens[i:i + n] == words for i in range(len(tokens) - n + 1))]
+
+def run_benchmark(index_dir, repeats):
+    with open(os.path.join(index_dir, "chunk_id_table.json")) as f:
+        chunk_table = json.load(f)
+    chunk_ids = list(chunk_table)
+    chunk_tokens = [tokenize(text) for text in chunk_table.values()]
+
+    inverted_index, positions = {}, {}
+    for chunk_id, tokens in zip(chunk_ids, chunk_tokens):
+        for token, frequency in Counter(tokens).items():
+            inverted_index.setdefault(token, {})[chunk_id] = frequency
+        for position, token in enumerate(tokens):
+            positions.setdefault(token, {}).setdefault(chunk_id, []).append(position)
+
+    out_dir = tempfile.mkdtemp()
+    plain_path, positional_path = os.path.join(out_dir, "plain.bin"), os.path.join(out_dir, "positional.bin")
+    CompactIndex.from_inverted_index(inverted_index, chunk_ids).save(plain_path)
+    CompactIndex.from_inverted_index(inverted_index, chunk_ids, positions=positions).save(positional_path)
+    plain_index, plain_ms = timed(lambda: CompactIndex.load(plain_path), repeats)
+    positional_index, positional_ms = timed(lambda: CompactIndex.load(positional_path), repeats)
+
+    print(f"{len(chunk_ids)} chunks, {sum(map(len, chunk_tokens))} tokens, {len(inverted_index)} terms")
+    print(f"{'index':<12} {'size KB':>9} {'load ms':>9}")
+    print(f"{'plain':<12} {os.path.getsize(plain_path) / 1024:>9.1f} {plain_ms:>9.3f}")
+    print(f"{'positional':<12} {os.path.getsize(positional_path) / 1024:>9.1f} {positional_ms:>9.3f}")
+
+    print(f"\n{'query':<36} {'ms':>7} {'hits':>5}   {'AND approximation':<30} {'ms':>7} {'hits':>5}")
+    for query, approximation in QUERIES:
+        result, query_ms = timed(lambda: run_query(CompactIndex.load(positional_path), query), repeats)  # cold: positions decoded per run
+        approximate, approximate_ms = timed(lambda: run_query(CompactIndex.load(plain_path), approximation), repeats)
+        if query.startswith('"') and query.endswith('"'):
+            assert list(result) == scan_phrase(chunk_tokens, tokenize(query.strip('"'))), f"phrase hits differ for {query!r}"
+        assert set(result) <= set(approximate), f"{query!r} matched outside its AND approximation"
+        print(f"{query:<36} {query_ms:>7.3f} {len(result):>5}   {approximation:<30} {approximate_ms:>7.3f} {len(approximate):>5}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index_dir", default="BooleanRetrievalModel")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    run_benchmark(args.index_dir, args.repeats)
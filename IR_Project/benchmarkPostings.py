@@ -0,0 +1,99 @@
+'''
+Microbenchmark of boolean query evaluation: the old approach (every posting list turned into a Python set,
+NOT built from the full universe of doc ids) against evaluate_postfix over sorted integer postings
+(galloping intersection, AND-NOT instead of complements) and against the cost-based planner of
+queryPlanner.py (rewritten query, conjuncts ordered by estimated size, candidates pushed down). Posting lists are synthetic so the corpus size
+and the term skew can be pushed well past the current index.
+
+to run:
+python benchmarkPostings.py --docs 1000000 --repeats 5
+python benchmarkPostings.py --docs 1000000 --explain   # also print each plan with estimated / actual sizes
+'''
+import time
+import random
+import argparse
+from array import array
+from types import SimpleNamespace
+from booleanQueryNew import tokenize_query, infix_to_postfix, evaluate_postfix
+from queryPlanner import plan, execute, explain
+from bitmapPostings import Bitmap, is_dense
+from postingLists import to_array
+
+# fraction of documents containing each synthetic term
+TERM_DENSITIES = {"rare": 0.0001, "uncommon": 0.01, "medium": 0.1, "common": 0.3, "frequent": 0.9}
+
+QUERIES = [
+    ("typical", "medium && common"),
+    ("typical", "uncommon || medium"),
+    ("rare && frequent", "rare && frequent"),
+    ("and-not", "medium && ~common"),
+    ("and-not, rare", "rare && ~frequent"),
+    ("long conjunction", "frequent && common && medium && uncommon && rare"),
+    ("negated query", "~rare"),
+    ("nested", "(common || medium) && ~(frequent && uncommon)"),
+    ("union then rare", "(frequent || common) && rare"),
+    ("double negation", "~~rare && frequent"),
+    ("negated union", "uncommon && ~(frequent || rare)"),
+    ("de morgan", "~(~uncommon || ~medium) && common"),
+]
+
+
+def synthetic_index(num_docs, rng):
+    postings = {
+        term: array('i', sorted(rng.sample(range(num_docs), max(1, int(num_docs * density)))))
+        for term, density in TERM_DENSITIES.items()
+    }
+    bitmaps = {term: Bitmap.from_docs(docs, num_docs) for term, docs in postings.items() if is_dense(len(docs), num_docs)}
+    return SimpleNamespace(num_docs=num_docs, postings=lambda term: postings.get(term, array('i')),
+                           boolean_postings=lambda term: bitmaps.get(term) or postings.get(term, array('i')),
+                           doc_freq=lambda term: len(postings.get(term, ())), sets={t: set(p) for t, p in postings.items()})
+
+def evaluate_with_sets(postfix, index):
+    # what evaluate_postfix used to do
+    stack = []
+    all_docs = set(range(index.num_docs))
+    for token in postfix:
+        if token == 'AND':
+            op2, op1 = stack.pop(), stack.pop()
+            stack.append(op1.intersection(op2))
+        elif token == 'OR':
+            op2, op1 = stack.pop(), stack.pop()
+            stack.append(op1.union(op2))
+        elif token == 'NOT':
+            stack.append(all_docs - stack.pop())
+        else:
+            stack.append(set(index.postings(token)))
+    return sorted(stack[0]) if stack else []
+
+def best_ms(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+def run_benchmark(num_docs, repeats, show_plans=False):
+    index = synthetic_index(num_docs, random.Random(0))
+    print(f"{num_docs} docs, postings: " + ", ".join(f"{term}={len(index.postings(term))}" for term in TERM_DENSITIES))
+    print(f"{'case':<18} {'query':<50} {'sets ms':>9} {'sorted ms':>10} {'planned ms':>11} {'speedup':>8} {'hits':>8}")
+    for case, query in QUERIES:
+        postfix = infix_to_postfix(tokenize_query(query))
+        expected, sets_ms = best_ms(lambda: evaluate_with_sets(postfix, index), repeats)
+        result, sorted_ms = best_ms(lambda: evaluate_postfix(postfix, index, None), repeats)
+        planned, planned_ms = best_ms(lambda: to_array(execute(plan(postfix, index), index)), repeats)
+        assert list(result) == expected and list(planned) == expected, f"results differ for {query!r}"
+        print(f"{case:<18} {query:<50} {sets_ms:>9.2f} {sorted_ms:>10.2f} {planned_ms:>11.2f} {sets_ms / max(planned_ms, 1e-6):>7.1f}x {len(result):>8}")
+        if show_plans:
+            query_plan = plan(postfix, index)
+            execute(query_plan, index)
+            print(explain(query_plan) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--explain", action="store_true")
+    args = parser.parse_args()
+    run_benchmark(args.docs, args.repeats, args.explain)
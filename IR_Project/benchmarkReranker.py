@@ -0,0 +1,73 @@
+'''
+Reranking latency against the number of candidates (top-k) for every reranker backend, plus the old
+behaviour of loading the model inside every call. Passages are windows of the PDFs in --pdf_dir, so no
+index or API key is needed. onnx backends are skipped when onnxruntime is not installed.
+
+to run:
+python benchmarkReranker.py --top_k 5 10 20 50 --backends torch torch_int8 onnx_int8
+'''
+import os
+import time
+import argparse
+import numpy as np
+from pdfExtraction import extract_contents
+from reranker import CrossEncoderReranker
+
+QUERIES = [
+    "Library fine policy regulations",
+    "Summer internship credit SOP",
+    "Minimum attendance requirement examination",
+    "Procedure for withdrawal from a course",
+]
+
+
+def load_passages(pdf_dir, size=1500):
+    pdf_paths = sorted(os.path.join(pdf_dir, f) for f in os.listdir(pdf_dir) if f.endswith(".pdf"))
+    passages = []
+    for content in extract_contents(pdf_paths, table_format="plain").values():
+        passages.extend(content[i:i + size] for i in range(0, len(content), size))
+    return passages
+
+def time_rerank(reranker, passages, k, repeats):
+    latencies = []
+    for r in range(repeats):
+        query = QUERIES[r % len(QUERIES)]
+        candidates = [(passage, 0.0, "") for passage in passages[r * k % len(passages):][:k]]
+        start = time.perf_counter()
+        reranker.rerank(query, candidates)
+        latencies.append(time.perf_counter() - start)
+    return float(np.median(latencies) * 1000)
+
+def run_benchmark(pdf_dir, top_ks, backends, repeats, model_name):
+    passages = load_passages(pdf_dir)
+    print(f"{len(passages)} passages, {os.cpu_count()} CPUs")
+
+    # what rerank_with_cross_encoder used to do on every query: load, then score everything padded together
+    start = time.perf_counter()
+    CrossEncoderReranker(model_name, backend="torch", max_candidates=max(top_ks), max_length=512, batch_size=max(top_ks)).rerank(
+        QUERIES[0], [(passage, 0.0, "") for passage in passages[:max(top_ks)]])
+    print(f"load-per-query (old behaviour), top_k={max(top_ks)}: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    print(f"{'backend':<11} {'load ms':>8} " + " ".join(f"{'k=' + str(k):>8}" for k in top_ks) + "   (p50 ms per query)")
+    for backend in backends:
+        start = time.perf_counter()
+        try:
+            reranker = CrossEncoderReranker(model_name, backend=backend, max_candidates=max(top_ks))
+        except ImportError as e:
+            print(f"{backend:<11} skipped: {e}")
+            continue
+        load_ms = (time.perf_counter() - start) * 1000
+        reranker.rerank(QUERIES[0], [(passages[0], 0.0, "")]) # warm-up
+        row = [time_rerank(reranker, passages, k, repeats) for k in top_ks]
+        print(f"{backend:<11} {load_ms:>8.0f} " + " ".join(f"{latency:>8.1f}" for latency in row))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdf_dir", default="pdfs")
+    parser.add_argument("--top_k", type=int, nargs="+", default=[5, 10, 20, 50])
+    parser.add_argument("--backends", nargs="+", default=["torch", "torch_int8", "onnx", "onnx_int8"])
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--model", default="cross-encoder/ms-marco-MiniLM-L-6-v2")
+    args = parser.parse_args()
+    run_benchmark(args.pdf_dir, args.top_k, args.backends, args.repeats, args.model)
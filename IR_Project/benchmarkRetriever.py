@@ -0,0 +1,54 @@
+'''
+Latency benchmark: loading the FAISS index + metadata on every request ("cold")
+versus serving every request from a resident FaissRetriever.
+Random query vectors are used so no OpenAI API key is needed.
+
+to run (after main.py has built the index):
+python benchmarkRetriever.py --index vector_index4.faiss --metadata chunks_metadata4.pkl --queries 50
+'''
+import argparse
+import time
+import numpy as np
+from retriever import FaissRetriever
+
+
+def percentile(values, p):
+    return float(np.percentile(np.array(values) * 1000, p))
+
+def report(name, latencies):
+    print(f"{name:<10} p50: {percentile(latencies, 50):8.2f} ms   p95: {percentile(latencies, 95):8.2f} ms   mean: {np.mean(latencies) * 1000:8.2f} ms")
+
+def run_benchmark(index_path, metadata_path, num_queries=50, top_k=7):
+    resident = FaissRetriever(index_path, metadata_path)
+    print(f"Resident retriever: {resident.stats()}")
+    if resident.mmap:
+        print(f"Fully loaded (no mmap): {FaissRetriever(index_path, metadata_path, mmap=False).stats()}")
+
+    rng = np.random.default_rng(0)
+    query_vectors = rng.random((num_queries, resident.index.d), dtype=np.float32)
+
+    cold_latencies = []
+    for vector in query_vectors:
+        start = time.perf_counter()
+        FaissRetriever(index_path, metadata_path, mmap=False).search(vector, top_k) # what every request used to do
+        cold_latencies.append(time.perf_counter() - start)
+
+    resident_latencies = []
+    for vector in query_vectors:
+        start = time.perf_counter()
+        resident.search(vector, top_k)
+        resident_latencies.append(time.perf_counter() - start)
+
+    report("cold", cold_latencies)
+    report("resident", resident_latencies)
+    print(f"speedup (p50): {percentile(cold_latencies, 50) / percentile(resident_latencies, 50):.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index", default="vector_index4.faiss")
+    parser.add_argument("--metadata", default="chunks_metadata4.pkl")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top_k", type=int, default=7)
+    args = parser.parse_args()
+    run_benchmark(args.index, args.metadata, args.queries, args.top_k)
@@ -0,0 +1,80 @@
+import numpy as np
+from array import array
+from typing import Sequence
+
+# Dense posting lists as bitsets: one bit per chunk, packed into uint64 words. Once a term occurs in more than
+# 1/32 of the chunks its bitset (num_docs / 8 bytes) is smaller than its int32 doc id array (4 bytes per doc),
+# and AND / OR / NOT become single vectorized passes over num_docs / 64 words instead of per-doc work.
+DENSE_FRACTION = 1 / 32
+
+# popcount per byte, for numpy versions without np.bitwise_count
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def is_dense(df: int, num_docs: int) -> bool:
+    return num_docs > 0 and df >= num_docs * DENSE_FRACTION
+
+def _doc_ids(docs: Sequence[int]) -> np.ndarray:
+    if isinstance(docs, array) and docs.typecode == 'i':
+        return np.frombuffer(docs, dtype=np.int32) if len(docs) else np.empty(0, dtype=np.int32)
+    return np.asarray(docs, dtype=np.int32)
+
+
+class Bitmap:
+    """Set of doc ids in [0, num_docs). Iterates in ascending order like the sorted posting arrays it stands in for."""
+    __slots__ = ("words", "num_docs", "_count")
+
+    def __init__(self, words: np.ndarray, num_docs: int):
+        self.words = words
+        self.num_docs = num_docs
+        self._count = None
+
+    @classmethod
+    def from_docs(cls, docs: Sequence[int], num_docs: int):
+        bits = np.zeros(-(-num_docs // 64) * 64, dtype=np.bool_)
+        bits[_doc_ids(docs)] = True
+        return cls(np.packbits(bits, bitorder='little').view(np.uint64), num_docs)
+
+    def to_array(self) -> array:
+        docs = np.flatnonzero(np.unpackbits(self.words.view(np.uint8), bitorder='little')).astype(np.int32)
+        out = array('i')
+        out.frombytes(docs.tobytes())
+        return out
+
+    def __len__(self) -> int:
+        if self._count is None:
+            if hasattr(np, "bitwise_count"):
+                self._count = int(np.bitwise_count(self.words).sum())
+            else:
+                self._count = int(_POPCOUNT8[self.words.view(np.uint8)].sum(dtype=np.int64))
+        return self._count
+
+    def __bool__(self) -> bool:
+        return bool(self.words.any())
+
+    def __iter__(self):
+        return iter(self.to_array())
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        return Bitmap(self.words & other.words, self.num_docs)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        return Bitmap(self.words | other.words, self.num_docs)
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        return Bitmap(self.words & ~other.words, self.num_docs)
+
+    def __invert__(self) -> "Bitmap":
+        words = ~self.words
+        tail = self.num_docs % 64
+        if tail and len(words):
+            words[-1] &= np.uint64((1 << tail) - 1)  # bits past num_docs are not documents
+        return Bitmap(words, self.num_docs)
+
+    def filter(self, docs: Sequence[int], keep: bool = True) -> array:
+        """The docs of a sorted list that are (keep=True) or are not (keep=False) in this bitmap, as an array."""
+        ids = _doc_ids(docs)
+        hits = (self.words.view(np.uint8)[ids >> 3] >> (ids & 7).astype(np.uint8)) & 1
+        out = array('i')
+        out.frombytes(ids[hits.astype(np.bool_) == keep].tobytes())
+        return out
@@ -1,14 +1,14 @@
 import os
 import sys
 import json
-import pandas as pd
+import argparse
 from openai import OpenAI
-from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
-from rouge_score import rouge_scorer
-from sentence_transformers import SentenceTransformer, util
 
 # Import Boolean retrieval
-from booleanQuery import load_index_and_chunk_table, query_boolean_index
+from booleanQueryNew import load_index_and_chunk_table, query_boolean_index, query_bm25
+from responseCache import cached_completion
+from evaluationRunner import run_evaluation
+from evaluationMetrics import compute_metrics
 
 # --- Load the same benchmark_qna as in evaluation.py ---
 benchmark_qna = {
@@ -62,6 +62,10 @@ benchmark_qna = {
 current_dir = os.path.dirname(__file__)
 inverted_index, chunk_id_table = load_index_and_chunk_table(current_dir)
 
+# "bm25": top_k ranked chunks per question, "boolean": every chunk matching any question word (first 25 sent to the LLM)
+retrieval_mode = "bm25"
+top_k = 7
+
 # --- OpenAI API Key ---
 api_key = ""
 client = OpenAI(api_key=api_key)
@@ -70,7 +74,7 @@ def to_boolean_query(query):
     # Remove punctuation, split to words, join with OR
     import re
     words = re.findall(r'\w+', query)
-    return ' OR '.join(words)
+    return ' || '.join(words) # tokenize_query only knows the symbolic operators, a literal OR would be looked up as a term
 
 def boolean_chunks_to_context(chunks, max_chunks=25):
     # Concatenate up to max_chunks chunks for LLM context
@@ -106,67 +110,33 @@ Retrieved segments:
             "content": f"Query: {query}\n\nRespond following all rules above:"
         }
     ]
-    completion = client.chat.completions.create(
-        model="gpt-4o-mini-2024-07-18",
-        messages=m
-    )
-    return completion.choices[0].message.content
-
-def evaluate_boolean_model():
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    results = []
-    for question, expected_answer in benchmark_qna.items():
-        print(f"Question: {question}")
-        print(f"Expected Answer: {expected_answer}")
-
+    # answered from the on-disk response cache when this exact prompt was sent before
+    return cached_completion(client, m, model="gpt-4o-mini-2024-07-18")
+
+def answer_question(question):
+    # Retrieve chunks
+    if retrieval_mode == "bm25":
+        chunks = query_bm25(inverted_index, chunk_id_table, question, top_k=top_k)
+        context = boolean_chunks_to_context(chunks, max_chunks=top_k)
+    else:
         # Convert to boolean query
-        boolean_query = to_boolean_query(question)
-        print(f"Boolean Query: {boolean_query}")
-
-        # Retrieve chunks
-        chunks = query_boolean_index(inverted_index, chunk_id_table, boolean_query)
+        chunks = query_boolean_index(inverted_index, chunk_id_table, to_boolean_query(question))
         context = boolean_chunks_to_context(chunks, max_chunks=25)
 
-        # LLM response
-        hypothesis_answer = get_llm_response(question, context)
-        print("Model Response:", hypothesis_answer)
-
-        # BERTScore
-        emb1 = model.encode(expected_answer, convert_to_tensor=True)
-        emb2 = model.encode(hypothesis_answer, convert_to_tensor=True)
-        bert_score = util.pytorch_cos_sim(emb1, emb2).item()
-
-        # BLEU
-        ref_tokens = [expected_answer.split()]
-        cand_tokens = hypothesis_answer.split()
-        smoothie = SmoothingFunction().method1
-        bleu_score = sentence_bleu(ref_tokens, cand_tokens, smoothing_function=smoothie)
-
-        # ROUGE
-        scorer = rouge_scorer.RougeScorer(['rouge1', 'rouge2', 'rougeL'], use_stemmer=True)
-        rouge_scores = scorer.score(expected_answer, hypothesis_answer)
-
-        print(f"BERT Score: {bert_score:.4f}")
-        print(f"BLEU Score: {bleu_score:.4f}")
-        print("ROUGE-1:", rouge_scores['rouge1'].fmeasure)
-        print("ROUGE-2:", rouge_scores['rouge2'].fmeasure)
-        print("ROUGE-L:", rouge_scores['rougeL'].fmeasure)
-        print("="*50)
-
-        results.append({
-            "question": question,
-            "expected_answer": expected_answer,
-            "model_answer": hypothesis_answer,
-            "bert_score": bert_score,
-            "bleu_score": bleu_score,
-            "rouge1": rouge_scores['rouge1'].fmeasure,
-            "rouge2": rouge_scores['rouge2'].fmeasure,
-            "rougeL": rouge_scores['rougeL'].fmeasure,
-        })
+    # LLM response
+    return get_llm_response(question, context)
 
-    df = pd.DataFrame(results)
-    df.to_excel("boolean_output.xlsx", index=False)
-    print("Results saved to boolean_output.xlsx")
+def evaluate_boolean_model(max_workers=4, fresh=False, metric_workers=None):
+    # all answers are scored in one batched pass at the end (evaluationMetrics.py)
+    metrics = lambda expected, hypotheses: compute_metrics(expected, hypotheses, workers=metric_workers)
+    # one checkpoint per retrieval mode, switching modes must not resume the other mode's answers
+    return run_evaluation(benchmark_qna, answer_question, metrics, f"boolean_output_{retrieval_mode}.jsonl",
+                          excel_path="boolean_output.xlsx", max_workers=max_workers, fresh=fresh)
 
 if __name__ == "__main__":
-    evaluate_boolean_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4, help="concurrent LLM calls")
+    parser.add_argument("--metric_workers", type=int, default=None, help="processes for BLEU/ROUGE (default: one per core)")
+    parser.add_argument("--fresh", action="store_true", help="ignore the checkpoint and evaluate every question again")
+    args = parser.parse_args()
+    evaluate_boolean_model(args.workers, args.fresh, args.metric_workers)
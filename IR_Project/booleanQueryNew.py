@@ -1,50 +1,113 @@
 import json
 import os
-from sortedcontainers import SortedSet
+import re
+import math
+import heapq
+from collections import Counter
+from analyzer import tokenize, get_analyzer
+from array import array
+from compactIndex import CompactIndex
+from chunkStore import ChunkStore
+from postingLists import intersect, intersect_many, difference, union, union_many, complement, to_array
+from queryPlanner import plan, execute, explain as explain_plan
+from maxScore import max_score_top_k
 
-# Load the Boolean index and chunk_id_table from the JSON files
+# Load the Boolean index and chunk_id_table
+# The index comes back as a CompactIndex (integer chunk ids): memory-mapped from chunk_index.bin when the indexer
+# wrote one, otherwise converted from chunk_boolean_index.json. Chunk texts likewise come from the memory-mapped
+# chunk_texts.chunks (a ChunkStore, row = doc id) when present, so startup does not depend on the index size;
+# older builds fall back to chunk_id_table.json.
 def load_index_and_chunk_table(current_dir):
     index_path = os.path.join(current_dir, "chunk_boolean_index.json")
+    compact_path = os.path.join(current_dir, "chunk_index.bin")
     chunk_data_path = os.path.join(current_dir, "chunk_id_table.json")
+    chunk_store_path = os.path.join(current_dir, "chunk_texts.chunks")
+    stats_path = os.path.join(current_dir, "chunk_stats.json")
 
-    if not os.path.exists(index_path) or not os.path.exists(chunk_data_path):
+    if not (os.path.exists(index_path) or os.path.exists(compact_path)) or not (os.path.exists(chunk_data_path) or os.path.exists(chunk_store_path)):
         print("Index or chunk data not found! Please build the index first.")
         return None, None
 
-    with open(index_path, 'r') as f:
-        inverted_index = json.load(f)
+    if os.path.exists(compact_path) and os.path.exists(chunk_store_path):
+        try:
+            return CompactIndex.load(compact_path), ChunkStore(chunk_store_path)
+        except ValueError as e:
+            print(f"{e}, rebuild the index to update it. Falling back to the JSON index.")
 
     with open(chunk_data_path, 'r') as f:
         chunk_id_table = json.load(f)
 
-    return inverted_index, chunk_id_table
+    with open(index_path, 'r') as f:
+        inverted_index = json.load(f)
+
+    # indexes built before chunk_stats.json existed get their lengths from the postings
+    chunk_lengths = None
+    if os.path.exists(stats_path):
+        with open(stats_path, 'r') as f:
+            chunk_lengths = json.load(f)["chunk_lengths"]
+
+    return CompactIndex.from_inverted_index(inverted_index, list(chunk_id_table), chunk_lengths), chunk_id_table
+
+def chunk_text(chunk_id_table, inverted_index, doc):
+    # chunk_id_table is a ChunkStore (rows are doc ids) or the chunk_id -> text dict of chunk_id_table.json
+    if isinstance(chunk_id_table, ChunkStore):
+        return chunk_id_table.text(doc)
+    return chunk_id_table.get(inverted_index.chunk_ids[doc], "")
+
+NEAR_PATTERN = re.compile(r"near/(\d+)", re.IGNORECASE)
+
+def _word_token(word):
+    # NEAR/k is the proximity operator, anything else a search term, analyzed like the indexed text so "leaves"
+    # finds "leave"; words the analyzer drops (stopwords, non-alphabetic) stay as typed and match nothing
+    match = NEAR_PATTERN.fullmatch(word)
+    if match:
+        return f"NEAR/{match.group(1)}"
+    return get_analyzer().analyze_term(word) or word.lower()
+
+def _phrase_token(text):
+    # a quoted phrase goes through the indexing analyzer so its words line up with the indexed token positions;
+    # phrases come out as '"w1 w2 ..."' operands, a one-word phrase is just that term
+    words = tokenize(text)
+    return words[0] if len(words) == 1 else '"' + " ".join(words) + '"'
 
 def tokenize_query(query):
+    '''
+    Splits a query into terms, "quoted phrases", operators (&& || ~ NEAR/k) and parentheses.
+    a NEAR/k b matches chunks where a and b (terms or phrases) occur at most k tokens apart, in either order.
+    '''
     tokens = []
     current_token = ""
     # Use symbols for operators
     operator_map = {'&&': 'AND', '||': 'OR', '~': 'NOT', '(': '(', ')': ')'}
-    symbols = set(operator_map.keys()).union({'(', ')'})
     i = 0
     query = query.strip()
     while i < len(query):
+        if query[i] == '"':
+            if current_token:
+                tokens.append(_word_token(current_token))
+                current_token = ""
+            end = query.find('"', i + 1)
+            end = len(query) if end < 0 else end
+            tokens.append(_phrase_token(query[i + 1:end]))
+            i = end + 1
+            continue
         if query[i].isspace():
             if current_token:
-                tokens.append(current_token.lower())
+                tokens.append(_word_token(current_token))
                 current_token = ""
             i += 1
             continue
         # Check for multi-char operators first
         if query[i:i+2] in operator_map:
             if current_token:
-                tokens.append(current_token.lower())
+                tokens.append(_word_token(current_token))
                 current_token = ""
             tokens.append(operator_map[query[i:i+2]])
             i += 2
             continue
         elif query[i] in operator_map:
             if current_token:
-                tokens.append(current_token.lower())
+                tokens.append(_word_token(current_token))
                 current_token = ""
             tokens.append(operator_map[query[i]])
             i += 1
@@ -53,11 +116,11 @@ def tokenize_query(query):
             current_token += query[i]
             i += 1
     if current_token:
-        tokens.append(current_token.lower())
+        tokens.append(_word_token(current_token))
     return tokens
 
 def infix_to_postfix(tokens):
-    precedence = {'NOT': 3, 'AND': 2, 'OR': 1, '(': 0}
+    precedence = {'NOT': 3, 'AND': 2, 'OR': 1, '(': 0}  # NEAR/k binds tightest, see below
     output = []
     operator_stack = []
     
@@ -69,9 +132,10 @@ def infix_to_postfix(tokens):
                 output.append(operator_stack.pop())
             if operator_stack and operator_stack[-1] == '(':
                 operator_stack.pop()
-        elif token in {'AND', 'OR', 'NOT'}:
-            while (operator_stack and operator_stack[-1] != '(' and 
-                   precedence[operator_stack[-1]] >= precedence[token]):
+        elif token in {'AND', 'OR', 'NOT'} or token.startswith('NEAR/'):
+            # NOT is a prefix operator: it has no left operand yet, so it never pops (keeps ~~a working)
+            while (token != 'NOT' and operator_stack and operator_stack[-1] != '(' and 
+                   precedence.get(operator_stack[-1], 4) >= precedence.get(token, 4)):
                 output.append(operator_stack.pop())
             operator_stack.append(token)
         else:
@@ -82,43 +146,124 @@ def infix_to_postfix(tokens):
     
     return output
 
+def _conjuncts(entry):
+    # a stack entry as the ([positive postings], [negated postings]) of a conjunction
+    if isinstance(entry, list):
+        return entry
+    docs, negated = entry
+    return [[], [docs]] if negated else [[docs], []]
+
+def _resolve(entry):
+    # evaluates a pending conjunction into (docs, negated): smallest positive list first, then AND-NOT each negated one
+    if not isinstance(entry, list):
+        return entry
+    positives, negatives = entry
+    if not positives:
+        return union_many(negatives), True  # ~a & ~b = ~(a | b)
+    docs = intersect_many(positives)
+    for excluded in negatives:
+        docs = difference(docs, excluded)
+    return docs, False
+
 def evaluate_postfix(postfix, inverted_index, total_chunks):
+    '''
+    Evaluates the postfix query over sorted integer postings (bitmaps for dense terms) and returns the matching
+    doc ids as a sorted array.
+    Stack entries are (docs, negated) or a pending conjunction. Chains of AND are collected and intersected
+    smallest list first; NOT only flips the flag and is folded into AND-NOT / De Morgan forms, so a complement
+    is materialized at most once, when the whole query is negative.
+    '''
     stack = []
-    all_docs = set(range(len(total_chunks)))
     
     for token in postfix:
         if token == 'AND':
-            op2 = stack.pop()
-            op1 = stack.pop()
-            stack.append(op1.intersection(op2))
+            op2, op1 = _conjuncts(stack.pop()), _conjuncts(stack.pop())
+            stack.append([op1[0] + op2[0], op1[1] + op2[1]])
         elif token == 'OR':
-            op2 = stack.pop()
-            op1 = stack.pop()
-            stack.append(op1.union(op2))
+            (docs2, neg2), (docs1, neg1) = _resolve(stack.pop()), _resolve(stack.pop())
+            if not neg1 and not neg2:
+                stack.append((union(docs1, docs2), False))
+            elif neg1 and neg2:
+                stack.append((intersect(docs1, docs2), True))   # ~a | ~b = ~(a & b)
+            elif neg2:
+                stack.append((difference(docs2, docs1), True))  # a | ~b = ~(b & ~a)
+            else:
+                stack.append((difference(docs1, docs2), True))  # ~a | b = ~(a & ~b)
         elif token == 'NOT':
-            op1 = stack.pop()
-            stack.append(all_docs - op1)
+            docs, negated = _resolve(stack.pop())
+            stack.append((docs, not negated))
+        elif token.startswith('NEAR/') or token.startswith('"'):
+            raise ValueError("phrase and NEAR queries need token positions, run them through query_boolean_index")
         else:
-            if token in inverted_index:
-                stack.append(set(inverted_index[token]))
-            else:
-                stack.append(set())
+            stack.append((inverted_index.boolean_postings(token), False))
     
-    return stack[0] if stack else set()
+    if not stack:
+        return array('i')
+    docs, negated = _resolve(stack[0])
+    return to_array(complement(docs, inverted_index.num_docs) if negated else docs)
 
 # Function to query the Boolean index
-def query_boolean_index(inverted_index, chunk_id_table, query):
+def query_boolean_index(inverted_index, chunk_id_table, query, explain=False):
+    '''
+    Parses the query, lets the planner rewrite and reorder it (see queryPlanner.py) and evaluates the plan.
+    With explain=True the plan is printed with estimated and actual intermediate result sizes.
+    '''
     tokens = tokenize_query(query)
     postfix = infix_to_postfix(tokens)
-    result_chunks = evaluate_postfix(postfix, inverted_index, chunk_id_table)
+    query_plan = plan(postfix, inverted_index)
+    result_docs = to_array(execute(query_plan, inverted_index))
+    if explain:
+        print(f"Plan: {query_plan!r}")
+        print(explain_plan(query_plan))
     
     results = []
-    for chunk_id in result_chunks:
-        chunk_text = chunk_id_table.get(str(chunk_id), "")  # Convert chunk_id to string
-        results.append({"chunk_id": chunk_id, "text": chunk_text[:500] + "..."})
+    for doc in result_docs:
+        text = chunk_text(chunk_id_table, inverted_index, doc)
+        results.append({"chunk_id": inverted_index.chunk_ids[doc], "text": text[:500] + "..."})
     
     return results
 
+### ------------------------ Ranked (BM25) retrieval ------------------------
+
+def bm25_scores(inverted_index, query_terms, k1=1.2, b=0.75):
+    '''Term-at-a-time BM25 accumulation, returns {doc: score} for chunks containing at least one query term.'''
+    num_chunks = inverted_index.num_docs
+    avg_length = inverted_index.avg_chunk_length or 1.0
+    chunk_lengths = inverted_index.chunk_lengths
+    scores = {}
+    for term, query_frequency in Counter(query_terms).items():
+        df = inverted_index.doc_freq(term)
+        if not df:
+            continue
+        idf = math.log(1 + (num_chunks - df + 0.5) / (df + 0.5)) # the +1 keeps very common terms from scoring negative
+        for doc, tf in zip(inverted_index.postings(term), inverted_index.frequencies(term)):
+            norm = k1 * (1 - b + b * chunk_lengths[doc] / avg_length)
+            scores[doc] = scores.get(doc, 0.0) + query_frequency * idf * tf * (k1 + 1) / (tf + norm)
+    return scores
+
+def query_bm25(inverted_index, chunk_id_table, query, top_k=10, k1=1.2, b=0.75, exhaustive=False, explain=False):
+    '''
+    Top-k ranked retrieval for a free-text query. The query goes through the same analyzer as the indexed
+    chunks (lowercase, stopwords removed, lemmatized), so no boolean operators are needed.
+    Long questions are disjunctions of many terms, so by default MaxScore pruning (maxScore.py) skips the
+    postings that cannot reach the top k; exhaustive=True scores every posting instead.
+    With explain=True the number of postings scored and skipped is printed.
+    '''
+    query_terms = tokenize(query)
+    if exhaustive:
+        scores = bm25_scores(inverted_index, query_terms, k1, b)
+        top = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+    else:
+        top, stats = max_score_top_k(inverted_index, query_terms, top_k, k1, b)
+        if explain:
+            print(f"MaxScore: scored {stats['scored']} of {stats['postings']} postings, skipped {stats['skipped']}")
+
+    results = []
+    for doc, score in top:
+        results.append({"chunk_id": inverted_index.chunk_ids[doc], "text": chunk_text(chunk_id_table, inverted_index, doc), "score": score})
+
+    return results
+
 # Simple user interface for querying
 def run_query_interface(pdf_folder_path):
     inverted_index, chunk_id_table = load_index_and_chunk_table(pdf_folder_path)
@@ -128,20 +273,39 @@ def run_query_interface(pdf_folder_path):
 
     print("Welcome to the Query Interface!")
     print("Type 'exit' to quit the interface.")
+    print("Boolean queries use && || ~ ( ), \"quoted phrases\" and a NEAR/k b (at most k words apart).")
+    print("Prefix a query with 'rank:' for top-10 BM25 results.")
+    print("Prefix a query with 'explain:' to see its plan (boolean) or how many postings were skipped (rank:).")
     
     while True:
         query = input("\nEnter query: ")
         if query.lower() == "exit":
             break
 
-        results = query_boolean_index(inverted_index, chunk_id_table, query)
+        explain = query.startswith("explain:")
+        if explain:
+            query = query[len("explain:"):].strip()
+
+        # a malformed query, or a phrase / NEAR on an index built without positions, only fails that query
+        try:
+            if query.startswith("rank:"):
+                results = query_bm25(inverted_index, chunk_id_table, query[len("rank:"):], top_k=10, explain=explain)
+                for rank, result in enumerate(results, 1):
+                    print(f"{rank}. [{result['score']:.3f}] Chunk ID: {result['chunk_id']}\nSnippet: {result['text'][:500]}...")
+                if not results:
+                    print("No results found for your query.")
+                continue
+
+            results = query_boolean_index(inverted_index, chunk_id_table, query, explain=explain)
         
-        if results:
-            print(f"\nFound {len(results)} matching chunks:")
-            for result in results:
-                print(f"Chunk ID: {result['chunk_id']}\nSnippet: {result['text']}")
-        else:
-            print("No results found for your query.")
+            if results:
+                print(f"\nFound {len(results)} matching chunks:")
+                for result in results:
+                    print(f"Chunk ID: {result['chunk_id']}\nSnippet: {result['text']}")
+            else:
+                print("No results found for your query.")
+        except ValueError as e:
+            print(f"Query error: {e}")
 
 if __name__ == "__main__":
     # Use current directory for index files
@@ -1,38 +1,20 @@
 import os
 import re
 import json
-import nltk
-import pdfplumber
-import pandas as pd
-from nltk.stem import WordNetLemmatizer
-from nltk.corpus import stopwords
-from sortedcontainers import SortedSet
-
-nltk.download('stopwords')
-nltk.download('wordnet')
-
-lemmatizer = WordNetLemmatizer()
-stop_words = set(stopwords.words("english"))
+import argparse
+from typing import List
+from collections import Counter
+from itertools import islice, repeat
+from concurrent.futures import ProcessPoolExecutor
+from pdfExtraction import extract_contents
+from compactIndex import CompactIndex
+from chunkStore import write_chunk_store
+from analyzer import get_analyzer
 
 ### ------------------------ Hybrid Chunking Functions ------------------------
 
 def extract_content_from_pdf(pdf_path: str) -> str:
-    full_content = []
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text() or ""
-                if text:
-                    full_content.append(text)
-                tables = page.extract_tables()
-                for table in tables:
-                    if table:
-                        df = pd.DataFrame(table).fillna('').replace(r'^\s*$', '', regex=True)
-                        full_content.append(f"\n@TABLE_START:\n{df.to_string(index=False, header=False)}\n@TABLE_END\n")
-    except Exception as e:
-        print(f"Error processing PDF {pdf_path}: {e}")
-        return ""
-    return "\n".join(full_content)
+    return extract_contents([pdf_path], table_format="marked", workers=1)[pdf_path]
 
 def mark_bullet_points_and_table(text):
     bullet_pattern = r'(?:^|\n)(?:[ \t]*(?:•|\-|\*)[ \t].*(?:\n[ \t]+.*)*\n?)+'
@@ -41,8 +23,11 @@ def mark_bullet_points_and_table(text):
     text = re.sub(numbered_pattern, r'\n@NUMBERED_START\n\g<0>\n@NUMBERED_END\n', text)
     return text
 
-def group_text(pdf_file):
-    delimitered_text = mark_bullet_points_and_table(extract_content_from_pdf(pdf_file))
+def group_text(pdf_file, content=None):
+    # content can be passed in when it was already extracted (e.g. in parallel for the whole folder)
+    if content is None:
+        content = extract_content_from_pdf(pdf_file)
+    delimitered_text = mark_bullet_points_and_table(content)
     split_text = re.split(r'(@BULLET_START|@BULLET_END|@NUMBERED_START|@NUMBERED_END|@TABLE_START|@TABLE_END)', delimitered_text)
     grouped = []
     i = 0
@@ -56,8 +41,8 @@ def group_text(pdf_file):
             i += 1
     return grouped
 
-def chunk_text_hybrid(pdf_path: str, chunk_size=1500, chunk_overlap=500) -> list[dict]:
-    split_text = group_text(pdf_path)
+def chunk_text_hybrid(pdf_path: str, chunk_size=1500, chunk_overlap=500, content=None) -> list[dict]:
+    split_text = group_text(pdf_path, content)
     final_chunks = []
     prev_tail = ""
 
@@ -84,52 +69,143 @@ def chunk_text_hybrid(pdf_path: str, chunk_size=1500, chunk_overlap=500) -> list
 ### ------------------------ Boolean Indexing ------------------------
 
 def tokenize(text):
-    words = text.lower().split()
-    return [
-        lemmatizer.lemmatize(word, pos="v")
-        for word in words if word.isalpha() and word not in stop_words
-    ]
-
-def build_boolean_index(pdf_folder_path: str, chunk_size=1500, chunk_overlap=500):
-    inverted_index = {}
+    # the shared analyzer (analyzer.py), so queries are analyzed exactly like the indexed chunks
+    return get_analyzer().analyze(text)
+
+def index_pdf(file_path: str, chunk_size=1500, chunk_overlap=500, content=None):
+    """
+    Partial index of one PDF, its chunks numbered from 0: (chunk texts, chunk lengths, term -> {chunk: tf},
+    term -> {chunk: token positions}). merge_partial_index renumbers the chunks into the global index.
+    """
+    texts, lengths, frequencies, positions = [], [], {}, {}
+    for chunk_number, chunk in enumerate(chunk_text_hybrid(file_path, chunk_size, chunk_overlap, content=content)):
+        tokens = tokenize(chunk["text"])
+        texts.append(chunk["text"])
+        lengths.append(len(tokens))
+        for token, frequency in Counter(tokens).items():
+            frequencies.setdefault(token, {})[chunk_number] = frequency
+        for position, token in enumerate(tokens):
+            positions.setdefault(token, {}).setdefault(chunk_number, []).append(position)
+    return texts, lengths, frequencies, positions
+
+def _index_pdfs_task(file_paths: List[str], chunk_size: int, chunk_overlap: int):
+    # map step, runs in a worker process: extract, chunk and tokenize a few consecutive PDFs. Also hands back the
+    # lemmas this task added to the worker's analyzer (each miss appends one entry) so the parent can persist them.
+    analyzer = get_analyzer()
+    misses = analyzer.misses
+    contents = extract_contents(file_paths, table_format="marked", workers=1)
+    partials = [index_pdf(file_path, chunk_size, chunk_overlap, contents[file_path]) for file_path in file_paths]
+    new_lemmas = list(islice(reversed(analyzer.lemmas.items()), min(analyzer.misses - misses, len(analyzer.lemmas))))
+    return partials, new_lemmas[::-1]
+
+def merge_partial_index(filename, partial, inverted_index, chunk_id_table, chunk_lengths, positions):
+    # reduce step: chunks continue the global numbering, so ids only depend on the (sorted) file order
+    texts, lengths, frequencies, chunk_positions = partial
+    chunk_ids = [f"{filename}::chunk_{len(chunk_id_table) + chunk_number}" for chunk_number in range(len(texts))]
+    for chunk_id, text, length in zip(chunk_ids, texts, lengths):
+        chunk_id_table[chunk_id] = text
+        chunk_lengths[chunk_id] = length
+    for token, chunk_frequencies in frequencies.items():
+        postings = inverted_index.setdefault(token, {})
+        for chunk_number, frequency in chunk_frequencies.items():
+            postings[chunk_ids[chunk_number]] = frequency
+    for token, token_positions in chunk_positions.items():
+        postings = positions.setdefault(token, {})
+        for chunk_number, offsets in token_positions.items():
+            postings[chunk_ids[chunk_number]] = offsets
+
+def build_chunk_lexical_index(texts: List[str], chunk_ids: List[int], path: str) -> None:
+    """
+    BM25 index (no positions) over chunks made elsewhere, numbered by the given ids. main.py builds one over the
+    dense index's chunks keyed by their faiss ids, so hybrid retrieval can fuse both searches on the chunk id.
+    """
+    chunk_ids = [str(chunk_id) for chunk_id in chunk_ids]
+    inverted_index, chunk_lengths = {}, {}
+    for text, chunk_id in zip(texts, chunk_ids):
+        tokens = tokenize(text)
+        chunk_lengths[chunk_id] = len(tokens)
+        for token, tf in Counter(tokens).items():
+            inverted_index.setdefault(token, {})[chunk_id] = tf
+    CompactIndex.from_inverted_index(inverted_index, chunk_ids, chunk_lengths).save(path)
+
+def build_boolean_index(pdf_folder_path: str, chunk_size=1500, chunk_overlap=500, workers=None, parallel=False, output_dir=None):
+    """
+    Builds every index file in output_dir (default: next to this file). With parallel=True the PDFs are extracted,
+    chunked and tokenized in small batches on a pool of `workers` processes and the partial indexes are merged in
+    filename order; otherwise only the extraction is parallel. Both produce the same files.
+    """
+    inverted_index = {}  # term -> {chunk_id: term frequency}, the keys alone are the boolean postings
     chunk_id_table = {}  # Map of chunk_id -> chunk content
-
-    chunk_counter = 0
-    for filename in os.listdir(pdf_folder_path):
-        if filename.endswith(".pdf"):
-            file_path = os.path.join(pdf_folder_path, filename)  # ✅ Full path to each PDF
-            chunks = chunk_text_hybrid(file_path, chunk_size, chunk_overlap)
-
-            for chunk in chunks:
-                chunk_id = f"{filename}::chunk_{chunk_counter}"
-                chunk_id_table[chunk_id] = chunk["text"]
-                tokens = tokenize(chunk["text"])
-
-                for token in tokens:
-                    if token not in inverted_index:
-                        inverted_index[token] = SortedSet([chunk_id])
-                    else:
-                        inverted_index[token].add(chunk_id)
-
-                chunk_counter += 1
+    chunk_lengths = {}   # chunk_id -> number of indexed tokens, for BM25 length normalisation
+    positions = {}       # term -> {chunk_id: token positions}, for phrase and NEAR queries (chunk_index.bin only)
+
+    # sorted, so chunk numbering does not depend on directory order
+    filenames = sorted(filename for filename in os.listdir(pdf_folder_path) if filename.endswith(".pdf"))
+    file_paths = [os.path.join(pdf_folder_path, filename) for filename in filenames]  # ✅ Full path to each PDF
+    analyzer = get_analyzer()
+
+    if parallel:
+        workers = workers or os.cpu_count() or 1
+        # a few tasks per worker keeps them busy when PDF sizes differ, at most 8 PDFs per task
+        per_task = max(1, min(8, len(file_paths) // (workers * 4)))
+        batches = [file_paths[i:i + per_task] for i in range(0, len(file_paths), per_task)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map yields in submission order, so partial indexes are merged as they come in without losing determinism
+            tasks = executor.map(_index_pdfs_task, batches, repeat(chunk_size), repeat(chunk_overlap))
+            batch_filenames = (filenames[i:i + per_task] for i in range(0, len(filenames), per_task))
+            for names, (partials, new_lemmas) in zip(batch_filenames, tasks):
+                for filename, partial in zip(names, partials):
+                    merge_partial_index(filename, partial, inverted_index, chunk_id_table, chunk_lengths, positions)
+                analyzer.merge(new_lemmas)
+    else:
+        contents = extract_contents(file_paths, table_format="marked", workers=workers)
+        for filename, file_path in zip(filenames, file_paths):
+            partial = index_pdf(file_path, chunk_size, chunk_overlap, content=contents[file_path])
+            merge_partial_index(filename, partial, inverted_index, chunk_id_table, chunk_lengths, positions)
+    chunk_counter = len(chunk_id_table)
 
     # Save to JSON in current directory
-    current_dir = os.path.dirname(os.path.abspath(__file__))
+    current_dir = output_dir or os.path.dirname(os.path.abspath(__file__))
+    os.makedirs(current_dir, exist_ok=True)
     index_path = os.path.join(current_dir, "chunk_boolean_index.json")
     chunk_data_path = os.path.join(current_dir, "chunk_id_table.json")
+    stats_path = os.path.join(current_dir, "chunk_stats.json")
+    compact_path = os.path.join(current_dir, "chunk_index.bin")
+    chunk_store_path = os.path.join(current_dir, "chunk_texts.chunks")
 
+    # postings stay sorted by chunk id, as they were when they were stored as sorted lists
     with open(index_path, "w") as f:
-        json.dump({k: list(v) for k, v in inverted_index.items()}, f, indent=2)
+        json.dump({k: dict(sorted(v.items())) for k, v in inverted_index.items()}, f, indent=2)
 
     with open(chunk_data_path, "w") as f:
         json.dump(chunk_id_table, f, indent=2)
 
+    with open(stats_path, "w") as f:
+        json.dump({
+            "num_chunks": chunk_counter,
+            "avg_chunk_length": sum(chunk_lengths.values()) / max(chunk_counter, 1),
+            "chunk_lengths": chunk_lengths,
+        }, f, indent=2)
+
+    # what booleanQueryNew actually loads: integer chunk ids (numbered in build order), delta+varint postings and positions
+    CompactIndex.from_inverted_index(inverted_index, list(chunk_id_table), chunk_lengths, positions).save(compact_path)
+    # chunk texts by doc id (row i is chunk i), memory-mapped by the query side instead of parsing chunk_id_table.json
+    write_chunk_store(chunk_store_path, list(chunk_id_table.values()))
+
+    analyzer = get_analyzer()
+    analyzer.save() # warm lemma cache for the next build and for the query side
+    stats = analyzer.stats()
+    print(f"Analyzer: {stats['entries']} distinct words cached, {stats['hits']} of {stats['hits'] + stats['misses']} tokens analyzed from cache")
     print(f"✅ Boolean index created with {len(inverted_index)} unique terms and {chunk_counter} chunks.")
     print(f"✅ Index files saved to {current_dir}")
     return inverted_index, chunk_id_table
 
-
 if __name__ == "__main__":
     # Automatically resolve path to ../pdfs from inside /boolean_model/
     pdf_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "pdfs"))
-    build_boolean_index(pdf_dir)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdf_dir", default=pdf_dir)
+    parser.add_argument("--parallel", action="store_true", help="map-reduce build: extract, chunk and tokenize in worker processes")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    build_boolean_index(args.pdf_dir, workers=args.workers, parallel=args.parallel)
@@ -0,0 +1,135 @@
+import os
+import json
+import mmap
+import struct
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+MAGIC = b"CHNKSTR1"
+
+# File layout (everything little-endian, sections 8-byte aligned):
+#   MAGIC | uint64 header length | JSON header {"count": n, "sections": {name: [offset, length]}} | sections...
+# Sections:
+#   ids            int64[n]     faiss ids, ascending (rows are sorted by id so an id is found by binary search)
+#   text_offsets   uint64[n+1]  row i is text[text_offsets[i]:text_offsets[i+1]]
+#   text           utf-8 blob
+#   source_offsets uint64[n+1]  (only when sources are stored)
+#   source         utf-8 blob
+
+
+def chunk_store_path_for(metadata_path: str) -> str:
+    # chunks_metadata4.pkl -> chunks_metadata4.chunks
+    return os.path.splitext(metadata_path)[0] + ".chunks"
+
+def lexical_index_path_for(metadata_path: str) -> str:
+    # chunks_metadata4.pkl -> chunks_metadata4.bm25.bin, the BM25 index over the same chunks (see main.py)
+    return os.path.splitext(metadata_path)[0] + ".bm25.bin"
+
+def offsets_and_blob(values: List[str]):
+    offsets = array('Q', [0])
+    parts = []
+    for value in values:
+        encoded = value.encode("utf-8")
+        parts.append(encoded)
+        offsets.append(offsets[-1] + len(encoded))
+    return offsets.tobytes(), b"".join(parts)
+
+def write_sections(path: str, magic: bytes, header: Dict, sections: Dict[str, bytes]) -> None:
+    """Writes MAGIC | uint64 header length | JSON header (header plus "sections") | 8-byte aligned sections."""
+    # section offsets depend on the header length, which depends on the offsets: fix the header size first, then fill it in
+    layout = {name: [0, len(data)] for name, data in sections.items()}
+    header_size = len(json.dumps({**header, "sections": layout})) + 64
+    position = len(magic) + 8 + header_size
+    for name, data in sections.items():
+        position += -position % 8
+        layout[name] = [position, len(data)]
+        position += len(data)
+    header_bytes = json.dumps({**header, "sections": layout}).encode("utf-8").ljust(header_size)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(magic + struct.pack("<Q", header_size) + header_bytes)
+        for name, data in sections.items():
+            f.write(b"\0" * (layout[name][0] - f.tell()))
+            f.write(data)
+    os.replace(tmp_path, path)
+
+def map_sections(path: str, magic: bytes, kind: str):
+    """Memory-maps a file written by write_sections, returns (file, mmap, header)."""
+    file = open(path, "rb")
+    mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:len(magic)] != magic:
+        mm.close()
+        file.close()
+        raise ValueError(f"{path} is not a {kind}")
+    header_size = struct.unpack_from("<Q", mm, len(magic))[0]
+    start = len(magic) + 8
+    return file, mm, json.loads(bytes(mm[start:start + header_size]))
+
+def write_chunk_store(path: str, texts: List[str], sources: Optional[List[str]] = None, ids: Optional[List[int]] = None) -> None:
+    rows = list(range(len(texts)))
+    if ids is not None:
+        rows.sort(key=lambda row: ids[row])
+
+    sections = {}
+    if ids is not None:
+        sections["ids"] = array('q', [ids[row] for row in rows]).tobytes()
+    sections["text_offsets"], sections["text"] = offsets_and_blob([texts[row] for row in rows])
+    if sources is not None:
+        sections["source_offsets"], sections["source"] = offsets_and_blob([sources[row] or "" for row in rows])
+    write_sections(path, MAGIC, {"count": len(texts)}, sections)
+
+
+class ChunkStore:
+    """
+    Read side of the chunk store: the file is memory-mapped and chunks are decoded only when asked for,
+    so several server processes share the same page-cache pages instead of each holding a private copy.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file, self.mm, header = map_sections(path, MAGIC, "chunk store")
+        self.count = header["count"]
+        self.sections = header["sections"]
+
+        view = self.view = memoryview(self.mm)
+        self.ids = self._section(view, "ids").cast('q') if "ids" in self.sections else None
+        self.text_offsets = self._section(view, "text_offsets").cast('Q')
+        self.text_blob = self._section(view, "text")
+        self.source_offsets = self._section(view, "source_offsets").cast('Q') if "source_offsets" in self.sections else None
+        self.source_blob = self._section(view, "source") if "source" in self.sections else None
+
+    def _section(self, view, name):
+        offset, length = self.sections[name]
+        return view[offset:offset + length]
+
+    def __len__(self):
+        return self.count
+
+    def text(self, row: int) -> str:
+        return str(self.text_blob[self.text_offsets[row]:self.text_offsets[row + 1]], "utf-8")
+
+    def source(self, row: int) -> Optional[str]:
+        if self.source_offsets is None:
+            return None
+        return str(self.source_blob[self.source_offsets[row]:self.source_offsets[row + 1]], "utf-8")
+
+    def row_of_id(self, chunk_id: int) -> int:
+        """Row holding the given faiss id, -1 if absent. Without stored ids, ids are row numbers."""
+        if self.ids is None:
+            return chunk_id if 0 <= chunk_id < self.count else -1
+        row = bisect_left(self.ids, chunk_id)
+        return row if row < self.count and self.ids[row] == chunk_id else -1
+
+    def nbytes(self) -> int:
+        return len(self.mm)
+
+    def close(self):
+        for name in ("ids", "text_offsets", "text_blob", "source_offsets", "source_blob"):
+            view = getattr(self, name)
+            if view is not None:
+                view.release()
+        self.view.release()
+        self.mm.close()
+        self.file.close()
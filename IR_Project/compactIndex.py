@@ -0,0 +1,275 @@
+from array import array
+from bisect import bisect_left
+from functools import cached_property
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from chunkStore import offsets_and_blob, write_sections, map_sections
+from bitmapPostings import Bitmap, is_dense
+
+MAGIC = b"CHNKIDX2"
+
+# Sections of a file written by chunkStore.write_sections (8-byte aligned, little-endian), header holds
+# {"num_docs", "num_terms", "avg_chunk_length"}. Loading maps the file and parses only that small header:
+#   chunk_id_offsets  uint64[num_docs + 1]   chunk id names ("file.pdf::chunk_n") of the dense doc ids
+#   chunk_ids         utf-8 blob
+#   chunk_lengths     uint32[num_docs]
+#   term_offsets      uint64[num_terms + 1]  the term dictionary, sorted, so a term is found by binary search
+#   terms             utf-8 blob
+#   doc_freqs         uint32[num_terms]
+#   postings_offsets  uint64[num_terms + 1]  term i is postings[postings_offsets[i]:postings_offsets[i+1]]
+#   postings          varint blob, per term: doc id gaps (first id, then differences), then the term frequency of each doc
+#   positions_offsets uint64[num_terms + 1]  (positional indexes only) term i is positions[positions_offsets[i]:...]
+#   positions         varint blob, per term and doc in postings order: tf token position gaps (first position, then differences)
+# Chunk ids are numbered densely in index build order; positions count tokens after analysis (stopwords removed).
+
+
+def encode_varint(value: int, out: bytearray) -> None:
+    # 7 bits per byte, high bit set on every byte but the last
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def decode_varints(buf, offset: int, count: int) -> Tuple[List[int], int]:
+    values = []
+    for _ in range(count):
+        value = 0
+        shift = 0
+        while True:
+            byte = buf[offset]
+            offset += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        values.append(value)
+    return values, offset
+
+def encode_postings(docs: Iterable[int], frequencies: Iterable[int]) -> bytes:
+    out = bytearray()
+    previous = 0
+    for doc in docs:
+        encode_varint(doc - previous, out)
+        previous = doc
+    for frequency in frequencies:
+        encode_varint(frequency, out)
+    return bytes(out)
+
+def decode_postings(buf, offset: int, df: int) -> Tuple[array, array]:
+    gaps, offset = decode_varints(buf, offset, df)
+    frequencies, _ = decode_varints(buf, offset, df)
+    docs = array('i', gaps)
+    for i in range(1, df):
+        docs[i] += docs[i - 1]
+    return docs, array('i', frequencies)
+
+def encode_positions(doc_positions: Iterable[Iterable[int]]) -> bytes:
+    out = bytearray()
+    for positions in doc_positions:
+        previous = 0
+        for position in positions:
+            encode_varint(position - previous, out)
+            previous = position
+    return bytes(out)
+
+def decode_positions(buf, offset: int, frequencies: Sequence[int]) -> List[array]:
+    gaps, _ = decode_varints(buf, offset, sum(frequencies))
+    doc_positions = []
+    start = 0
+    for tf in frequencies:
+        positions = array('i', gaps[start:start + tf])
+        for i in range(1, tf):
+            positions[i] += positions[i - 1]
+        doc_positions.append(positions)
+        start += tf
+    return doc_positions
+
+
+class StringTable:
+    """Read-only sequence of the strings in an offsets + utf-8 blob section pair, decoded on access."""
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class CompactIndex:
+    """
+    Inverted index over dense integer chunk ids. Postings are sorted array('i') of doc ids with a parallel
+    array of term frequencies, so set operations compare machine ints instead of "file.pdf::chunk_n" strings.
+    A loaded index is memory-mapped: terms are found by binary search in the on-disk dictionary and only the
+    postings of terms a query touches are read and decoded. Positional indexes also keep the token positions of
+    every term in every doc, for phrase and NEAR queries.
+    """
+
+    def __init__(self, chunk_ids: Sequence[str], chunk_lengths: Sequence[int], avg_chunk_length: Optional[float] = None):
+        self.chunk_ids = chunk_ids
+        self.chunk_lengths = chunk_lengths
+        self.num_docs = len(chunk_ids)
+        self.avg_chunk_length = avg_chunk_length if avg_chunk_length is not None else sum(chunk_lengths) / max(self.num_docs, 1)
+        self.decoded = {}  # term -> (docs, frequencies)
+        self.bitmaps = {}  # term -> Bitmap, for dense terms once boolean queries touch them
+        self.has_positions = False
+        self.decoded_positions = {}  # term -> [positions array per doc of postings(term)]
+        self.score_bounds = {}  # (term, k1, b) -> highest BM25 contribution of term, see maxScore.py
+        # on-disk term dictionary, set by load()
+        self.term_table = None
+        self.doc_freqs = None
+        self.postings_offsets = None
+        self.postings_blob = None
+        self.positions_offsets = None
+        self.positions_blob = None
+
+    @classmethod
+    def from_inverted_index(cls, inverted_index: Dict, chunk_ids: List[str], chunk_lengths: Optional[Dict[str, int]] = None,
+                            positions: Optional[Dict[str, Dict[str, List[int]]]] = None):
+        """
+        Converts the JSON-style index (term -> {chunk_id: tf}, or term -> [chunk_id] for old indexes where every
+        tf is 1). chunk_ids fixes the numbering; missing lengths are recovered by summing term frequencies.
+        positions (term -> {chunk_id: sorted token positions}, one per occurrence) makes the index positional.
+        """
+        doc_of_chunk = {chunk_id: doc for doc, chunk_id in enumerate(chunk_ids)}
+        lengths = [0] * len(chunk_ids)
+        postings = {}
+        for term, chunk_postings in inverted_index.items():
+            items = chunk_postings.items() if isinstance(chunk_postings, dict) else ((chunk_id, 1) for chunk_id in chunk_postings)
+            pairs = sorted((doc_of_chunk[chunk_id], tf) for chunk_id, tf in items)
+            postings[term] = (array('i', [doc for doc, _ in pairs]), array('i', [tf for _, tf in pairs]))
+            for doc, tf in pairs:
+                lengths[doc] += tf
+        if chunk_lengths is not None:
+            lengths = [chunk_lengths.get(chunk_id, lengths[doc]) for doc, chunk_id in enumerate(chunk_ids)]
+        index = cls(chunk_ids, lengths)
+        index.decoded = postings
+        if positions is not None:
+            index.has_positions = True
+            for term, (docs, _) in postings.items():
+                term_positions = positions[term]
+                index.decoded_positions[term] = [array('i', term_positions[chunk_ids[doc]]) for doc in docs]
+        return index
+
+    @cached_property
+    def doc_of_chunk(self) -> Dict[str, int]:
+        # built on first use only, a loaded index would otherwise decode every chunk id at startup
+        return {chunk_id: doc for doc, chunk_id in enumerate(self.chunk_ids)}
+
+    def _term_number(self, term: str) -> int:
+        # position of term in the on-disk dictionary, -1 when absent
+        if self.term_table is None:
+            return -1
+        i = bisect_left(self.term_table, term)
+        return i if i < len(self.term_table) and self.term_table[i] == term else -1
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.decoded or self._term_number(term) >= 0
+
+    def __len__(self) -> int:
+        return len(self.terms())
+
+    def terms(self) -> List[str]:
+        return sorted(set(self.term_table or ()) | set(self.decoded))
+
+    def _entry(self, term: str) -> Tuple[array, array]:
+        entry = self.decoded.get(term)
+        if entry is None:
+            i = self._term_number(term)
+            if i < 0:
+                return array('i'), array('i')
+            entry = self.decoded[term] = decode_postings(self.postings_blob, self.postings_offsets[i], self.doc_freqs[i])
+        return entry
+
+    def postings(self, term: str) -> array:
+        """Sorted doc ids containing term (empty when the term is not indexed)."""
+        return self._entry(term)[0]
+
+    def boolean_postings(self, term: str):
+        """
+        Postings in the shape boolean evaluation wants: a Bitmap for dense terms (see bitmapPostings.py),
+        the sorted doc id array otherwise. Ranking keeps using postings() / frequencies().
+        """
+        if not is_dense(self.doc_freq(term), self.num_docs):
+            return self.postings(term)
+        bitmap = self.bitmaps.get(term)
+        if bitmap is None:
+            bitmap = self.bitmaps[term] = Bitmap.from_docs(self.postings(term), self.num_docs)
+        return bitmap
+
+    def frequencies(self, term: str) -> array:
+        """Term frequencies, parallel to postings(term)."""
+        return self._entry(term)[1]
+
+    def positions(self, term: str, doc: int) -> array:
+        """Sorted token positions of term in doc (empty when term does not occur in doc)."""
+        if not self.has_positions:
+            raise ValueError("the index has no token positions, rebuild it for phrase and NEAR queries")
+        docs = self.postings(term)
+        i = bisect_left(docs, doc)
+        if i == len(docs) or docs[i] != doc:
+            return array('i')
+        doc_positions = self.decoded_positions.get(term)
+        if doc_positions is None:
+            offset = self.positions_offsets[self._term_number(term)]
+            doc_positions = self.decoded_positions[term] = decode_positions(self.positions_blob, offset, self.frequencies(term))
+        return doc_positions[i]
+
+    def doc_freq(self, term: str) -> int:
+        if term in self.decoded:
+            return len(self.decoded[term][0])
+        i = self._term_number(term)
+        return self.doc_freqs[i] if i >= 0 else 0
+
+    def save(self, path: str) -> None:
+        terms = self.terms()
+        blobs = [encode_postings(*self._entry(term)) for term in terms]
+        postings_offsets = array('Q', [0])
+        for blob in blobs:
+            postings_offsets.append(postings_offsets[-1] + len(blob))
+
+        sections = {}
+        sections["chunk_id_offsets"], sections["chunk_ids"] = offsets_and_blob(self.chunk_ids)
+        sections["chunk_lengths"] = array('I', self.chunk_lengths).tobytes()
+        sections["term_offsets"], sections["terms"] = offsets_and_blob(terms)
+        sections["doc_freqs"] = array('I', [self.doc_freq(term) for term in terms]).tobytes()
+        sections["postings_offsets"] = postings_offsets.tobytes()
+        sections["postings"] = b"".join(blobs)
+        if self.has_positions:
+            position_blobs = [encode_positions(self.positions(term, doc) for doc in self.postings(term)) for term in terms]
+            positions_offsets = array('Q', [0])
+            for blob in position_blobs:
+                positions_offsets.append(positions_offsets[-1] + len(blob))
+            sections["positions_offsets"] = positions_offsets.tobytes()
+            sections["positions"] = b"".join(position_blobs)
+        header = {"num_docs": self.num_docs, "num_terms": len(terms), "avg_chunk_length": self.avg_chunk_length}
+        write_sections(path, MAGIC, header, sections)
+
+    @classmethod
+    def load(cls, path: str):
+        """Maps the index file; costs the same for any index size, postings are read when first queried."""
+        file, mm, header = map_sections(path, MAGIC, "compact chunk index")
+        view = memoryview(mm)
+
+        def section(name, typecode=None):
+            offset, length = header["sections"][name]
+            data = view[offset:offset + length]
+            return data.cast(typecode) if typecode else data
+
+        index = cls(StringTable(section("chunk_id_offsets", 'Q'), section("chunk_ids")),
+                    section("chunk_lengths", 'I'), header["avg_chunk_length"])
+        index.term_table = StringTable(section("term_offsets", 'Q'), section("terms"))
+        index.doc_freqs = section("doc_freqs", 'I')
+        index.postings_offsets = section("postings_offsets", 'Q')
+        index.postings_blob = section("postings")
+        if "positions" in header["sections"]:
+            index.has_positions = True
+            index.positions_offsets = section("positions_offsets", 'Q')
+            index.positions_blob = section("positions")
+        index.file, index.mm = file, mm  # keep the mapping alive as long as the index
+        return index
@@ -0,0 +1,133 @@
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from typing import Dict, List, Optional
+
+
+def normalize_text(text: str) -> str:
+    # newlines and runs of whitespace do not change the meaning of the text, so they should not change the key
+    return " ".join(text.split())
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache shared by ingestion (main.py) and querying (query.py / queryNew.py).
+    Keyed by (model name, hash of the normalized text), vectors are stored as float32 blobs in SQLite.
+    When more than max_entries vectors are stored, the least recently used ones are evicted (down to 90% of max_entries).
+    """
+
+    def __init__(self, path: str = "embedding_cache.sqlite", max_entries: int = 200_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL") # lets the server and the indexer use the cache at the same time
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self.conn.commit()
+        # running row count, so a write does not need a full-table COUNT(*); only counts this process's inserts,
+        # evict() recounts before deleting anything
+        self.count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        keys = [text_key(text) for text in texts]
+        found = {}
+        with self.lock:
+            for i in range(0, len(keys), 500): # stay under SQLite's bound-parameter limit
+                batch = keys[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model, *batch]
+                ).fetchall()
+                found.update({text_hash: np.frombuffer(vector, dtype=np.float32) for text_hash, vector in rows})
+            if found:
+                now = time.time()
+                self.conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash) for text_hash in found]
+                )
+                self.conn.commit()
+            results = [found.get(key) for key in keys]
+            hit_count = sum(result is not None for result in results)
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+        return results
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        return self.get_many(model, [text])[0]
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> None:
+        now = time.time()
+        rows = [
+            (model, text_key(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self.lock:
+            # INSERT OR REPLACE of a stored key does not add a row, look the keys up by primary key first
+            keys = list({row[1] for row in rows})
+            existing = 0
+            for i in range(0, len(keys), 500): # stay under SQLite's bound-parameter limit
+                batch = keys[i:i + 500]
+                existing += self.conn.execute(
+                    f"SELECT COUNT(*) FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model, *batch]
+                ).fetchone()[0]
+            self.conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self.count += len(keys) - existing
+            if self.count > self.max_entries:
+                self.evict()
+            self.conn.commit()
+
+    def put(self, model: str, text: str, vector: List[float]) -> None:
+        self.put_many(model, [text], [vector])
+
+    def evict(self) -> None:
+        # only runs once the running count passes max_entries; recounts since other processes may share the file.
+        # Evicts down to 90% of max_entries, so a full cache does not recount on every new vector.
+        count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count > self.max_entries:
+            target = int(self.max_entries * 0.9)
+            self.conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (count - target,)
+            )
+            count = target
+        self.count = count
+
+    def stats(self) -> Dict[str, float]:
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": entries,
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache() -> EmbeddingCache:
+    """One cache per process, opened on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache()
+    return _default_cache
@@ -0,0 +1,76 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+from typing import Dict, List, Optional
+
+
+def batch_fingerprint(chunks: List[str]) -> str:
+    # ties a shard to the exact texts it was computed from, so stale shards are never reused
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class EmbeddingCheckpoint:
+    """
+    Append-only embedding checkpoint.
+    Every finished batch is written once as its own float32 .npy shard and recorded as one line in manifest.jsonl,
+    so the cost of a checkpoint is proportional to the batch, not to everything embedded so far.
+    Resuming reads only the manifest and memory-maps the shards.
+    """
+
+    def __init__(self, shard_dir: str = "embedding_checkpoint"):
+        self.shard_dir = shard_dir
+        self.manifest_path = os.path.join(shard_dir, "manifest.jsonl")
+        os.makedirs(shard_dir, exist_ok=True)
+        self.shards = self.load_manifest() # start index -> manifest entry
+
+    def load_manifest(self) -> Dict[int, Dict]:
+        shards = {}
+        if not os.path.exists(self.manifest_path):
+            return shards
+        with open(self.manifest_path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break # a crash while appending leaves at most one torn line at the end
+                if os.path.exists(os.path.join(self.shard_dir, entry["file"])):
+                    shards[entry["start"]] = entry
+        return shards
+
+    def append(self, start: int, chunks: List[str], embeddings: List[List[float]]) -> None:
+        file_name = f"shard_{start:09d}.npy"
+        tmp_path = os.path.join(self.shard_dir, file_name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.asarray(embeddings, dtype=np.float32))
+        os.replace(tmp_path, os.path.join(self.shard_dir, file_name)) # the shard is complete before the manifest points at it
+
+        entry = {"file": file_name, "start": start, "count": len(embeddings), "fingerprint": batch_fingerprint(chunks)}
+        with open(self.manifest_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.shards[start] = entry
+
+    def is_done(self, start: int, chunks: List[str]) -> bool:
+        entry = self.shards.get(start)
+        return entry is not None and entry["count"] == len(chunks) and entry["fingerprint"] == batch_fingerprint(chunks)
+
+    def load_shard(self, start: int) -> np.ndarray:
+        return np.load(os.path.join(self.shard_dir, self.shards[start]["file"]), mmap_mode="r")
+
+    def load_embeddings(self, starts: List[int]) -> Optional[np.ndarray]:
+        """Concatenates the memory-mapped shards for the given batch starts, in that order."""
+        if not starts:
+            return None
+        return np.concatenate([self.load_shard(start) for start in starts])
+
+    def reset(self) -> None:
+        shutil.rmtree(self.shard_dir, ignore_errors=True)
+        os.makedirs(self.shard_dir, exist_ok=True)
+        self.shards = {}
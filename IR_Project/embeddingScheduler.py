@@ -0,0 +1,126 @@
+import time
+import heapq
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, List, Optional
+from openai import OpenAI
+
+
+class TokenBucket:
+    """Classic token bucket: refills at rate_per_minute / 60 per second, holds at most `capacity` tokens."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount: float = 1) -> None:
+        amount = min(amount, self.capacity)  # a single oversized request must still be able to go through
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait_time = (amount - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+def estimate_tokens(texts: List[str]) -> int:
+    # ~4 characters per token for English text, good enough for rate limiting without tiktoken
+    return sum(len(text) // 4 + 1 for text in texts)
+
+
+class EmbeddingScheduler:
+    """
+    Sends embedding batches concurrently with at most `max_in_flight` requests outstanding,
+    while staying under the requests-per-minute and tokens-per-minute limits of the API.
+    A failed batch is re-queued with exponential backoff instead of sleeping in place,
+    so the other batches keep going while it waits.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "text-embedding-ada-002",
+        max_in_flight: int = 4,
+        requests_per_minute: int = 3000,
+        tokens_per_minute: int = 1_000_000,
+        max_retries: int = 3,
+        initial_retry_delay: float = 20,
+        base_url: Optional[str] = None,
+    ):
+        if not api_key:
+            raise ValueError("OpenAI API key is required")
+        # retries are handled here per batch, so the client itself must not retry
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self.model = model
+        self.max_in_flight = max_in_flight
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.initial_retry_delay = initial_retry_delay
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        self.request_bucket.acquire(1)
+        self.token_bucket.acquire(estimate_tokens(batch))
+        response = self.client.embeddings.create(input=batch, model=self.model)
+        return [item.embedding for item in response.data]
+
+    def embed_batches(
+        self,
+        batches: List[List[str]],
+        on_batch_done: Optional[Callable[[int, List[List[float]]], None]] = None,
+    ) -> List[List[List[float]]]:
+        """
+        Embeds every batch and returns the results in batch order.
+        on_batch_done(batch_index, embeddings) is called from the scheduling thread as each batch finishes,
+        in completion order (not batch order).
+        """
+        results = [None] * len(batches)
+        ready = [(0.0, batch_index, 0) for batch_index in range(len(batches))]  # heap of (not_before, batch_index, attempt)
+        heapq.heapify(ready)
+        in_flight = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            while ready or in_flight:
+                now = time.monotonic()
+                while ready and ready[0][0] <= now and len(in_flight) < self.max_in_flight:
+                    _, batch_index, attempt = heapq.heappop(ready)
+                    future = executor.submit(self._embed_batch, batches[batch_index])
+                    in_flight[future] = (batch_index, attempt)
+
+                # wake up either when a request finishes or, with a slot free, when the next retry becomes due
+                # (with every slot taken a due batch cannot start anyway, so only a finished request matters)
+                timeout = max(0.0, ready[0][0] - now) if ready and len(in_flight) < self.max_in_flight else None
+                if not in_flight:
+                    time.sleep(timeout)
+                    continue
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    batch_index, attempt = in_flight.pop(future)
+                    try:
+                        results[batch_index] = future.result()
+                    except Exception as e:
+                        if "insufficient_quota" in str(e):
+                            for pending in in_flight:
+                                pending.cancel()
+                            raise RuntimeError("API quota exhausted") from e
+                        if attempt == self.max_retries - 1:
+                            for pending in in_flight:
+                                pending.cancel()
+                            raise
+                        retry_delay = self.initial_retry_delay * (2 ** attempt) * random.uniform(0.8, 1.2)  # jitter so failed batches don't retry in lockstep
+                        print(f"Batch {batch_index} failed ({e}), retrying in {retry_delay:.1f}s...")
+                        heapq.heappush(ready, (time.monotonic() + retry_delay, batch_index, attempt + 1))
+                        continue
+                    if on_batch_done:
+                        on_batch_done(batch_index, results[batch_index])
+
+        return results
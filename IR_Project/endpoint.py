@@ -1,5 +1,9 @@
-from flask import Flask , request
-from query import query
+import json
+import time
+from flask import Flask , request, jsonify, Response, stream_with_context
+from query import query, query_stream, user_query_text
+from retriever import FaissRetriever
+from embeddingCache import get_default_cache
 from flask_cors import CORS
 
 app = Flask(__name__)
@@ -7,14 +11,53 @@ CORS(app)  # This will allow all origins by default
 
 api_key = ""
 
+# loaded once at startup, every request is served from memory
+retriever = FaissRetriever("vector_index4.faiss", "chunks_metadata4.pkl")
+print(f"Retriever loaded: {retriever.stats()}")
+
 @app.route("/respond", methods=['POST'])
 def respond():
 
     data = request.get_json(force=True)  # This works with POST
-    userQuery = data.get('message')
-    response = query(userQuery, api_key)
-    print(response[-1])
-    return response[-1]['content']
+    userQuery = user_query_text(data.get('message'))
+    response = query(userQuery, api_key, retriever=retriever)
+    print(response)
+    return response
+
+def sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.route("/respond/stream", methods=['POST'])
+def respond_stream():
+    '''
+    Same answer as /respond, sent as Server-Sent Events while the model generates it:
+    "token" events carry {"text": ...}, the final "done" event carries the timings
+    (time to first token and total, in ms, measured from the moment the request arrived).
+    '''
+    data = request.get_json(force=True)
+    userQuery = user_query_text(data.get('message'))
+    start = time.perf_counter()
+
+    def generate():
+        first_token_ms = None
+        try:
+            for text in query_stream(userQuery, api_key, retriever=retriever):
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - start) * 1000
+                yield sse("token", {"text": text})
+        except Exception as e:
+            print("Error during streaming:", e)
+            yield sse("error", {"message": str(e)})
+        timings = {"ttft_ms": round(first_token_ms, 1) if first_token_ms is not None else None, "total_ms": round((time.perf_counter() - start) * 1000, 1)}
+        print(f"Streamed response: {timings}")
+        yield sse("done", timings)
+
+    # no-cache / X-Accel-Buffering stop proxies from holding tokens back until the response ends
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/stats", methods=['GET'])
+def stats():
+    return jsonify({**retriever.stats(), "embedding_cache": get_default_cache().stats()})
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -3,16 +3,18 @@
 # env\Scripts \ activate        # activate (Windows)
 # pip install faiss-cpu nltk rouge-score numpy openai transformers sentence-transformers
 # replace api_key with actual api key: 
-# python evaluation.py
+# python evaluation.py --workers 4      (resumes from output.jsonl, --fresh starts over)
 # to exit environment: deactivate
 # '''
 
-from query import query
+import argparse
+from query import build_messages
+from retriever import FaissRetriever
+from openaiClients import get_client
+from responseCache import cached_completion
+from evaluationRunner import run_evaluation
+from evaluationMetrics import compute_metrics
 import faiss
-from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
-from rouge_score import rouge_scorer
-from sentence_transformers import SentenceTransformer, util
-import pandas as pd
 api_key = ""
 
 
@@ -100,53 +102,22 @@ benchmark_qna = {
 
 }
 
-query_scores = []
-
-for question, answer in benchmark_qna.items():
-    print(f"Question: {question}")
-    print(f"Expected Answer: {answer}")
-    print("Model Response:")
-    hypothesis_answer = query(question, api_key)
-    expected_answer = answer
-
-    model = SentenceTransformer('all-MiniLM-L6-v2')  # fast + good
-    emb1 = model.encode(expected_answer, convert_to_tensor=True)
-    emb2 = model.encode(hypothesis_answer, convert_to_tensor=True)
-
-    bert_score = util.pytorch_cos_sim(emb1, emb2)
-    print("BERT SCORE using MiniLM Model  ", bert_score.item())  # cosine similarity between 0 and 1
-
-    # Just split by space (no nltk tokenizer)
-    ref_tokens = [expected_answer.split()]
-    cand_tokens = hypothesis_answer.split()
-    smoothie = SmoothingFunction().method1  # simple smoothing
-    bleu_score = sentence_bleu(ref_tokens, cand_tokens, smoothing_function=smoothie)    
-
-    print(f"BLEU Score: {bleu_score:.4f}")
-    scorer = rouge_scorer.RougeScorer(['rouge1', 'rouge2', 'rougeL'], use_stemmer=True)
-    rouge_scores = scorer.score(expected_answer, hypothesis_answer)
-
-    print("ROUGE-1:", rouge_scores['rouge1'].fmeasure)
-    print("ROUGE-2:", rouge_scores['rouge2'].fmeasure)
-    print("ROUGE-L:", rouge_scores['rougeL'].fmeasure)
-    print("\n" + "="*50 + "\n")
-
-    query_score = {
-        "question": question,
-        "expected_answer" : expected_answer,
-        "model_answer" : hypothesis_answer,
-        "bert_score" : bert_score.item(),
-        "bleu_score" : bleu_score,
-        "rouge1" : rouge_scores['rouge1'].fmeasure,
-        "rouge2" : rouge_scores['rouge2'].fmeasure,
-        "rougeL" : rouge_scores['rougeL'].fmeasure,
-    }
-    query_scores.append(query_score)
-    print(query_scores)
-
-df = pd.DataFrame(query_scores)
-df.to_excel("output.xlsx", index=False)
-
-
-
-
+def evaluate(max_workers=4, fresh=False, metric_workers=None):
+    retriever = FaissRetriever("vector_index4.faiss", "chunks_metadata4.pkl") # one resident index for all questions
+
+    def answer_question(question):
+        # what query() does, with the completion served from the response cache when the prompt was answered before
+        m = build_messages(question, api_key, retriever=retriever)
+        return cached_completion(get_client(api_key), m, model="gpt-4o-mini-2024-07-18")
+
+    # all answers are scored in one batched pass at the end (evaluationMetrics.py)
+    metrics = lambda expected, hypotheses: compute_metrics(expected, hypotheses, workers=metric_workers)
+    return run_evaluation(benchmark_qna, answer_question, metrics, "output.jsonl", excel_path="output.xlsx", max_workers=max_workers, fresh=fresh)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4, help="concurrent LLM calls")
+    parser.add_argument("--metric_workers", type=int, default=None, help="processes for BLEU/ROUGE (default: one per core)")
+    parser.add_argument("--fresh", action="store_true", help="ignore output.jsonl and evaluate every question again")
+    args = parser.parse_args()
+    evaluate(args.workers, args.fresh, args.metric_workers)
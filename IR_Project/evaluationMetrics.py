@@ -0,0 +1,65 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
+from rouge_score import rouge_scorer
+from sentence_transformers import SentenceTransformer
+
+# The metrics stage of the evaluation scripts, run once over every (expected, model) answer pair instead of per
+# question: the sentence model is loaded once and encodes all answers in one batched call, the cosine similarities
+# of the pairs come out of one matrix operation, and BLEU/ROUGE (pure Python) are spread over a process pool.
+
+SENTENCE_MODEL = "all-MiniLM-L6-v2"
+
+_sentence_models = {}
+_sentence_models_lock = threading.Lock()
+_scorer = None
+
+
+def get_sentence_model(model_name: str = SENTENCE_MODEL):
+    """One SentenceTransformer per model name per process, loaded on first use."""
+    with _sentence_models_lock:
+        if model_name not in _sentence_models:
+            _sentence_models[model_name] = SentenceTransformer(model_name)
+    return _sentence_models[model_name]
+
+def bert_scores(expected: List[str], hypotheses: List[str], model_name: str = SENTENCE_MODEL, batch_size: int = 64) -> List[float]:
+    """Cosine similarity of each expected/model answer pair, using MiniLM embeddings."""
+    if not expected:
+        return []
+    embeddings = get_sentence_model(model_name).encode(expected + hypotheses, batch_size=batch_size, convert_to_tensor=True, normalize_embeddings=True)
+    # unit vectors, so the row-wise dot product of the two halves is the cosine of every pair
+    return (embeddings[:len(expected)] * embeddings[len(expected):]).sum(dim=1).tolist()
+
+def bleu_rouge(pair) -> Dict[str, float]:
+    # runs in a worker process, the scorer is built once per process
+    global _scorer
+    if _scorer is None:
+        _scorer = rouge_scorer.RougeScorer(['rouge1', 'rouge2', 'rougeL'], use_stemmer=True)
+    expected_answer, hypothesis_answer = pair
+    rouge_scores = _scorer.score(expected_answer, hypothesis_answer)
+    return {
+        "bleu_score": sentence_bleu([expected_answer.split()], hypothesis_answer.split(), smoothing_function=SmoothingFunction().method1),
+        "rouge1": rouge_scores['rouge1'].fmeasure,
+        "rouge2": rouge_scores['rouge2'].fmeasure,
+        "rougeL": rouge_scores['rougeL'].fmeasure,
+    }
+
+def compute_metrics(expected: List[str], hypotheses: List[str], workers: Optional[int] = None, model_name: str = SENTENCE_MODEL) -> List[Dict[str, float]]:
+    """
+    {"bert_score", "bleu_score", "rouge1", "rouge2", "rougeL"} for every pair, in order.
+    BLEU/ROUGE run on `workers` processes (default: one per core, workers=1 runs them in-process).
+    """
+    pairs = list(zip(expected, hypotheses))
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(pairs) < 2 * workers:
+        bert = bert_scores(expected, hypotheses, model_name)
+        lexical = [bleu_rouge(pair) for pair in pairs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # the workers score BLEU/ROUGE while this process encodes
+            lexical = executor.map(bleu_rouge, pairs, chunksize=max(1, len(pairs) // (workers * 4)))
+            bert = bert_scores(expected, hypotheses, model_name)
+            lexical = list(lexical)
+    return [{"bert_score": score, **scores} for score, scores in zip(bert, lexical)]
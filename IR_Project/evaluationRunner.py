@@ -0,0 +1,84 @@
+import os
+import json
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+# Shared by evaluation.py and booleanEvaluationNew.py. Answers are generated on a bounded thread pool (retrieval and
+# the LLM call are I/O bound) and each one is appended to a JSONL checkpoint as soon as it arrives, so a crash loses
+# at most the questions in flight. A rerun skips every question already in the checkpoint; with fresh=True it starts
+# over, and the LLM response cache (responseCache.py) makes that free for prompts that did not change.
+# Metrics are not checkpointed: they are computed in one batched pass over all answers at the end of every run
+# (evaluationMetrics.py), so a metric change only needs a rerun.
+
+
+def load_checkpoint(path: str) -> Dict[str, Dict]:
+    """question -> checkpointed record (question, expected and model answer) of every question already answered."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue # a line cut short by a crash, that question is simply evaluated again
+            done[record["question"]] = record
+    return done
+
+def run_evaluation(
+    benchmark_qna: Dict[str, str],
+    answer_fn: Callable[[str], str],
+    metrics_fn: Callable[[List[str], List[str]], List[Dict]],
+    checkpoint_path: str,
+    excel_path: Optional[str] = None,
+    max_workers: int = 4,
+    fresh: bool = False
+) -> List[Dict]:
+    """
+    Evaluates every question of benchmark_qna: answer_fn(question) -> model answer, called on max_workers threads,
+    then metrics_fn(expected answers, model answers) -> one metric dict per pair, called once for all of them.
+    Returns the scored records in benchmark order and, with excel_path, also writes them there.
+    Questions whose answer_fn raised are left out and retried next run.
+    """
+    if fresh and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    done = load_checkpoint(checkpoint_path)
+    pending = [question for question in benchmark_qna if question not in done]
+    print(f"Evaluation: {len(done)} of {len(benchmark_qna)} questions already in {checkpoint_path}, {len(pending)} to go")
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor, open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+        futures = {executor.submit(answer_fn, question): question for question in pending}
+        for future in as_completed(futures):
+            question = futures[future]
+            try:
+                answer = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Error answering {question!r}: {e}")
+                continue
+            record = {"question": question, "expected_answer": benchmark_qna[question], "model_answer": answer}
+            checkpoint.write(json.dumps(record) + "\n")
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+            done[question] = record
+            print(f"[{len(done)}/{len(benchmark_qna)}] {question}")
+
+    if failed:
+        print(f"{failed} questions failed, run again to retry them")
+    # the expected answer comes from benchmark_qna, so corrected references are picked up without new LLM calls
+    answered = [question for question in benchmark_qna if question in done]
+    expected = [benchmark_qna[question] for question in answered]
+    start = time.perf_counter()
+    scores = metrics_fn(expected, [done[question]["model_answer"] for question in answered])
+    print(f"Metrics for {len(answered)} answers in {time.perf_counter() - start:.1f}s")
+    results = [
+        {"question": question, "expected_answer": expected_answer, "model_answer": done[question]["model_answer"], **score}
+        for question, expected_answer, score in zip(answered, expected, scores)
+    ]
+    if excel_path:
+        pd.DataFrame(results).to_excel(excel_path, index=False)
+        print(f"Results saved to {excel_path}")
+    return results
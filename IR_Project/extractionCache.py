@@ -0,0 +1,85 @@
+import os
+import gzip
+import json
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+
+def file_digest(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Content-addressed cache of extracted PDF pages, shared by every indexer that goes through pdfExtraction.py.
+    An entry is keyed by the sha256 of the PDF bytes and the extractor version, so renaming or copying a file
+    still hits while editing it (or changing the extractor) misses. Each entry is one gzip-compressed JSON
+    file holding the page records (text, raw table cells and the seconds the extraction originally took).
+    """
+
+    def __init__(self, cache_dir: str = "extraction_cache", version: int = 1):
+        self.cache_dir = cache_dir
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, digest: str, include_tables: bool) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.v{self.version}.{'tables' if include_tables else 'text'}.json.gz")
+
+    def get(self, digest: str, include_tables: bool = True) -> Optional[List[Dict]]:
+        # an entry with tables also answers a text-only request
+        candidates = [self.path_for(digest, True)] + ([] if include_tables else [self.path_for(digest, False)])
+        for path in candidates:
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    records = json.load(f)
+            except (OSError, ValueError): # missing or truncated entry, treat as a miss
+                continue
+            if not include_tables:
+                records = [dict(record, tables=[]) for record in records]
+            with self.lock:
+                self.hits += 1
+                self.seconds_saved += sum(record.get("seconds", 0.0) for record in records)
+            return records
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, digest: str, include_tables: bool, records: List[Dict]) -> None:
+        path = self.path_for(digest, include_tables)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(records, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path) # readers never see a half-written entry
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        entries = [name for name in os.listdir(self.cache_dir) if name.endswith(".json.gz")]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "seconds_saved": round(self.seconds_saved, 2),
+            "entries": len(entries),
+            "size_mb": round(sum(os.path.getsize(os.path.join(self.cache_dir, name)) for name in entries) / (1024 * 1024), 2),
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_extraction_cache(version: int = 1) -> ExtractionCache:
+    """One cache per process, opened on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None or _default_cache.version != version:
+            _default_cache = ExtractionCache(version=version)
+    return _default_cache
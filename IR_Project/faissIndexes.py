@@ -0,0 +1,80 @@
+import math
+import faiss
+import numpy as np
+from typing import Dict, Optional
+
+# Supported index types:
+# flat     - exact brute-force L2 scan, no training (the original IndexFlatL2)
+# ivf_flat - vectors clustered into nlist inverted lists, only nprobe lists are scanned per query
+# ivf_pq   - like ivf_flat but vectors are product-quantized to m bytes-ish codes (much smaller, lossy)
+# hnsw     - navigable small-world graph, no training, fast but cannot remove vectors
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# IndexIDMap2.remove_ids compacts its id map on the assumption that the wrapped index shifts its vectors down, which
+# only the flat index does (IVF keeps its internal ids, HNSW cannot remove at all). Every other type is rebuilt instead.
+REMOVABLE_TYPES = ("flat",)
+
+DEFAULT_PARAMS = {
+    "flat": {},
+    "ivf_flat": {"nlist": None, "nprobe": 8},
+    "ivf_pq": {"nlist": None, "nprobe": 8, "m": 32, "nbits": 8},
+    "hnsw": {"hnsw_m": 32, "ef_construction": 200, "ef_search": 64},
+}
+
+
+def default_nlist(num_vectors: int) -> int:
+    # ~4*sqrt(n) lists, but faiss wants at least 39 training points per list
+    return max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))
+
+def build_faiss_index(embeddings: np.ndarray, ids: np.ndarray, index_type: str = "flat", index_params: Optional[Dict] = None):
+    """
+    Builds (and trains, where the type needs it) an index of the given type over `embeddings`.
+    The index is always wrapped in an IndexIDMap2 so vectors are addressed by their chunk id for every type.
+    Only REMOVABLE_TYPES support remove_ids through that wrapper.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+    params = {**DEFAULT_PARAMS[index_type], **(index_params or {})}
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    num_vectors, dimension = embeddings.shape
+
+    if index_type == "flat":
+        base = faiss.IndexFlatL2(dimension)
+    elif index_type == "hnsw":
+        base = faiss.IndexHNSWFlat(dimension, params["hnsw_m"])
+        base.hnsw.efConstruction = params["ef_construction"]
+        base.hnsw.efSearch = params["ef_search"]
+    else:
+        nlist = params["nlist"] or default_nlist(num_vectors)
+        quantizer = faiss.IndexFlatL2(dimension)
+        if index_type == "ivf_flat":
+            base = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        else:
+            if dimension % params["m"] != 0:
+                raise ValueError(f"ivf_pq needs m to divide the dimension ({dimension} % {params['m']} != 0)")
+            nbits = min(params["nbits"], max(1, int(math.log2(num_vectors)))) # a small corpus cannot train 2^8 centroids per sub-quantizer
+            base = faiss.IndexIVFPQ(quantizer, dimension, nlist, params["m"], nbits)
+        base.train(embeddings)
+        base.nprobe = min(params["nprobe"], nlist)
+
+    index = faiss.IndexIDMap2(base)
+    index.add_with_ids(embeddings, np.asarray(ids, dtype='int64'))
+    return index
+
+def index_type_of(index) -> str:
+    base = faiss.downcast_index(index.index) if hasattr(index, 'id_map') else index
+    if isinstance(base, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(base, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(base, faiss.IndexIVFFlat):
+        return "ivf_flat"
+    return "flat"
+
+def set_search_params(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+    """Query-time knobs: nprobe for IVF types, efSearch for HNSW. Both trade latency for recall."""
+    base = faiss.downcast_index(index.index) if hasattr(index, 'id_map') else index
+    if nprobe is not None and isinstance(base, faiss.IndexIVF):
+        base.nprobe = nprobe
+    if ef_search is not None and isinstance(base, faiss.IndexHNSW):
+        base.hnsw.efSearch = ef_search
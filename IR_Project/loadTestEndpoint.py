@@ -0,0 +1,87 @@
+'''
+Load test for the chat endpoints: fires --requests POSTs at each concurrency level and reports
+requests/sec and latency percentiles (plus time to first token for the /respond/stream route). Run it against a server whose OpenAI calls go to the stub,
+so the numbers measure the serving layer rather than the real API.
+
+to run:
+python stubOpenAIServer.py --port 8001 --latency 0.2
+OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=stub hypercorn asyncEndpoint:app --bind localhost:5000
+python loadTestEndpoint.py --url http://localhost:5000/respond --concurrency 1 4 16 64
+python loadTestEndpoint.py --url http://localhost:5000/respond/stream --concurrency 16 64 256
+(compare with: OPENAI_BASE_URL=http://localhost:8001/v1 python endpoint.py)
+'''
+import time
+import asyncio
+import argparse
+import httpx
+import numpy as np
+
+QUESTIONS = [
+    "What are the budget heads for an industry research proposal?",
+    "How many days of leave can an institute supported PhD student take?",
+    "Who can be appointed as an examiner for a PhD thesis?",
+    "Which documents are required for PhD thesis submission?",
+]
+
+
+async def post(client, url, payload):
+    '''Returns the seconds until the first streamed token, or None for a non-streaming route.'''
+    if not url.endswith("/stream"):
+        response = await client.post(url, json=payload)
+        response.raise_for_status()
+        return None
+    start = time.perf_counter()
+    first_token = None
+    async with client.stream("POST", url, json=payload) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first_token is None and line == "event: token":
+                first_token = time.perf_counter() - start
+    return first_token
+
+async def run_level(client, url, concurrency, num_requests):
+    latencies = []
+    first_tokens = []
+    errors = 0
+    next_request = 0
+
+    async def worker():
+        nonlocal next_request, errors
+        while next_request < num_requests:
+            i = next_request
+            next_request += 1
+            payload = {"message": [{"role": "user", "content": QUESTIONS[i % len(QUESTIONS)]}]}
+            start = time.perf_counter()
+            try:
+                first_token = await post(client, url, payload)
+                latencies.append(time.perf_counter() - start)
+                if first_token is not None:
+                    first_tokens.append(first_token)
+            except httpx.HTTPError as e:
+                errors += 1
+                if errors == 1:
+                    print(f"  first error: {e!r}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    ttft = f"{np.percentile(np.array(first_tokens) * 1000, 50):>13.1f}" if first_tokens else f"{'-':>13}"
+    print(f"{concurrency:>11} {len(latencies) / elapsed:>8.1f} {np.percentile(ms, 50):>9.1f} {np.percentile(ms, 99):>9.1f} {ttft} {errors:>7}")
+
+async def run_load_test(url, concurrency_levels, num_requests, timeout):
+    limits = httpx.Limits(max_connections=max(concurrency_levels), max_keepalive_connections=max(concurrency_levels))
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        print(f"{'concurrency':>11} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'ttft p50 ms':>13} {'errors':>7}")
+        for concurrency in concurrency_levels:
+            await run_level(client, url, concurrency, max(num_requests, concurrency))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:5000/respond")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+    asyncio.run(run_load_test(args.url, args.concurrency, args.requests, args.timeout))
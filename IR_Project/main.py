@@ -2,27 +2,35 @@ import os
 import numpy as np
 import faiss
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from openai import OpenAI
-import pdfplumber
 import pandas as pd
-import time
 import json
+import shutil
+import hashlib
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
+from embeddingScheduler import EmbeddingScheduler
+from embeddingCheckpoint import EmbeddingCheckpoint
+from embeddingCache import EmbeddingCache, get_default_cache
+from faissIndexes import build_faiss_index, index_type_of, REMOVABLE_TYPES
+from chunkStore import write_chunk_store, chunk_store_path_for, lexical_index_path_for
+from pdfExtraction import extract_contents
+from booleanRetrievalNew import build_chunk_lexical_index
 
 class ProcessingState:
-    def __init__(self, state_file="processing_state.json"):
+    def __init__(self, state_file="processing_state.json", checkpoint_dir="embedding_checkpoint"):
         self.state_file = state_file
         self.state = self.load_state()
+        self.checkpoint = EmbeddingCheckpoint(checkpoint_dir) # embeddings are checkpointed to append-only binary shards, not to the JSON state
     
     def load_state(self) -> Dict:
         try:
             with open(self.state_file, 'r') as f:
                 state = json.load(f)
+                state.pop('completed_embeddings', None) # older state files stored every embedding as a JSON list, those are no longer used
                 default_state = {
                     'all_chunks': [],
+                    'chunk_sources': [],
                     'processed_pdfs': [],
-                    'completed_embeddings': [], # completed embeddings are the embeddings that have been successfully processed and stored in the FAISS index. example: if you have 100 chunks and you have processed 50 of them, then the completed_embeddings list will contain the embeddings for those 50 chunks.
                     'last_processed_chunk': 0,
                     'last_update': str(datetime.now())
                 }
@@ -30,8 +38,8 @@ class ProcessingState:
         except FileNotFoundError:
             return {
                 'all_chunks': [],
+                'chunk_sources': [],
                 'processed_pdfs': [],
-                'completed_embeddings': [],
                 'last_processed_chunk': 0,
                 'last_update': str(datetime.now())
             }
@@ -41,38 +49,26 @@ class ProcessingState:
             json.dump(self.state, f)
     
     def reset_embeddings(self):
-        self.state['completed_embeddings'] = []
+        self.checkpoint.reset()
         self.state['last_processed_chunk'] = 0
         self.save_state()
     
-    def update_progress(self, chunk_index: int, new_embeddings: List):
-        self.state['last_processed_chunk'] = chunk_index
-        self.state['completed_embeddings'] = new_embeddings
-        self.save_state()
+    def update_progress(self, start: int, chunks: List[str], new_embeddings: List[List[float]]):
+        # appends only this batch, the cost of a checkpoint no longer grows with the number of chunks already embedded
+        self.checkpoint.append(start, chunks, new_embeddings)
+        self.state['last_processed_chunk'] = max(self.state['last_processed_chunk'], start + len(chunks))
     
     def add_processed_pdf(self, pdf_path: str, chunks: List[str]):
         if pdf_path not in self.state['processed_pdfs']:
             self.state['processed_pdfs'].append(pdf_path)
             self.state['all_chunks'].extend(chunks)
+            self.state['chunk_sources'].extend([os.path.basename(pdf_path)] * len(chunks)) # cited as "SOURCE: <filename>" in answers
             self.save_state()
-
-def extract_content_from_pdf(pdf_path: str) -> str: # here... could extract bullet points separately from text and tables, and append separately to table
-    full_content = []
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text() or ""
-                if text:
-                    full_content.append(text)
-                tables = page.extract_tables()
-                for table in tables:
-                    if table:
-                        df = pd.DataFrame(table).fillna('').replace(r'^\s*$', '', regex=True) # remove empty strings 
-                        full_content.append(f"\nTable Content:\n{df.to_string(index=False, header=False)}\n")
-    except Exception as e:
-        print(f"Error processing PDF {pdf_path}: {e}")
-        return ""
-    return "\n".join(full_content) # this will join all the text and tables extracted from the pdf into a single string. The tables are formatted as strings with headers and indices removed. 
+    
+    def clear(self):
+        if os.path.exists(self.state_file):
+            os.remove(self.state_file)
+        shutil.rmtree(self.checkpoint.shard_dir, ignore_errors=True)
 
 def chunk_text(text: str, chunk_size: int = 500, chunk_overlap: int = 50) -> List[str]: #ISSUE: IF TABLE EXCEEDS CHUNK SIZE, IT WILL CUT THE TABLE SHORT
     if not text.strip():
@@ -92,40 +88,60 @@ def get_embeddings_with_enhanced_retry(
     api_key: str = None,
     max_retries: int = 3,
     initial_retry_delay: int = 20,
-    batch_size: int = 50
-) -> List[List[float]]:
-    if not api_key:
-        raise ValueError("OpenAI API key is required")
+    batch_size: int = 50,
+    max_in_flight: int = 4,
+    requests_per_minute: int = 3000,
+    tokens_per_minute: int = 1_000_000,
+    base_url: Optional[str] = None,
+    cache: Optional[EmbeddingCache] = None,
+    report: Optional[Dict[str, int]] = None
+) -> np.ndarray:
+    """
+    Embeddings of chunks, in order. When a report dict is given, the number of chunks served from the embedding
+    cache ("from_cache"), restored from the checkpoint ("from_checkpoint") and sent to the API ("embedded") is added to it.
+    """
+    cache = cache if cache is not None else get_default_cache()
     
-    client = OpenAI(api_key=api_key)
-    embeddings = []
-    start_idx = 0
+    # chunks embedded before (by this or any earlier run, or by the query path) skip the API entirely
+    cached = cache.get_many(model, chunks)
+    missing = [chunk for chunk, vector in zip(chunks, cached) if vector is None]
     
-    print(f"Processing {len(chunks)} chunks")
+    batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+    starts = [i * batch_size for i in range(len(batches))]
+    # batches already in the checkpoint (same position, same texts) are not sent again
+    pending = [b for b in range(len(batches)) if not state.checkpoint.is_done(starts[b], batches[b])]
     
-    for i in range(start_idx, len(chunks), batch_size):
-        batch = chunks[i:i + batch_size]
-        retry_delay = initial_retry_delay
-        
-        for attempt in range(max_retries):
-            try:
-                response = client.embeddings.create(input=batch, model=model) # PASSES THE BATCH OF CHUNKS TO THE OPENAI API FOR EMBEDDING
-                batch_embeddings = [item.embedding for item in response.data]
-                embeddings.extend(batch_embeddings)
-                state.update_progress(i + len(batch), embeddings)
-                print(f"Processed chunks {i}-{i+len(batch)-1}")
-                time.sleep(1)
-                break
-            except Exception as e:
-                if "insufficient_quota" in str(e):
-                    raise RuntimeError("API quota exhausted") from e
-                if attempt == max_retries - 1:
-                    raise # THIS MANUALLY RAISES AN EXCEPTION / ERROR
-                print(f"Retrying in {retry_delay}s...")
-                time.sleep(retry_delay)
-                retry_delay *= 2
-    
-    return embeddings
+    print(f"Processing {len(chunks)} chunks ({len(chunks) - len(missing)} from the embedding cache, {len(batches) - len(pending)} of {len(batches)} batches restored from checkpoint)")
+    if report is not None:
+        embedded = sum(len(batches[b]) for b in pending)
+        report["from_cache"] = report.get("from_cache", 0) + len(chunks) - len(missing)
+        report["from_checkpoint"] = report.get("from_checkpoint", 0) + len(missing) - embedded
+        report["embedded"] = report.get("embedded", 0) + embedded
+
+    if pending:
+        scheduler = EmbeddingScheduler(
+            api_key,
+            model=model,
+            max_in_flight=max_in_flight,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            max_retries=max_retries,
+            initial_retry_delay=initial_retry_delay,
+            base_url=base_url
+        ) # base_url can point at a local stub server (see stubOpenAIServer.py) for testing without the real API
+
+        def on_batch_done(pending_index: int, batch_embeddings: List[List[float]]):
+            b = pending[pending_index]
+            state.update_progress(starts[b], batches[b], batch_embeddings)
+            cache.put_many(model, batches[b], batch_embeddings)
+            print(f"Processed chunks {starts[b]}-{starts[b] + len(batch_embeddings) - 1}")
+
+        scheduler.embed_batches([batches[b] for b in pending], on_batch_done=on_batch_done)
+    
+    print(f"Embedding cache: {cache.stats()}")
+    
+    fresh = iter(state.checkpoint.load_embeddings(starts) if batches else [])
+    return np.array([vector if vector is not None else next(fresh) for vector in cached], dtype='float32')
 
 def verify_faiss_storage(index_path: str = "vector_index4.faiss", metadata_path: str = "chunks_metadata4.pkl") -> Tuple[int, int]:
     if not os.path.exists(index_path):
@@ -154,61 +170,220 @@ def verify_faiss_storage(index_path: str = "vector_index4.faiss", metadata_path:
     if index.ntotal != len(metadata):
         raise ValueError(f"Count mismatch: FAISS index has {index.ntotal} vectors, but metadata has {len(metadata)} chunks")
     
+    if not index.is_trained:
+        raise ValueError("FAISS index is not trained")
+    
     try:
-        sample_embedding = index.reconstruct(0)
-        if len(sample_embedding) != 1536:
-            raise ValueError(f"Unexpected embedding dimension: {len(sample_embedding)}. Expected 1536 for ada-002 model.")
+        index.search(np.zeros((1, index.d), dtype='float32'), 1) # every index type must be able to answer a query
     except Exception as e:
-        raise ValueError(f"Failed to verify embedding dimensions: {str(e)}")
+        raise ValueError(f"FAISS index cannot be searched: {str(e)}")
+    
+    if index.d != 1536:
+        raise ValueError(f"Unexpected embedding dimension: {index.d}. Expected 1536 for ada-002 model.")
+    
+    if 'embedding_index' in metadata.columns and hasattr(index, 'id_map'):
+        index_ids = set(faiss.vector_to_array(index.id_map).tolist())
+        if index_ids != set(metadata['embedding_index'].tolist()):
+            raise ValueError("FAISS vector ids do not match the 'embedding_index' column of the metadata")
+    
+    check_self_retrieval(index, metadata)
     
     print(f"Storage verification successful:")
     print(f"- FAISS index contains {index.ntotal} vectors")
     print(f"- Metadata contains {len(metadata)} chunks")
-    print(f"- Embedding dimension: {len(sample_embedding)}")
+    print(f"- Embedding dimension: {index.d}")
+    print(f"- Index type: {index_type_of(index)}")
     
     return index.ntotal, len(metadata)
 
-def store_in_faiss(embeddings: List[List[float]], chunks: List[str], index_path: str = "vector_index4.faiss", metadata_path: str = "chunks_metadata4.pkl") -> None:
-    if not embeddings or not chunks:
+def check_self_retrieval(index, metadata: pd.DataFrame, cache: Optional[EmbeddingCache] = None, model: str = "text-embedding-ada-002", sample_size: int = 20, top_k: int = 10) -> None:
+    # the id sets can match while ids point at the wrong vectors (index.reconstruct goes through the same id map), so a
+    # sample of chunks is searched with its embedding from the cache and must come back under its own id
+    cache = cache if cache is not None else get_default_cache()
+    rows = np.random.default_rng(0).choice(len(metadata), size=min(sample_size, len(metadata)), replace=False)
+    vectors = cache.get_many(model, metadata['chunk_text'].iloc[rows].tolist())
+    sample = [(row, vector) for row, vector in zip(rows, vectors) if vector is not None]
+    if not sample:
+        print("- Self-retrieval check skipped, no sampled chunk is in the embedding cache")
+        return
+    ids = metadata['embedding_index'].to_numpy(dtype='int64') if 'embedding_index' in metadata.columns else np.arange(len(metadata))
+    _, found = index.search(np.vstack([vector for _, vector in sample]).astype('float32'), min(top_k, index.ntotal))
+    misses = sum(ids[row] not in labels for (row, _), labels in zip(sample, found))
+    # HNSW and IVF-PQ are approximate, an occasional miss is allowed, a corrupt id map misses nearly all of them
+    if misses > len(sample) // 10:
+        raise ValueError(f"{misses} of {len(sample)} sampled chunks do not retrieve their own vector, the FAISS id map is corrupt")
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def hash_to_faiss_id(content_hash: str) -> int:
+    # the first 60 bits of the content hash, a stable positive int64 id for the ID-mapped FAISS index
+    return int(content_hash[:15], 16)
+
+def dedupe_chunks(chunks: List[str]) -> List[str]:
+    # identical chunks share a content hash (and so a vector), keep the first occurrence
+    seen = set()
+    unique = []
+    for chunk in chunks:
+        h = chunk_hash(chunk)
+        if h not in seen:
+            seen.add(h)
+            unique.append(chunk)
+    return unique
+
+def write_faiss_storage(index, metadata: pd.DataFrame, index_path: str, metadata_path: str) -> Tuple[int, int]:
+    # written next to the live files and swapped in only once verified, so a failed update never destroys the current index
+    tmp_index_path, tmp_metadata_path = index_path + ".tmp", metadata_path + ".tmp"
+    faiss.write_index(index, tmp_index_path)
+    metadata.to_pickle(tmp_metadata_path) # pickle basically helps to serialize the dataframe into a binary format that can be saved to disk and loaded back later. (efficient retreival) could also use json, but pickle is faster and more efficient for large dataframes.
+    
+    try:
+        num_vectors, num_chunks = verify_faiss_storage(tmp_index_path, tmp_metadata_path) # this will verify that the vectors and metadata have been stored correctly in the FAISS index and the metadata file.
+    except Exception as e:
+        for path in (tmp_index_path, tmp_metadata_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise ValueError(f"Storage verification failed: {str(e)}")
+    
+    os.replace(tmp_index_path, index_path)
+    os.replace(tmp_metadata_path, metadata_path)
+    
+    write_chunk_store_from_metadata(metadata, metadata_path)
+    return num_vectors, num_chunks
+
+def write_chunk_store_from_metadata(metadata: pd.DataFrame, metadata_path: str) -> None:
+    # columnar copy of the metadata that the server memory-maps and reads lazily by row (see chunkStore.py)
+    write_chunk_store(
+        chunk_store_path_for(metadata_path),
+        metadata['chunk_text'].tolist(),
+        sources=metadata['pdf_files'].tolist() if 'pdf_files' in metadata.columns else None,
+        ids=metadata['embedding_index'].tolist()
+    )
+    # BM25 over the same chunks under the same faiss ids, so queryNew.hybrid_search fuses both searches on the chunk id
+    build_chunk_lexical_index(metadata['chunk_text'].tolist(), metadata['embedding_index'].tolist(), lexical_index_path_for(metadata_path))
+
+def store_in_faiss(embeddings: np.ndarray, chunks: List[str], index_path: str = "vector_index4.faiss", metadata_path: str = "chunks_metadata4.pkl", index_type: str = "flat", index_params: Optional[Dict] = None, sources: Optional[List[str]] = None) -> None:
+    if embeddings is None or len(embeddings) == 0 or not chunks:
         raise ValueError("No embeddings or chunks to store")
     
     if len(embeddings) != len(chunks):
         raise ValueError(f"Count mismatch: {len(embeddings)} embeddings vs {len(chunks)} chunks")
     
-    embeddings_array = np.array(embeddings).astype('float32')
+    if len(set(chunks)) != len(chunks):
+        raise ValueError("Duplicate chunks, run dedupe_chunks first")
+    
+    if sources is not None and len(sources) != len(chunks):
+        raise ValueError(f"Count mismatch: {len(sources)} sources vs {len(chunks)} chunks")
+    
+    embeddings_array = np.asarray(embeddings, dtype='float32')
 
     # removed in case a model other than ada is used    
     # if embeddings_array.shape[1] != 1536:
     #     raise ValueError(f"Unexpected embedding dimension: {embeddings_array.shape[1]}")
     
-    index = faiss.IndexFlatL2(embeddings_array.shape[1]) # stores the embeddings in an  "index" which abstracts away the details of the underlying data structure. The IndexFlatL2 is a simple index that uses L2 distance (Euclidean distance) for nearest neighbor search.
-    index.add(embeddings_array)
-    faiss.write_index(index, index_path)
+    hashes = [chunk_hash(chunk) for chunk in chunks]
+    ids = np.array([hash_to_faiss_id(h) for h in hashes], dtype='int64')
+    
+    # "flat" (IndexFlatL2) is an exact L2 scan, the other types are approximate and trade some recall for speed/size (see faissIndexes.py).
+    # Every type is wrapped in an IDMap2 so vectors are addressed by content-hash id, and can be removed/added individually on later runs.
+    index = build_faiss_index(embeddings_array, ids, index_type, index_params)
     
     metadata = pd.DataFrame({ # metadata is a pandas dataframe that stores the chunks and their corresponding indices. This is used to retrieve the chunks later when querying the index.
         'chunk_text': chunks,
-        'embedding_index': range(len(chunks))
+        'chunk_hash': hashes,
+        'embedding_index': ids
     })
-    metadata.to_pickle(metadata_path) # pickle basically helps to serialize the dataframe into a binary format that can be saved to disk and loaded back later. (efficient retreival) could also use json, but pickle is faster and more efficient for large dataframes.
+    if sources is not None:
+        metadata['pdf_files'] = sources
     
-    try:
-        num_vectors, num_chunks = verify_faiss_storage(index_path, metadata_path) # this will verify that the vectors and metadata have been stored correctly in the FAISS index and the metadata file.
-        print(f"Successfully stored {num_vectors} vectors with metadata")
-    except Exception as e:
-        if os.path.exists(index_path):
-            os.remove(index_path)
-        if os.path.exists(metadata_path):
-            os.remove(metadata_path)
-        raise ValueError(f"Storage verification failed: {str(e)}")
+    num_vectors, num_chunks = write_faiss_storage(index, metadata, index_path, metadata_path)
+    print(f"Successfully stored {num_vectors} vectors with metadata")
 
-def test_pipeline(pdf_folder: str, api_key: str):
+def update_faiss_incrementally(
+    chunks: List[str],
+    state: ProcessingState,
+    api_key: str,
+    index_path: str = "vector_index4.faiss",
+    metadata_path: str = "chunks_metadata4.pkl",
+    base_url: Optional[str] = None,
+    index_type: str = "flat",
+    index_params: Optional[Dict] = None,
+    sources: Optional[List[str]] = None
+) -> Dict[str, int]:
+    """
+    Brings the index in line with `chunks`: only chunks whose content hash is not indexed yet are embedded,
+    vectors of chunks that no longer exist are removed, everything else is reused as is.
+    sources (the PDF filename of each chunk) are stored in the 'pdf_files' column, for every chunk including reused ones.
+    Returns a report with the number of new, reused and dropped chunks; of the vectors computed for this update,
+    "embedded" went to the API and "from_cache" / "from_checkpoint" did not.
+    """
+    # a chunk found in several PDFs is cited from the first, the one dedupe_chunks keeps
+    source_of = {}
+    for chunk, source in zip(chunks, sources or []):
+        source_of.setdefault(chunk_hash(chunk), source)
+    chunks = dedupe_chunks(chunks)
+    
+    metadata = None
+    index = None
+    if os.path.exists(index_path) and os.path.exists(metadata_path):
+        metadata = pd.read_pickle(metadata_path)
+        index = faiss.read_index(index_path)
+        if 'chunk_hash' not in metadata.columns: # index built before content hashing, cannot be updated in place
+            print("Existing index has no content hashes, rebuilding it from scratch")
+            metadata = None
+    
+    current = {chunk_hash(chunk): chunk for chunk in chunks}
+    indexed = set(metadata['chunk_hash']) if metadata is not None else set()
+    new_chunks = [chunk for h, chunk in current.items() if h not in indexed]
+    dropped = metadata[~metadata['chunk_hash'].isin(current.keys())] if metadata is not None else []
+    report = {"new": len(new_chunks), "reused": len(indexed) - len(dropped), "dropped": len(dropped), "embedded": 0, "from_cache": 0, "from_checkpoint": 0}
+    
+    rebuild = metadata is None
+    if not rebuild and index_type_of(index) != index_type:
+        print(f"Existing index is {index_type_of(index)}, rebuilding it as {index_type}")
+        rebuild = True
+    if not rebuild and len(dropped) and index_type not in REMOVABLE_TYPES:
+        rebuild = True # HNSW graphs cannot remove vectors, and IVF removals desync the id map (see faissIndexes.py)
+    # indexes written before sources were recorded (or whose chunks moved to another PDF) get their metadata rewritten
+    sources_changed = sources is not None and not rebuild and (
+        'pdf_files' not in metadata.columns or (metadata['pdf_files'] != metadata['chunk_hash'].map(source_of)).any()
+    )
+    
+    if rebuild:
+        # vectors of chunks that were already indexed come straight from the embedding cache, only new chunks hit the API
+        embeddings = get_embeddings_with_enhanced_retry(chunks, state, api_key=api_key, base_url=base_url, report=report)
+        store_in_faiss(embeddings, chunks, index_path, metadata_path, index_type, index_params,
+                       sources=[source_of[chunk_hash(chunk)] for chunk in chunks] if sources is not None else None)
+    elif new_chunks or len(dropped) or sources_changed:
+        if len(dropped):
+            index.remove_ids(dropped['embedding_index'].to_numpy(dtype='int64'))
+            metadata = metadata[metadata['chunk_hash'].isin(current.keys())]
+        if new_chunks:
+            # IVF types keep the centroids trained at build time, new vectors are assigned to the existing lists
+            embeddings = np.asarray(get_embeddings_with_enhanced_retry(new_chunks, state, api_key=api_key, base_url=base_url, report=report), dtype='float32')
+            new_hashes = [chunk_hash(chunk) for chunk in new_chunks]
+            new_ids = np.array([hash_to_faiss_id(h) for h in new_hashes], dtype='int64')
+            index.add_with_ids(embeddings, new_ids)
+            metadata = pd.concat([metadata, pd.DataFrame({
+                'chunk_text': new_chunks,
+                'chunk_hash': new_hashes,
+                'embedding_index': new_ids
+            })], ignore_index=True)
+        if sources is not None:
+            metadata = metadata.assign(pdf_files=metadata['chunk_hash'].map(source_of))
+        write_faiss_storage(index, metadata.reset_index(drop=True), index_path, metadata_path)
+    elif not (os.path.exists(chunk_store_path_for(metadata_path)) and os.path.exists(lexical_index_path_for(metadata_path))):
+        write_chunk_store_from_metadata(metadata, metadata_path)
+    
+    print(f"Index report: {report}")
+    return report
+
+def test_pipeline(pdf_folder: str, api_key: str, base_url: Optional[str] = None, index_type: str = "flat", index_params: Optional[Dict] = None, extraction_workers: Optional[int] = None):
     state = ProcessingState()
     
     if not os.path.exists(pdf_folder):
         raise FileNotFoundError(f"PDF folder not found: {pdf_folder}")
     
-    state.reset_embeddings()
-    
     new_pdfs = [
         os.path.join(pdf_folder, f) 
         for f in os.listdir(pdf_folder) 
@@ -216,10 +391,13 @@ def test_pipeline(pdf_folder: str, api_key: str):
         os.path.join(pdf_folder, f) not in state.state['processed_pdfs']
     ] # this will get all the pdfs in the folder that have not been processed yet.
     
-    for pdf in new_pdfs: # THIS IS THE MAIN LOOP, IT EXTRACTS THE CONTENT FROM THE PDF AND CHUNKS IT INTO SMALLER PIECES. THEN IT UPDATES THE STATE WITH THE NEW CHUNKS. (CHUNKING DOES NOT MEAN EMBEDDING, IT JUST MEANS SPLITTING THE TEXT INTO SMALLER PIECES) (HENCE CHUNKING CAN BE IMPROVED)
+    # text and tables of all new pdfs are extracted up front, in parallel across files and page ranges (see pdfExtraction.py)
+    contents = extract_contents(new_pdfs, table_format="plain", workers=extraction_workers)
+    
+    for pdf in new_pdfs: # THIS IS THE MAIN LOOP, IT TAKES THE CONTENT EXTRACTED FROM THE PDF AND CHUNKS IT INTO SMALLER PIECES. THEN IT UPDATES THE STATE WITH THE NEW CHUNKS. (CHUNKING DOES NOT MEAN EMBEDDING, IT JUST MEANS SPLITTING THE TEXT INTO SMALLER PIECES) (HENCE CHUNKING CAN BE IMPROVED)
         try:
             print(f"\nProcessing {pdf}")
-            content = extract_content_from_pdf(pdf) 
+            content = contents[pdf]
             if not content:
                 print(f"Warning: No content extracted from {pdf}")
                 continue
@@ -242,14 +420,15 @@ def test_pipeline(pdf_folder: str, api_key: str):
     print(f"\nTotal chunks to process: {len(all_chunks)}")
     
     try:
-        embeddings = get_embeddings_with_enhanced_retry(all_chunks, state, api_key=api_key) # this will get the embeddings for all the chunks. It will retry if it fails, and it will update the state with the new embeddings.
-        store_in_faiss(embeddings, all_chunks) # this will store the embeddings in the FAISS index and the metadata file.
+        # only chunks whose content hash is not in the index yet are embedded, removed chunks are dropped from the index
+        # state files written before sources were recorded have none, their chunks keep whatever the index has
+        sources = state.state['chunk_sources'] if len(state.state['chunk_sources']) == len(all_chunks) else None
+        update_faiss_incrementally(all_chunks, state, api_key, base_url=base_url, index_type=index_type, index_params=index_params, sources=sources)
         
         num_vectors, num_chunks = verify_faiss_storage()
         print(f"\nSuccess: {num_vectors} vectors stored for {num_chunks} chunks")
         
-        if os.path.exists(state.state_file):
-            os.remove(state.state_file)
+        state.clear()
             
     except Exception as e:
         print(f"\nProcessing paused: {str(e)}")
@@ -258,8 +437,9 @@ def test_pipeline(pdf_folder: str, api_key: str):
 if __name__ == "__main__":
     pdf_folder = "./pdfs"
     openai_api_key = ""  
+    index_type = "flat" # flat, ivf_flat, ivf_pq or hnsw (see faissIndexes.py and benchmarkIndexTypes.py)
     print("A message: Open AI API KEY Needed")
     try:
-        test_pipeline(pdf_folder, openai_api_key)
+        test_pipeline(pdf_folder, openai_api_key, index_type=index_type)
     except Exception as e:
         print(f"Critical error: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,94 @@
+import math
+import heapq
+from collections import Counter
+from typing import Dict, List, Tuple
+from postingLists import gallop
+
+# Top-k BM25 for long disjunctive queries with MaxScore dynamic pruning (Turtle & Flood). Query terms are ordered
+# by the highest score they can add to any chunk. Once the top-k heap is full, the weakest terms whose upper bounds
+# together cannot lift a chunk past the k-th score become non-essential: only chunks from the essential terms'
+# postings are candidates, and non-essential postings are galloped to just those candidates, or not looked at once
+# a candidate can no longer make the top k. Scores are the same as booleanQueryNew.bm25_scores.
+
+
+def term_upper_bound(index, term: str, k1: float, b: float) -> float:
+    """Highest BM25 contribution of term to any chunk. Computed once per term and cached on the index."""
+    bounds = index.score_bounds
+    key = (term, k1, b)
+    if key not in bounds:
+        df = index.doc_freq(term)
+        idf = math.log(1 + (index.num_docs - df + 0.5) / (df + 0.5))
+        avg_length = index.avg_chunk_length or 1.0
+        lengths = index.chunk_lengths
+        bounds[key] = max((idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[doc] / avg_length))
+                           for doc, tf in zip(index.postings(term), index.frequencies(term))), default=0.0)
+    return bounds[key]
+
+def max_score_top_k(index, query_terms: List[str], top_k: int = 10, k1: float = 1.2, b: float = 0.75) -> Tuple[List[Tuple[int, float]], Dict[str, int]]:
+    """
+    The top_k (doc, score) by BM25, best first, plus counts of the postings an exhaustive evaluation would
+    score ("postings"), the ones scored here ("scored") and the ones never scored ("skipped").
+    """
+    if top_k <= 0:
+        return [], {"postings": 0, "scored": 0, "skipped": 0}
+    avg_length = index.avg_chunk_length or 1.0
+    lengths = index.chunk_lengths
+    terms = []  # [weight, docs, tfs, upper bound, position], weakest bound first
+    for term, query_frequency in Counter(query_terms).items():
+        df = index.doc_freq(term)
+        if not df:
+            continue
+        idf = math.log(1 + (index.num_docs - df + 0.5) / (df + 0.5))
+        bound = query_frequency * term_upper_bound(index, term, k1, b)
+        terms.append([query_frequency * idf, index.postings(term), index.frequencies(term), bound, 0])
+    terms.sort(key=lambda entry: entry[3])
+
+    # prefix[i]: the most terms[0..i] can add together
+    prefix = []
+    for entry in terms:
+        prefix.append((prefix[-1] if prefix else 0.0) + entry[3])
+
+    def contribution(entry, i):
+        tf = entry[2][i]
+        doc = entry[1][i]
+        return entry[0] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[doc] / avg_length))
+
+    heap = []  # (score, doc) of the current top k, weakest on top
+    threshold = 0.0
+    first_essential = 0
+    scored = 0
+    while True:
+        essential = [entry for entry in terms[first_essential:] if entry[4] < len(entry[1])]
+        if not essential:
+            break
+        doc = min(entry[1][entry[4]] for entry in essential)
+
+        score = 0.0
+        for entry in essential:
+            i = entry[4]
+            if entry[1][i] == doc:
+                score += contribution(entry, i)
+                scored += 1
+                entry[4] = i + 1
+        # non-essential terms, strongest first, only while they can still lift doc into the top k
+        for t in range(first_essential - 1, -1, -1):
+            if score + prefix[t] <= threshold:
+                break
+            entry = terms[t]
+            i = entry[4] = gallop(entry[1], doc, entry[4])
+            if i < len(entry[1]) and entry[1][i] == doc:
+                score += contribution(entry, i)
+                scored += 1
+
+        if len(heap) < top_k:
+            heapq.heappush(heap, (score, doc))
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, (score, doc))
+        if len(heap) == top_k and heap[0][0] > threshold:
+            threshold = heap[0][0]
+            while first_essential < len(terms) and prefix[first_essential] <= threshold:
+                first_essential += 1
+
+    total = sum(len(entry[1]) for entry in terms)
+    top = sorted(heap, key=lambda item: (-item[0], item[1]))
+    return [(doc, score) for score, doc in top], {"postings": total, "scored": scored, "skipped": total - scored}
@@ -0,0 +1,42 @@
+import threading
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from typing import Dict, Optional
+
+# one connection pool per process: requests reuse warm TLS connections instead of opening a new one per call
+POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+_clients: Dict[tuple, OpenAI] = {}
+_async_clients: Dict[tuple, AsyncOpenAI] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key: str, base_url: Optional[str] = None) -> OpenAI:
+    """
+    Shared, thread-safe OpenAI client for (api_key, base_url).
+    An empty api_key / base_url falls back to OPENAI_API_KEY / OPENAI_BASE_URL.
+    """
+    key = (api_key, base_url)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = OpenAI(api_key=api_key or None, base_url=base_url, http_client=httpx.Client(limits=POOL_LIMITS, timeout=TIMEOUT))
+    return _clients[key]
+
+def get_async_client(api_key: str, base_url: Optional[str] = None) -> AsyncOpenAI:
+    """
+    Shared AsyncOpenAI client for (api_key, base_url). An httpx.AsyncClient is bound to the event loop
+    it was first used on, so this is meant for the single loop of an async server process.
+    """
+    key = (api_key, base_url)
+    with _clients_lock:
+        if key not in _async_clients:
+            _async_clients[key] = AsyncOpenAI(api_key=api_key or None, base_url=base_url, http_client=httpx.AsyncClient(limits=POOL_LIMITS, timeout=TIMEOUT))
+    return _async_clients[key]
+
+async def close_async_clients() -> None:
+    with _clients_lock:
+        clients = list(_async_clients.values())
+        _async_clients.clear()
+    for client in clients:
+        await client.close()
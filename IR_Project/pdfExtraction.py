@@ -0,0 +1,190 @@
+import os
+import signal
+import time
+import threading
+import pdfplumber
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Union
+from extractionCache import ExtractionCache, file_digest, get_default_extraction_cache
+
+# bump whenever the extracted output changes (pdfplumber settings, table handling...), cached extractions depend on it
+EXTRACTOR_VERSION = 1
+
+# How tables are rendered into the extracted text, each indexer historically used its own markers:
+# plain  - "Table Content:" header, used by main.py so the text splitter can split on it
+# marked - @TABLE_START/@TABLE_END delimiters, used by the hybrid chunker (booleanRetrievalNew.py / unitTest.py)
+# None   - tables are left out (corpusAnalysis.py)
+TABLE_FORMATS = {
+    "plain": "\nTable Content:\n{table}\n",
+    "marked": "\n@TABLE_START:\n{table}\n@TABLE_END\n",
+}
+
+
+class PageTimeout(Exception):
+    pass
+
+def _raise_page_timeout(signum, frame):
+    raise PageTimeout()
+
+def page_count(pdf_path: str) -> int:
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+def extract_page_range(pdf_path: str, first_page: int, last_page: int, include_tables: bool = True, page_timeout: Optional[float] = 60) -> List[Dict]:
+    """
+    Extracts pages [first_page, last_page) of one PDF. Runs inside a worker process.
+    Every page gets a record {"page", "text", "tables", "error", "seconds"}; a page that fails or runs past page_timeout
+    only loses its own content, the rest of the range is still extracted.
+    """
+    # SIGALRM only exists on Unix and can only be armed from the main thread
+    use_alarm = bool(page_timeout) and hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+    previous_handler = signal.signal(signal.SIGALRM, _raise_page_timeout) if use_alarm else None
+    records = []
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            for page_number in range(first_page, min(last_page, len(pdf.pages))):
+                record = {"page": page_number, "text": "", "tables": [], "error": None, "seconds": 0.0}
+                page = pdf.pages[page_number]
+                start = time.perf_counter()
+                try:
+                    if use_alarm:
+                        signal.setitimer(signal.ITIMER_REAL, page_timeout)
+                    record["text"] = page.extract_text() or ""
+                    if include_tables:
+                        record["tables"] = [table for table in page.extract_tables() if table]
+                except PageTimeout:
+                    record["error"] = f"timed out after {page_timeout}s"
+                except Exception as e:
+                    record["error"] = str(e)
+                finally:
+                    if use_alarm:
+                        signal.setitimer(signal.ITIMER_REAL, 0)
+                    page.close() # drops pdfplumber's per-page object cache, long PDFs otherwise keep every parsed page in memory
+                    record["seconds"] = round(time.perf_counter() - start, 4)
+                records.append(record)
+    finally:
+        if use_alarm:
+            signal.signal(signal.SIGALRM, previous_handler)
+    return records
+
+def _failed_range(pdf_path: str, first: int, last: int, error: str) -> List[Dict]:
+    print(f"Error processing pages {first}-{last - 1} of {pdf_path}: {error}")
+    return [{"page": page, "text": "", "tables": [], "error": error} for page in range(first, last)]
+
+def _run_in_pool(tasks: List[tuple], workers: int, include_tables: bool, page_timeout: Optional[float]) -> List[List[Dict]]:
+    """
+    Runs extract_page_range for every (pdf_path, first, last) task on a process pool, results in task order.
+    A worker that dies (segfault, OOM kill on a malformed file) breaks the whole pool: every unfinished future fails
+    with BrokenProcessPool, not just the range that killed it. The unfinished ranges are then rerun on fresh pools,
+    split in halves, until a range that still breaks a pool is alone in it; only such ranges are lost.
+    """
+    results = [None] * len(tasks)
+    groups = [list(range(len(tasks)))] if tasks else []
+    while groups:
+        group = groups.pop()
+        broken = []
+        with ProcessPoolExecutor(max_workers=min(workers, len(group))) as executor:
+            futures = [(i, executor.submit(extract_page_range, *tasks[i], include_tables, page_timeout)) for i in group]
+            for i, future in futures:
+                try:
+                    results[i] = future.result()
+                except BrokenProcessPool:
+                    broken.append(i)
+                except Exception as e: # raised inside the worker, the pool itself is fine
+                    results[i] = _failed_range(*tasks[i], str(e))
+        if len(broken) == 1 and len(group) == 1:
+            results[broken[0]] = _failed_range(*tasks[broken[0]], "worker process died")
+        elif broken:
+            half = (len(broken) + 1) // 2
+            groups.extend(part for part in (broken[half:], broken[:half]) if part)
+    return results
+
+def extract_pages(
+    pdf_paths: List[str],
+    workers: Optional[int] = None,
+    pages_per_task: int = 8,
+    include_tables: bool = True,
+    page_timeout: Optional[float] = 60,
+    cache: Union[ExtractionCache, None, bool] = None
+) -> Dict[str, List[Dict]]:
+    """
+    Extracts every page of every PDF, fanning page ranges out over a process pool (workers=1 runs in-process).
+    Returns {pdf_path: [page records in page order]}, independent of the order in which the workers finish.
+    A PDF that cannot be opened at all maps to an empty list.
+    PDFs whose content is already in the extraction cache (cache=None uses the default one, cache=False disables it)
+    are not parsed at all; the hit rate and the parse time saved are printed at the end of the call.
+    """
+    workers = workers or os.cpu_count() or 1
+    cache = get_default_extraction_cache(EXTRACTOR_VERSION) if cache is None else cache
+    tasks = []
+    pages = {}
+    digests = {}
+    hits = 0
+    seconds_saved = 0.0
+    for pdf_path in pdf_paths:
+        if cache:
+            try:
+                digests[pdf_path] = file_digest(pdf_path)
+                cached = cache.get(digests[pdf_path], include_tables)
+            except OSError:
+                cached = None
+            if cached is not None:
+                pages[pdf_path] = cached
+                hits += 1
+                seconds_saved += sum(record.get("seconds", 0.0) for record in cached)
+                continue
+        try:
+            num_pages = page_count(pdf_path)
+        except Exception as e:
+            print(f"Error processing PDF {pdf_path}: {e}")
+            pages[pdf_path] = []
+            continue
+        pages[pdf_path] = []
+        tasks.extend((pdf_path, first, min(first + pages_per_task, num_pages)) for first in range(0, num_pages, pages_per_task))
+
+    if workers == 1:
+        results = []
+        for pdf_path, first, last in tasks:
+            try:
+                results.append(extract_page_range(pdf_path, first, last, include_tables, page_timeout))
+            except Exception as e: # e.g. a PDF that cannot be opened, the other ranges and files are still extracted
+                results.append(_failed_range(pdf_path, first, last, str(e)))
+    else:
+        results = _run_in_pool(tasks, workers, include_tables, page_timeout)
+
+    # tasks were created in (pdf, page) order and results are collected in task order, so output order is deterministic
+    for (pdf_path, _, _), records in zip(tasks, results):
+        for record in records:
+            if record["error"]:
+                print(f"Warning: Error processing page {record['page'] + 1} in {pdf_path}: {record['error']}")
+        pages[pdf_path].extend(records)
+
+    if cache:
+        for pdf_path in {pdf_path for pdf_path, _, _ in tasks}:
+            # pages that failed or timed out are retried next run instead of being cached empty
+            if pdf_path in digests and not any(record["error"] for record in pages[pdf_path]):
+                cache.put(digests[pdf_path], include_tables, pages[pdf_path])
+        print(f"Extraction cache: {hits}/{len(pdf_paths)} PDFs from cache, ~{seconds_saved:.1f}s of parsing saved")
+    return pages
+
+def format_content(page_records: List[Dict], table_format: Optional[str] = "plain") -> str:
+    full_content = []
+    for record in page_records:
+        if record["text"]:
+            full_content.append(record["text"])
+        if table_format is None:
+            continue
+        for table in record["tables"]:
+            df = pd.DataFrame(table).fillna('').replace(r'^\s*$', '', regex=True) # remove empty strings
+            full_content.append(TABLE_FORMATS[table_format].format(table=df.to_string(index=False, header=False)))
+    return "\n".join(full_content) # this will join all the text and tables extracted from the pdf into a single string. The tables are formatted as strings with headers and indices removed.
+
+def extract_contents(pdf_paths: List[str], table_format: Optional[str] = "plain", workers: Optional[int] = None, cache: Union[ExtractionCache, None, bool] = None) -> Dict[str, str]:
+    """{pdf_path: full text with tables rendered in table_format}, see extract_pages for the parallelism and caching."""
+    pages = extract_pages(pdf_paths, workers=workers, include_tables=table_format is not None, cache=cache)
+    return {pdf_path: format_content(records, table_format) for pdf_path, records in pages.items()}
+
+def extract_content_from_pdf(pdf_path: str, table_format: Optional[str] = "plain", workers: Optional[int] = 1, cache: Union[ExtractionCache, None, bool] = None) -> str:
+    return extract_contents([pdf_path], table_format, workers, cache)[pdf_path]
@@ -0,0 +1,136 @@
+from array import array
+from bisect import bisect_left
+from typing import List, Sequence
+from bitmapPostings import Bitmap, is_dense
+
+# Set algebra over sorted, duplicate-free integer posting lists (array('i') of doc ids, see compactIndex.py).
+# Results are sorted arrays again, so operators compose. When both operands are of similar length a C-level
+# set operation beats any Python loop, so the galloping paths are only taken when one side is much shorter
+# (SKEW times or more), which is exactly when they skip most of the longer list.
+# Dense terms come as Bitmaps (see bitmapPostings.py): bitmap with bitmap is a word-wise operation, bitmap with
+# list checks each listed doc against the bitmap, and results stay bitmaps only while they can still be dense.
+SKEW = 8
+
+
+def gallop(postings: Sequence[int], target: int, lo: int = 0) -> int:
+    """
+    First position >= lo holding a value >= target. Probes lo, lo+1, lo+3, lo+7, ... before binary searching
+    the last gap, so skipping k entries costs O(log k) instead of O(k) or O(log n).
+    """
+    n = len(postings)
+    step = 1
+    hi = lo
+    while hi < n and postings[hi] < target:
+        lo = hi + 1
+        hi += step
+        step <<= 1
+    return bisect_left(postings, target, lo, min(hi, n))
+
+def to_array(postings) -> array:
+    return postings.to_array() if isinstance(postings, Bitmap) else array('i', postings)
+
+def _shrink(bitmap: Bitmap):
+    # a bitmap result that is no longer dense goes back to a sorted list, so later steps can gallop over it
+    return bitmap if is_dense(len(bitmap), bitmap.num_docs) else bitmap.to_array()
+
+def intersect(a: Sequence[int], b: Sequence[int]) -> array:
+    if isinstance(a, Bitmap) and isinstance(b, Bitmap):
+        return _shrink(a & b)
+    if isinstance(a, Bitmap) or isinstance(b, Bitmap):
+        return a.filter(b) if isinstance(a, Bitmap) else b.filter(a)
+    # walk the shorter list and gallop through the longer one: cost ~ len(short) * log(len(long) / len(short))
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) < SKEW * len(a):
+        return array('i', sorted(set(a).intersection(b)))
+    out = array('i')
+    j = 0
+    n = len(b)
+    for doc in a:
+        j = gallop(b, doc, j)
+        if j == n:
+            break
+        if b[j] == doc:
+            out.append(doc)
+            j += 1
+    return out
+
+def intersect_many(lists: List[Sequence[int]]) -> array:
+    """Intersection of all lists, smallest first so every step works on the smallest intermediate result."""
+    if not lists:
+        return array('i')
+    lists = sorted(lists, key=len)
+    result = lists[0] if isinstance(lists[0], Bitmap) else array('i', lists[0])
+    for postings in lists[1:]:
+        if not result:
+            break
+        result = intersect(result, postings)
+    return result
+
+def difference(a: Sequence[int], b: Sequence[int]) -> array:
+    """a AND NOT b, without materializing NOT b: every doc of a is looked up in b by galloping."""
+    if isinstance(a, Bitmap):
+        return _shrink(a - (b if isinstance(b, Bitmap) else Bitmap.from_docs(b, a.num_docs)))
+    if isinstance(b, Bitmap):
+        return b.filter(a, keep=False)
+    if len(b) < SKEW * len(a):
+        exclude = set(b)
+        return array('i', [doc for doc in a if doc not in exclude])
+    out = array('i')
+    j = 0
+    n = len(b)
+    for doc in a:
+        if j < n:
+            j = gallop(b, doc, j)
+        if j == n or b[j] != doc:
+            out.append(doc)
+    return out
+
+def union(a: Sequence[int], b: Sequence[int]) -> array:
+    if isinstance(a, Bitmap) or isinstance(b, Bitmap):
+        return union_many([a, b])
+    # a hash-union plus a C-level sort beats a pure Python two-way merge by a wide margin
+    if not a:
+        return array('i', b)
+    if not b:
+        return array('i', a)
+    return array('i', sorted(set(a).union(b)))
+
+def union_many(lists: List[Sequence[int]]) -> array:
+    bitmaps = [postings for postings in lists if isinstance(postings, Bitmap)]
+    if bitmaps:
+        merged = bitmaps[0]
+        for postings in lists:
+            if postings is not bitmaps[0]:
+                merged = merged | (postings if isinstance(postings, Bitmap) else Bitmap.from_docs(postings, merged.num_docs))
+        return merged
+    merged = set()
+    for postings in lists:
+        merged.update(postings)
+    return array('i', sorted(merged))
+
+def complement(a: Sequence[int], num_docs: int) -> array:
+    """Every doc id in [0, num_docs) not in a, as a bitmap. Only needed when a whole query is negated."""
+    return ~(a if isinstance(a, Bitmap) else Bitmap.from_docs(a, num_docs))
+
+# Token position lists (sorted positions of one term in one doc, see CompactIndex.positions)
+
+def phrase_starts(position_lists: List[Sequence[int]]) -> array:
+    """Positions p where the i-th list holds p + i for every i: the starts of the phrase made of those terms."""
+    starts = array('i', position_lists[0])
+    for offset, positions in enumerate(position_lists[1:], 1):
+        if not starts:
+            break
+        starts = intersect(starts, array('i', [position - offset for position in positions]))
+    return starts
+
+def within(a: Sequence[int], b: Sequence[int], k: int, a_length: int = 1, b_length: int = 1) -> bool:
+    """
+    Whether a span starting in a (a_length tokens long) and one starting in b are at most k tokens apart, in
+    either order. Adjacent spans are 1 apart. Each start of a is checked with one binary search in b.
+    """
+    for start in a:
+        i = bisect_left(b, start - (b_length - 1) - k)
+        if i < len(b) and b[i] <= start + (a_length - 1) + k:
+            return True
+    return False
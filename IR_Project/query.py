@@ -1,45 +1,72 @@
-import faiss
-import numpy as np
-import openai
-import pickle
-from openai import OpenAI
+import asyncio
+from retriever import FaissRetriever
+from embeddingCache import get_default_cache
+from openaiClients import get_client, get_async_client
 
 
-def get_embedding(text, api_key,model="text-embedding-ada-002"):
+def user_query_text(message):
+    '''The UI posts the whole conversation as [{"role", "content"}, ...], retrieval runs on the latest user turn.'''
+    if isinstance(message, list):
+        user_turns = [m['content'] for m in message if m.get('role') == 'user']
+        return user_turns[-1] if user_turns else ""
+    return message
+
+def get_embedding(text, api_key,model="text-embedding-ada-002", cache=None):
+
+    text = text.replace("\n", " ")
+
+    # repeated (and re-phrased-to-the-same) queries are answered from the on-disk cache without a network round trip
+    cache = cache if cache is not None else get_default_cache()
+    embedding = cache.get(model, text)
+    if embedding is not None:
+        return embedding
+
+    client = get_client(api_key)
+    embedding = client.embeddings.create(input = [text], model=model).data[0].embedding
+    cache.put(model, text, embedding)
+    return embedding
+
+async def get_embedding_async(text, api_key, model="text-embedding-ada-002", cache=None):
 
-    client = OpenAI(api_key=api_key)
     text = text.replace("\n", " ")
 
-    return client.embeddings.create(input = [text], model=model).data[0].embedding
+    # SQLite reads/commits happen off the event loop
+    cache = cache if cache is not None else get_default_cache()
+    embedding = await asyncio.to_thread(cache.get, model, text)
+    if embedding is not None:
+        return embedding
 
-def query_faiss(query_text, api_key, top_k=7):
+    client = get_async_client(api_key)
+    embedding = (await client.embeddings.create(input = [text], model=model)).data[0].embedding
+    await asyncio.to_thread(cache.put, model, text, embedding)
+    return embedding
 
-    index = faiss.read_index("vector_index4.faiss")
+def query_faiss(query_text, api_key, top_k=7, retriever=None):
 
-    with open("chunks_metadata4.pkl", "rb") as f:
-        pdf_files = pickle.load(f)
+    # without a resident retriever (e.g. one-off scripts) fall back to loading the index for this call
+    if retriever is None:
+        retriever = FaissRetriever("vector_index4.faiss", "chunks_metadata4.pkl")
 
     query_vector = get_embedding(query_text, api_key)
-    query_vector = np.array(query_vector).reshape(1, -1).astype('float32')
-    
-    #print(f"DataFrame size: {len(pdf_files)}")
-    
-    distances, indices = index.search(query_vector, top_k)
-    
-    #print(f"FAISS returned indices: {indices[0]}")
-    
-     # Add bounds checking
-    valid_results = []
-    for i, idx in enumerate(indices[0]):
-        if 0 <= idx < len(pdf_files):
-            valid_results.append((pdf_files.iloc[idx]['chunk_text'], distances[0][i]))
-        else:
-            print(f"Warning: Index {idx} is out of bounds")
-    
-    return valid_results
 
-def query(userQuery, openai_api_key):
-    results = query_faiss(userQuery,openai_api_key)
+    results = retriever.search(query_vector, top_k)
+    return [(chunk_text, distance) for chunk_text, distance, _ in results]
+
+async def query_faiss_async(query_text, api_key, top_k=7, retriever=None):
+
+    if retriever is None:
+        retriever = await asyncio.to_thread(FaissRetriever, "vector_index4.faiss", "chunks_metadata4.pkl")
+
+    query_vector = await get_embedding_async(query_text, api_key)
+
+    # the faiss search releases the GIL, running it in a worker thread keeps the event loop responsive
+    results = await asyncio.to_thread(retriever.search, query_vector, top_k)
+    return [(chunk_text, distance) for chunk_text, distance, _ in results]
+
+def build_messages(userQuery, openai_api_key, retriever=None):
+    return format_messages(userQuery, query_faiss(userQuery,openai_api_key, retriever=retriever))
+
+def format_messages(userQuery, results):
     # print("\nResults:")
     # for text, score in results:
     #     print(f"Score: {score:.4f}")
@@ -50,13 +77,16 @@ def query(userQuery, openai_api_key):
         resultString+=(f'{i}th Retreived chunk:{chunk_text}... its cosine distance from query vector {distance}\n')
     # print(resultString)
 
-    client = OpenAI(api_key=openai_api_key)
     m = [
         {"role": "developer", "content": f"You will be given a query and top k retreived segments alongside their file location, you must be a helpful assistant and provide the most relevant useful information to the user. The query will be related to regulation / document retrieval from a set of guidelines designed for BITS Pilani. Do not produce extra information. Try to be brief in responses. Your core job is to sythesize the raw data retreived into a coherent and useful response."},
         {"role": "user", "content": f"The query is {userQuery} and the retreived documents are {resultString}."}
     ]
+    return m
 
+def query(userQuery, openai_api_key, retriever=None):
+    m = build_messages(userQuery, openai_api_key, retriever=retriever)
 
+    client = get_client(openai_api_key)
     completion = client.chat.completions.create(
         model="gpt-4o-mini-2024-07-18",
         messages=m
@@ -64,6 +94,44 @@ def query(userQuery, openai_api_key):
     print("Model Response: ")
     # print(completion.choices[0].message.content)
     return completion.choices[0].message.content
+
+def query_stream(userQuery, openai_api_key, retriever=None):
+    '''Same answer as query(), yielded piece by piece as the model generates it.'''
+    m = build_messages(userQuery, openai_api_key, retriever=retriever)
+
+    client = get_client(openai_api_key)
+    stream = client.chat.completions.create(
+        model="gpt-4o-mini-2024-07-18",
+        messages=m,
+        stream=True
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+async def query_async(userQuery, openai_api_key, retriever=None):
+    '''query() for the async server: the embedding and completion calls share the process-wide async client.'''
+    m = format_messages(userQuery, await query_faiss_async(userQuery, openai_api_key, retriever=retriever))
+
+    client = get_async_client(openai_api_key)
+    completion = await client.chat.completions.create(
+        model="gpt-4o-mini-2024-07-18",
+        messages=m
+    )
+    return completion.choices[0].message.content
+
+async def query_stream_async(userQuery, openai_api_key, retriever=None):
+    m = format_messages(userQuery, await query_faiss_async(userQuery, openai_api_key, retriever=retriever))
+
+    client = get_async_client(openai_api_key)
+    stream = await client.chat.completions.create(
+        model="gpt-4o-mini-2024-07-18",
+        messages=m,
+        stream=True
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
 # api_key = ""
 # query("For submitting an industry research proposal, what are the different budget heads?", api_key)
 
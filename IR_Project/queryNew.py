@@ -1,68 +1,142 @@
-import faiss
-import numpy as np
-import openai
-import pickle
-from openai import OpenAI
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from retriever import FaissRetriever
+from embeddingCache import get_default_cache
+from openaiClients import get_client
+from reranker import get_reranker
+from analyzer import tokenize
+from compactIndex import CompactIndex
+from chunkStore import lexical_index_path_for
+from maxScore import max_score_top_k
+
+def get_embedding(text, api_key,model="text-embedding-ada-002", cache=None):
 
-def get_embedding(text, api_key,model="text-embedding-ada-002"):
-
-    client = OpenAI(api_key=api_key)
     text = text.replace("\n", " ")
 
-    return client.embeddings.create(input = [text], model=model).data[0].embedding
+    # repeated (and re-phrased-to-the-same) queries are answered from the on-disk cache without a network round trip
+    cache = cache if cache is not None else get_default_cache()
+    embedding = cache.get(model, text)
+    if embedding is not None:
+        return embedding
 
-def query_faiss(query_text, api_key, top_k=7):
+    client = get_client(api_key)
+    embedding = client.embeddings.create(input = [text], model=model).data[0].embedding
+    cache.put(model, text, embedding)
+    return embedding
 
-    index = faiss.read_index("vector_index.faiss")
+def query_faiss(query_text, api_key, top_k=7, retriever=None):
 
-    with open("chunks_metadata.pkl", "rb") as f:
-        pdf_files = pickle.load(f)
+    if retriever is None:
+        retriever = FaissRetriever("vector_index4.faiss", "chunks_metadata4.pkl")
 
     query_vector = get_embedding(query_text, api_key)
-    query_vector = np.array(query_vector).reshape(1, -1).astype('float32')
-    
-    distances, indices = index.search(query_vector, top_k)
-    
-    # Add bounds checking
-    valid_results = []
-
-    for i, idx in enumerate(indices[0]):
-        if 0 <= idx < len(pdf_files):
-            valid_results.append((pdf_files.iloc[idx]['chunk_text'], distances[0][i], pdf_files.iloc[idx]['pdf_files']))
-        else:
-            print(f"Warning: Index {idx} is out of bounds")
-    return valid_results
-
-def rerank_with_cross_encoder(query, chunk_tuples, model_name="cross-encoder/ms-marco-MiniLM-L-6-v2", device=None):
+
+    return retriever.search(query_vector, top_k)
+
+### ------------------------ Hybrid (dense + BM25) retrieval ------------------------
+
+# the dense search waits on the embedding request, so it runs here while BM25 runs on the calling thread
+_search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="dense-search")
+_lexical_indexes = {}
+_lexical_indexes_lock = threading.Lock()
+
+def get_lexical_index(metadata_path="chunks_metadata4.pkl"):
+    """
+    The BM25 index main.py writes next to the dense index's metadata, over the same chunks and keyed by the same
+    faiss ids, mapped once per process. None when it has not been built, hybrid_search is then dense only.
+    """
+    path = lexical_index_path_for(metadata_path)
+    with _lexical_indexes_lock:
+        if path not in _lexical_indexes:
+            if os.path.exists(path):
+                _lexical_indexes[path] = CompactIndex.load(path)
+            else:
+                print(f"BM25 index {path} not found, run main.py to build it. Retrieval is dense only.")
+                _lexical_indexes[path] = None
+    return _lexical_indexes[path]
+
+def fuse(result_lists, top_k=7, method="rrf", rrf_k=60, weights=None):
+    """
+    result_lists: lists of (chunk_id, score), best first, higher score is better. Both searches run over the same
+    chunks and return their faiss ids, so a chunk both searches found gets both contributions.
+    method="rrf" sums weight / (rrf_k + rank); method="weighted" sums weight * score min-max normalised per list.
+    Returns the top_k as (chunk_id, fused_score), best first.
+    """
+    weights = weights or [1.0] * len(result_lists)
+    fused = {}
+    for results, weight in zip(result_lists, weights):
+        if not results:
+            continue
+        low = min(score for _, score in results)
+        high = max(score for _, score in results)
+        for rank, (chunk_id, score) in enumerate(results, 1):
+            if method == "rrf":
+                contribution = weight / (rrf_k + rank)
+            elif method == "weighted":
+                contribution = weight * ((score - low) / (high - low) if high > low else 1.0)
+            else:
+                raise ValueError(f"Unknown fusion method {method!r}, expected 'rrf' or 'weighted'")
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + contribution
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+def hybrid_search(query_text, api_key, top_k=7, retriever=None, lexical_index=None, candidates=20, method="rrf", rrf_k=60, dense_weight=0.5, embedding_cache=None):
+    """
+    Runs the dense (FAISS) and lexical (BM25) searches concurrently, `candidates` chunks each, and fuses them on the
+    chunk id (see fuse); exact terms such as "DRC" or "INR 25,000" are found by BM25 even when the embedding misses them.
+    lexical_index defaults to the BM25 index main.py wrote for the retriever's metadata (get_lexical_index).
+    Returns (top_k as (chunk_text, fused_score, sourceDoc), per-stage latency in ms). "retrieval_ms" is the wall time
+    of the fan-out, to compare with "dense_ms" (embed + faiss) and "bm25_ms" run one after the other.
+    """
+    if retriever is None:
+        retriever = FaissRetriever("vector_index4.faiss", "chunks_metadata4.pkl")
+    if lexical_index is None:
+        lexical_index = get_lexical_index(retriever.metadata_path)
+    timings = {}
+
+    def dense():
+        start = time.perf_counter()
+        query_vector = get_embedding(query_text, api_key, cache=embedding_cache)
+        timings["embed_ms"] = (time.perf_counter() - start) * 1000
+        results = retriever.search_with_ids(query_vector, candidates)
+        timings["dense_ms"] = (time.perf_counter() - start) * 1000
+        timings["faiss_ms"] = timings["dense_ms"] - timings["embed_ms"]
+        # smaller distance is closer, fuse expects higher is better
+        return [(chunk_id, -float(distance)) for chunk_id, _, distance, _ in results]
+
+    start = time.perf_counter()
+    dense_future = _search_pool.submit(dense)
+    lexical_results = []
+    if lexical_index is not None:
+        top, _ = max_score_top_k(lexical_index, tokenize(query_text), candidates)
+        lexical_results = [(int(lexical_index.chunk_ids[doc]), score) for doc, score in top]
+    timings["bm25_ms"] = (time.perf_counter() - start) * 1000
+    dense_results = dense_future.result()
+    timings["retrieval_ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    fused = []
+    for chunk_id, score in fuse([dense_results, lexical_results], top_k, method, rrf_k, [dense_weight, 1 - dense_weight]):
+        chunk = retriever.lookup(chunk_id)
+        if chunk is not None: # a BM25 index older than the dense index can name chunks since removed
+            fused.append((chunk[0], score, chunk[1]))
+    timings["fusion_ms"] = (time.perf_counter() - start) * 1000
+    return fused, timings
+
+def rerank_with_cross_encoder(query, chunk_tuples, model_name="cross-encoder/ms-marco-MiniLM-L-6-v2", device=None, backend=None):
     """
     chunk_tuples: list of (chunk_text, distance, sourceDoc)
     Returns: list of (chunk_text, distance, sourceDoc, cross_score) sorted by cross_score descending
+    The model is loaded on the first call and reused by every later one (see reranker.get_reranker).
     """
-    if device is None:
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForSequenceClassification.from_pretrained(model_name).to(device)
-    model.eval()
-    pairs = [(query, chunk_text) for chunk_text, _, _ in chunk_tuples]
-    inputs = tokenizer([q for q, c in pairs], [c for q, c in pairs], padding=True, truncation=True, return_tensors="pt", max_length=512)
-    inputs = {k: v.to(device) for k, v in inputs.items()}
-    with torch.no_grad():
-        outputs = model(**inputs)
-        scores = outputs.logits.squeeze(-1).cpu().numpy()
-    reranked = [
-        (chunk_text, distance, sourceDoc, float(score))
-        for (chunk_text, distance, sourceDoc), score in zip(chunk_tuples, scores)
-    ]
-    reranked.sort(key=lambda x: x[3], reverse=True)
-    return reranked
+    return get_reranker(model_name, backend=backend, device=device).rerank(query, chunk_tuples)
 
-def query(userMessages, openai_api_key):
+def query(userMessages, openai_api_key, retriever=None, hybrid=True):
     # Accept both string and list input for userMessages
     if isinstance(userMessages, str):
         userMessages = [{"role": "user", "content": userMessages}]
-    client = OpenAI(api_key=openai_api_key)
+    client = get_client(openai_api_key)
     userQuery = userMessages[-1]['content']
     systemPrompt = """You’re a retrieval‑query optimizer specialized for a BITS Pilani corpus. 
     Transform any user question into a concise, high-precision query that maximizes finding the exact  section. 
@@ -97,15 +171,25 @@ def query(userMessages, openai_api_key):
     updatedQuery = response.choices[0].message.content
     print("Updated Query", updatedQuery)
 
-    results = query_faiss(updatedQuery, openai_api_key)
+    timings = {}
+    if hybrid:
+        # only the fused top-k reaches the cross-encoder
+        results, timings = hybrid_search(updatedQuery, openai_api_key, retriever=retriever)
+        score_name = "fused retrieval score"
+    else:
+        results = query_faiss(updatedQuery, openai_api_key, retriever=retriever)
+        score_name = "cosine distance from query vector"
 
     # Rerank using Cross Encoder
+    start = time.perf_counter()
     reranked = rerank_with_cross_encoder(updatedQuery, results)
+    timings["rerank_ms"] = (time.perf_counter() - start) * 1000
+    print("Retrieval latency", {stage: round(ms, 1) for stage, ms in timings.items()})
 
     resultString = ""
     for i, (chunk_text, distance, sourceDoc, cross_score) in enumerate(reranked):
         resultString += (
-            f'{i}th Retreived chunk:{chunk_text}... its cosine distance from query vector {distance} its source document {sourceDoc}\n'
+            f'{i}th Retreived chunk:{chunk_text}... its {score_name} {distance} its source document {sourceDoc}\n'
         )
 
     m = [
@@ -0,0 +1,217 @@
+import time
+from array import array
+from typing import List, Optional
+from postingLists import intersect, intersect_many, difference, union_many, complement, to_array, phrase_starts, within
+
+# Boolean query planner, between parsing (booleanQueryNew.tokenize_query / infix_to_postfix) and evaluation:
+#   build_ast  postfix tokens -> tree of PlanNode
+#   rewrite    NOT NOT x -> x, nested AND/OR flattened, De Morgan so negations end up as AND-NOT conjuncts
+#   plan       estimates result sizes from document frequencies and orders conjuncts most selective first
+#   execute    evaluates the plan; every node is evaluated against the candidates left by the conjuncts
+#              before it, so (a || b) && c only looks at a and b inside c instead of unioning them first
+#   explain    the plan with estimated and actual sizes
+# "Phrases" and a NEAR/k b are leaves for the rewrites; they are evaluated on the docs containing all their words,
+# by merging the token position lists of those words (CompactIndex.positions).
+
+# how operators are written in queries, for error messages
+OPERATOR_NAMES = {'AND': '&&', 'OR': '||', 'NOT': '~'}
+
+
+class PlanNode:
+    __slots__ = ("op", "term", "children", "estimate", "expected", "actual", "elapsed_ms")
+
+    def __init__(self, op: str, children: Optional[List["PlanNode"]] = None, term: Optional[str] = None):
+        self.op = op  # 'TERM', 'PHRASE' (term holds the words), 'NEAR' (term holds k), 'AND', 'OR' or 'NOT'
+        self.term = term
+        self.children = children or []
+        self.estimate = None  # result size on its own
+        self.expected = None  # result size among the candidates it is evaluated against, comparable to actual
+        self.actual = None
+        self.elapsed_ms = None
+
+    def __repr__(self):
+        if self.op == 'TERM':
+            return self.term
+        if self.op == 'PHRASE':
+            return f'"{self.term}"'
+        if self.op == 'NEAR':
+            return f"({self.children[0]!r} NEAR/{self.term} {self.children[1]!r})"
+        if self.op == 'NOT':
+            return f"~{self.children[0]!r}"
+        return "(" + f" {'&&' if self.op == 'AND' else '||'} ".join(repr(child) for child in self.children) + ")"
+
+
+def build_ast(postfix: List[str]) -> Optional[PlanNode]:
+    """Raises ValueError for a malformed query (an operator without its operands)."""
+    stack = []
+    for token in postfix:
+        arity = 1 if token == 'NOT' else 2 if token in ('AND', 'OR') or token.startswith('NEAR/') else 0
+        if len(stack) < arity:
+            raise ValueError(f"{OPERATOR_NAMES.get(token, token)} is missing an operand")
+        if token in ('AND', 'OR'):
+            op2, op1 = stack.pop(), stack.pop()
+            stack.append(PlanNode(token, [op1, op2]))
+        elif token == 'NOT':
+            stack.append(PlanNode('NOT', [stack.pop()]))
+        elif token.startswith('NEAR/'):
+            op2, op1 = stack.pop(), stack.pop()
+            if op1.op not in ('TERM', 'PHRASE') or op2.op not in ('TERM', 'PHRASE'):
+                raise ValueError(f"{token} needs a term or a \"phrase\" on both sides")
+            stack.append(PlanNode('NEAR', [op1, op2], term=token[len('NEAR/'):]))
+        elif token.startswith('"'):
+            stack.append(PlanNode('PHRASE', term=token.strip('"')))
+        else:
+            stack.append(PlanNode('TERM', term=token))
+    return stack[0] if stack else None
+
+def negate(node: PlanNode) -> PlanNode:
+    return node.children[0] if node.op == 'NOT' else PlanNode('NOT', [node])
+
+def rewrite(node: PlanNode) -> PlanNode:
+    if node.op in ('TERM', 'PHRASE', 'NEAR'):
+        return node
+    children = [rewrite(child) for child in node.children]
+
+    if node.op == 'NOT':
+        child = children[0]
+        if child.op == 'NOT':
+            return child.children[0]                                     # ~~a = a
+        if child.op == 'OR':
+            return rewrite(PlanNode('AND', [negate(c) for c in child.children]))  # ~(a | b) = ~a & ~b
+        if child.op == 'AND' and all(c.op == 'NOT' for c in child.children):
+            return rewrite(PlanNode('OR', [negate(c) for c in child.children]))   # ~(~a & ~b) = a | b
+        return PlanNode('NOT', [child])
+
+    # flatten (a & b) & c into one n-ary node
+    flat = []
+    for child in children:
+        flat.extend(child.children if child.op == node.op else [child])
+
+    if node.op == 'OR' and any(child.op == 'NOT' for child in flat):
+        # a | ~b = ~(~a & b): the negation moves to the top, where a parent AND turns it into an AND-NOT
+        return PlanNode('NOT', [rewrite(PlanNode('AND', [negate(child) for child in flat]))])
+    return PlanNode(node.op, flat)
+
+def estimate(node: PlanNode, index) -> float:
+    """Expected result size, assuming terms occur independently of each other."""
+    n = max(index.num_docs, 1)
+    if node.op == 'TERM':
+        node.estimate = float(index.doc_freq(node.term))
+    elif node.op in ('PHRASE', 'NEAR'):
+        # words of a phrase are anything but independent: bounded by the rarest word instead
+        for child in node.children:
+            estimate(child, index)
+        node.estimate = float(min((index.doc_freq(word) for word in _words(node)), default=0))
+    elif node.op == 'NOT':
+        node.estimate = n - estimate(node.children[0], index)
+    elif node.op == 'AND':
+        selectivity = 1.0
+        for child in node.children:
+            selectivity *= estimate(child, index) / n
+        node.estimate = n * selectivity
+    else:
+        miss = 1.0
+        for child in node.children:
+            miss *= 1 - estimate(child, index) / n
+        node.estimate = n * (1 - miss)
+    return node.estimate
+
+def reorder(node: PlanNode) -> None:
+    # conjuncts: most selective positive ones first (they shrink the candidates), negations last (each only
+    # removes docs from what is left); disjuncts: largest first, later ones mostly add little
+    for child in node.children:
+        reorder(child)
+    if node.op == 'AND':
+        node.children.sort(key=lambda child: (child.op == 'NOT', child.estimate))
+    elif node.op == 'OR':
+        node.children.sort(key=lambda child: -child.estimate)
+
+def expect(node: PlanNode, index, fraction: float = 1.0) -> None:
+    # fraction: share of all docs still among the candidates when node is evaluated
+    node.expected = node.estimate * fraction
+    n = max(index.num_docs, 1)
+    for child in node.children:
+        expect(child, index, fraction)
+        if node.op == 'AND':
+            fraction *= child.estimate / n
+
+def plan(postfix: List[str], index) -> Optional[PlanNode]:
+    root = build_ast(postfix)
+    if root is None:
+        return None
+    root = rewrite(root)
+    estimate(root, index)
+    reorder(root)
+    expect(root, index)
+    return root
+
+def _words(node: PlanNode) -> List[str]:
+    if node.op == 'NEAR':
+        return _words(node.children[0]) + _words(node.children[1])
+    return node.term.split()
+
+def _spans(node: PlanNode, index, doc: int) -> array:
+    # start positions in doc of a term or phrase
+    if node.op == 'TERM':
+        return index.positions(node.term, doc)
+    return phrase_starts([index.positions(word, doc) for word in _words(node)])
+
+def _positional(node: PlanNode, index, candidates=None) -> array:
+    words = _words(node)
+    if not words:
+        return array('i')
+    lists = [index.boolean_postings(word) for word in set(words)]
+    docs = to_array(intersect_many(lists if candidates is None else lists + [candidates]))
+    if node.op == 'PHRASE':
+        return array('i', [doc for doc in docs if _spans(node, index, doc)])
+    a, b = node.children
+    k = int(node.term)
+    a_length, b_length = len(_words(a)), len(_words(b))
+    return array('i', [doc for doc in docs if within(_spans(a, index, doc), _spans(b, index, doc), k, a_length, b_length)])
+
+def execute(node: Optional[PlanNode], index, candidates=None):
+    """
+    Docs matching node, as a sorted array or a Bitmap (postingLists.to_array makes either an array). With candidates, only docs among them are returned, which lets every node
+    gallop through its postings from a (usually small) candidate list instead of materializing its full result.
+    """
+    if node is None:
+        return array('i')
+    start = time.perf_counter()
+    if node.op == 'TERM':
+        postings = index.boolean_postings(node.term)
+        result = postings if candidates is None else intersect(candidates, postings)
+    elif node.op in ('PHRASE', 'NEAR'):
+        result = _positional(node, index, candidates)
+    elif node.op == 'NOT':
+        child = node.children[0]
+        if child.op == 'TERM' and candidates is not None:
+            # AND-NOT straight against the postings, no need to first intersect them with the candidates
+            excluded = index.boolean_postings(child.term)
+        else:
+            excluded = execute(child, index, candidates)
+        result = complement(excluded, index.num_docs) if candidates is None else difference(candidates, excluded)
+    elif node.op == 'AND':
+        result = candidates
+        for child in node.children:
+            result = execute(child, index, result)
+            if not result:
+                break
+    else:
+        result = union_many([execute(child, index, candidates) for child in node.children])
+    node.actual = len(result)
+    node.elapsed_ms = (time.perf_counter() - start) * 1000
+    return result
+
+def explain(node: Optional[PlanNode], depth: int = 0) -> str:
+    """
+    The plan tree in evaluation order. size is a node's estimated result on its own; est and actual are
+    its estimated and (after execute) actual result among the candidates it was evaluated against.
+    """
+    if node is None:
+        return "(empty query)"
+    label = {'TERM': node.term, 'PHRASE': repr(node), 'NEAR': f"NEAR/{node.term}"}.get(node.op, node.op)
+    actual = "-" if node.actual is None else node.actual
+    elapsed = "" if node.elapsed_ms is None else f"  {node.elapsed_ms:.3f} ms"
+    lines = [f"{'  ' * depth}{label:<{max(30 - 2 * depth, 1)}} size={node.estimate:>10.1f}  est={node.expected:>10.1f}  actual={actual:>8}{elapsed}"]
+    lines.extend(explain(child, depth + 1) for child in node.children)
+    return "\n".join(lines)
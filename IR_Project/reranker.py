@@ -0,0 +1,148 @@
+import os
+import threading
+import numpy as np
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from typing import Dict, List, Optional, Tuple
+
+# torch      - the fp32 model as published
+# torch_int8 - torch dynamic quantization of the Linear layers (no extra dependency, ~2x faster on CPU)
+# onnx       - exported once to ONNX and served by onnxruntime (optional dependency)
+# onnx_int8  - the ONNX export with onnxruntime dynamic int8 quantization
+BACKENDS = ("torch", "torch_int8", "onnx", "onnx_int8")
+
+
+class CrossEncoderReranker:
+    """
+    Cross-encoder reranker that is loaded once per process (see get_reranker) instead of on every query.
+
+    Scoring is bounded so a request cannot get arbitrarily slow: at most max_candidates chunks are scored,
+    every (query, chunk) pair is truncated to max_length tokens, and pairs are sorted by length and scored
+    in batches of batch_size, so short pairs are not padded up to the longest one in the request.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        backend: str = "torch",
+        device: Optional[str] = None,
+        max_candidates: int = 20,
+        max_length: int = 256,
+        batch_size: int = 8,
+        onnx_dir: str = "reranker_onnx"
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown reranker backend {backend!r}, expected one of {BACKENDS}")
+        self.model_name = model_name
+        self.backend = backend
+        self.max_candidates = max_candidates
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.onnx_dir = onnx_dir
+        # quantized and ONNX models are CPU-only
+        self.device = device or ("cuda" if torch.cuda.is_available() and backend == "torch" else "cpu")
+        self.lock = threading.Lock() # torch modules and ORT sessions are shared by every request thread
+        self.model = None
+        self.session = None
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.load()
+
+    def load(self):
+        model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+        model.eval()
+        if self.backend == "torch":
+            self.model = model.to(self.device)
+        elif self.backend == "torch_int8":
+            self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            self.session = self.load_onnx_session(model)
+
+    def load_onnx_session(self, model):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("The onnx reranker backends need onnxruntime: pip install onnxruntime")
+
+        # the export is keyed by model name so a second model does not pick up the first one's graph
+        model_dir = os.path.join(self.onnx_dir, self.model_name.replace("/", "__"))
+        fp32_path = os.path.join(model_dir, "model.onnx")
+        int8_path = os.path.join(model_dir, "model.int8.onnx")
+        if not os.path.exists(fp32_path):
+            os.makedirs(model_dir, exist_ok=True)
+            dummy = self.tokenizer(["query"], ["passage"], return_tensors="pt")
+            input_names = list(dummy.keys())
+            torch.onnx.export(
+                model,
+                tuple(dummy[name] for name in input_names),
+                fp32_path,
+                input_names=input_names,
+                output_names=["logits"],
+                dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in input_names}, "logits": {0: "batch"}},
+                opset_version=14
+            )
+            print(f"Exported reranker to {fp32_path}")
+        path = fp32_path
+        if self.backend == "onnx_int8":
+            if not os.path.exists(int8_path):
+                from onnxruntime.quantization import quantize_dynamic, QuantType
+                quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+                print(f"Quantized reranker to {int8_path}")
+            path = int8_path
+        session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        self.onnx_inputs = [i.name for i in session.get_inputs()]
+        return session
+
+    def score_batch(self, queries: List[str], passages: List[str]) -> np.ndarray:
+        if self.session is not None:
+            inputs = self.tokenizer(queries, passages, padding=True, truncation=True, max_length=self.max_length, return_tensors="np")
+            feed = {name: inputs[name].astype(np.int64) for name in self.onnx_inputs}
+            return self.session.run(["logits"], feed)[0].reshape(-1)
+        inputs = self.tokenizer(queries, passages, padding=True, truncation=True, max_length=self.max_length, return_tensors="pt")
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        with torch.no_grad():
+            return self.model(**inputs).logits.reshape(-1).float().cpu().numpy()
+
+    def score(self, query: str, passages: List[str]) -> np.ndarray:
+        """Cross-encoder score of every passage against the query, in the order given."""
+        if not passages:
+            return np.zeros(0, dtype=np.float32)
+        # length buckets: neighbouring pairs in sorted order need (almost) the same padding
+        lengths = [len(ids) for ids in self.tokenizer([query] * len(passages), passages, truncation=True, max_length=self.max_length)["input_ids"]]
+        order = np.argsort(lengths, kind="stable")
+        scores = np.zeros(len(passages), dtype=np.float32)
+        with self.lock:
+            for i in range(0, len(order), self.batch_size):
+                batch = order[i:i + self.batch_size]
+                scores[batch] = self.score_batch([query] * len(batch), [passages[j] for j in batch])
+        return scores
+
+    def rerank(self, query: str, chunk_tuples: List[Tuple]) -> List[Tuple]:
+        """
+        chunk_tuples: list of (chunk_text, distance, sourceDoc), best first
+        Returns: list of (chunk_text, distance, sourceDoc, cross_score) sorted by cross_score descending.
+        Chunks past max_candidates are not scored and follow the reranked ones with a score of -inf.
+        """
+        candidates = chunk_tuples[:self.max_candidates]
+        scores = self.score(query, [chunk_text for chunk_text, _, _ in candidates])
+        reranked = [
+            (chunk_text, distance, sourceDoc, float(score))
+            for (chunk_text, distance, sourceDoc), score in zip(candidates, scores)
+        ]
+        reranked.sort(key=lambda x: x[3], reverse=True)
+        return reranked + [(chunk_text, distance, sourceDoc, float("-inf")) for chunk_text, distance, sourceDoc in chunk_tuples[self.max_candidates:]]
+
+
+_rerankers: Dict[tuple, CrossEncoderReranker] = {}
+_rerankers_lock = threading.Lock()
+
+def get_reranker(model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", backend: Optional[str] = None, device: Optional[str] = None, **kwargs) -> CrossEncoderReranker:
+    """
+    One reranker per (model, backend, device) per process, loaded on first use.
+    The backend defaults to the RERANKER_BACKEND environment variable, then to "torch".
+    """
+    backend = backend or os.environ.get("RERANKER_BACKEND", "torch")
+    key = (model_name, backend, device, tuple(sorted(kwargs.items())))
+    with _rerankers_lock:
+        if key not in _rerankers:
+            _rerankers[key] = CrossEncoderReranker(model_name, backend=backend, device=device, **kwargs)
+    return _rerankers[key]
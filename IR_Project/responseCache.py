@@ -0,0 +1,82 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+
+def prompt_key(model: str, messages: List[Dict]) -> str:
+    # the whole prompt (system prompt, retrieved context, question) and the model decide the answer
+    return hashlib.sha256(json.dumps({"model": model, "messages": messages}, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk cache of chat completions for the evaluation scripts, keyed by the hash of (prompt, model).
+    Re-running an evaluation after changing a metric, or resuming one, costs no API calls for prompts already answered.
+    """
+
+    def __init__(self, path: str = "llm_response_cache.sqlite"):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                prompt_hash TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, model: str, messages: List[Dict]) -> Optional[str]:
+        with self.lock:
+            row = self.conn.execute("SELECT response FROM responses WHERE prompt_hash = ?", (prompt_key(model, messages),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, model: str, messages: List[Dict], response: str) -> None:
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (prompt_key(model, messages), model, response, time.time()))
+            self.conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": entries,
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_response_cache() -> ResponseCache:
+    """One cache per process, opened on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+    return _default_cache
+
+def cached_completion(client, messages: List[Dict], model: str = "gpt-4o-mini-2024-07-18", cache: Optional[ResponseCache] = None) -> str:
+    """The chat completion text for messages, from the cache when this exact prompt was answered before."""
+    cache = cache if cache is not None else get_default_response_cache()
+    response = cache.get(model, messages)
+    if response is None:
+        completion = client.chat.completions.create(model=model, messages=messages)
+        response = completion.choices[0].message.content
+        cache.put(model, messages, response)
+    return response
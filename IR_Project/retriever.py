@@ -0,0 +1,101 @@
+import os
+import time
+import pickle
+import faiss
+import numpy as np
+from chunkStore import ChunkStore, chunk_store_path_for
+
+
+class FaissRetriever:
+    """
+    Long-lived retriever: the FAISS index and the chunk metadata are loaded once
+    (at server startup) and every query is then served from memory.
+
+    With mmap=True (the default, when main.py has written the columnar chunk store) the index is opened
+    memory-mapped and chunk text is read lazily from the mapped chunk store, so startup does not grow with the
+    corpus and N server workers share the same page-cache pages. Otherwise everything is loaded into private memory.
+    """
+
+    def __init__(self, index_path="vector_index4.faiss", metadata_path="chunks_metadata4.pkl", mmap=True):
+        self.index_path = index_path
+        self.metadata_path = metadata_path
+        self.chunk_store_path = chunk_store_path_for(metadata_path)
+        self.mmap = mmap and os.path.exists(self.chunk_store_path)
+        self.index = None
+        self.chunk_store = None
+        self.chunk_texts = []
+        self.chunk_sources = None
+        self.row_of_id = None
+        self.load_time = 0.0
+        self.resident_bytes = 0
+        self.mapped_bytes = 0
+        self.load()
+
+    def load(self):
+        start = time.perf_counter()
+
+        if self.mmap:
+            # IO_FLAG_MMAP_IFC maps the vector codes straight from the file instead of copying them (newer faiss only)
+            flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+            self.index = faiss.read_index(self.index_path, flags)
+            self.chunk_store = ChunkStore(self.chunk_store_path)
+            self.load_time = time.perf_counter() - start
+            self.resident_bytes = 0 # everything sizeable lives in shared, file-backed pages
+            self.mapped_bytes = os.path.getsize(self.index_path) + self.chunk_store.nbytes()
+            return
+
+        index = faiss.read_index(self.index_path)
+        with open(self.metadata_path, "rb") as f:
+            metadata = pickle.load(f)
+
+        # plain lists are cheaper to index per query than DataFrame.iloc lookups
+        self.index = index
+        self.chunk_texts = metadata['chunk_text'].tolist()
+        self.chunk_sources = metadata['pdf_files'].tolist() if 'pdf_files' in metadata.columns else None
+        # ID-mapped indexes return content-hash ids rather than row positions
+        self.row_of_id = dict(zip(metadata['embedding_index'].tolist(), range(len(metadata)))) if 'embedding_index' in metadata.columns else None
+
+        self.load_time = time.perf_counter() - start
+        # the serialized size is a close estimate of what a flat index holds in RAM
+        self.resident_bytes = os.path.getsize(self.index_path) + int(metadata.memory_usage(deep=True).sum())
+
+    def stats(self):
+        return {
+            "vectors": self.index.ntotal,
+            "chunks": len(self.chunk_store) if self.chunk_store is not None else len(self.chunk_texts),
+            "mmap": self.mmap,
+            "load_time_s": round(self.load_time, 4),
+            "resident_mb": round(self.resident_bytes / (1024 * 1024), 2),
+            "mapped_mb": round(self.mapped_bytes / (1024 * 1024), 2),
+        }
+
+    def lookup(self, chunk_id):
+        """(chunk_text, source) for a faiss id, or None if the id is unknown."""
+        chunk_id = int(chunk_id)
+        if self.chunk_store is not None:
+            row = self.chunk_store.row_of_id(chunk_id)
+            return (self.chunk_store.text(row), self.chunk_store.source(row)) if row >= 0 else None
+
+        row = self.row_of_id.get(chunk_id, -1) if self.row_of_id is not None else chunk_id
+        if 0 <= row < len(self.chunk_texts):
+            return self.chunk_texts[row], (self.chunk_sources[row] if self.chunk_sources is not None else None)
+        return None
+
+    def search_with_ids(self, query_vector, top_k=7):
+        """Returns a list of (chunk_id, chunk_text, distance, source) for the top_k nearest chunks, chunk_id being the faiss id."""
+        query_vector = np.array(query_vector).reshape(1, -1).astype('float32')
+        distances, indices = self.index.search(query_vector, top_k)
+
+        # Add bounds checking
+        valid_results = []
+        for i, idx in enumerate(indices[0]):
+            chunk = self.lookup(idx)
+            if chunk is not None:
+                valid_results.append((int(idx), chunk[0], distances[0][i], chunk[1]))
+            else:
+                print(f"Warning: Index {idx} is out of bounds")
+        return valid_results
+
+    def search(self, query_vector, top_k=7):
+        """Returns a list of (chunk_text, distance, source) for the top_k nearest chunks."""
+        return [(chunk_text, distance, source) for _, chunk_text, distance, source in self.search_with_ids(query_vector, top_k)]
@@ -0,0 +1,133 @@
+'''
+Local stand-in for the OpenAI API, used to exercise the ingestion pipeline without an API key or quota.
+Embeddings are deterministic pseudo-random vectors seeded by the text, so the same chunk always gets the same vector.
+Chat completions answer with a fixed canned text, streamed token by token (SSE) when the request asks for stream=True.
+
+to run:
+python stubOpenAIServer.py --port 8001 --latency 0.2 --fail_rate 0.1
+then point the pipeline at it, e.g. test_pipeline("./pdfs", "stub-key", base_url="http://localhost:8001/v1"),
+or the servers via OPENAI_BASE_URL=http://localhost:8001/v1 (see loadTestEndpoint.py)
+'''
+import json
+import time
+import random
+import hashlib
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+CANNED_ANSWER = (
+    "Answer: This is a canned response from the stub server. It is long enough to exercise token streaming "
+    "without calling the real API.\n\nCitation:\nSOURCE: stub.pdf"
+)
+
+def fake_embedding(text, dimension):
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    return [rng.uniform(-1, 1) for _ in range(dimension)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # overridden from the command line
+    latency = 0.0
+    fail_rate = 0.0
+    dimension = 1536
+    token_latency = 0.0
+
+    def log_message(self, format, *args):
+        pass  # keep the console quiet under load
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_POST(self):
+        payload = self.read_json()
+        time.sleep(self.latency)
+
+        if random.random() < self.fail_rate:
+            self.send_json(429, {"error": {"message": "Rate limit reached (stub)", "type": "requests", "code": "rate_limit_exceeded"}})
+            return
+
+        if self.path.endswith("/embeddings"):
+            texts = payload["input"] if isinstance(payload["input"], list) else [payload["input"]]
+            self.send_json(200, {
+                "object": "list",
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": fake_embedding(text, self.dimension)}
+                    for i, text in enumerate(texts)
+                ],
+                "model": payload.get("model", "stub"),
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            })
+        elif self.path.endswith("/chat/completions"):
+            if payload.get("stream"):
+                self.stream_completion(payload)
+            else:
+                self.send_json(200, {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": payload.get("model", "stub"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": CANNED_ANSWER}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+        else:
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def stream_completion(self, payload):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def chunk(delta, finish_reason=None):
+            return {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": payload.get("model", "stub"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        # word-sized "tokens", each flushed on its own like the real API does
+        tokens = [token + " " for token in CANNED_ANSWER.split(" ")]
+        events = [chunk({"role": "assistant", "content": ""})] + [chunk({"content": token}) for token in tokens] + [chunk({}, "stop")]
+        for event in events:
+            time.sleep(self.token_latency)
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n") # HTTP/1.0: closing the connection ends the body
+
+
+class StubServer(ThreadingHTTPServer):
+    # the default listen backlog of 5 makes connection bursts wait out 1s SYN retransmits, which would show up as server latency
+    request_queue_size = 256
+    daemon_threads = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds added to every response")
+    parser.add_argument("--fail_rate", type=float, default=0.0, help="fraction of requests answered with HTTP 429")
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--token_latency", type=float, default=0.0, help="seconds between streamed completion tokens")
+    args = parser.parse_args()
+
+    StubHandler.latency = args.latency
+    StubHandler.fail_rate = args.fail_rate
+    StubHandler.dimension = args.dimension
+    StubHandler.token_latency = args.token_latency
+
+    server = StubServer(("localhost", args.port), StubHandler)
+    print(f"Stub OpenAI server listening on http://localhost:{args.port}/v1")
+    server.serve_forever()
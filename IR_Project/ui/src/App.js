@@ -1,7 +1,6 @@
 // App.jsx
 import React, { useState, useRef, useEffect } from "react";
 import "./App.css";
-import axios from "axios";
 import { BrowserRouter } from 'react-router-dom';
 
 const dictionary = {
@@ -22,6 +21,40 @@ const dictionary = {
 };
 
 
+// Splits the model's answer into the text to display and the de-duplicated "SOURCE: <file>" lines
+const splitSources = (responseMessage) => {
+  const lines = responseMessage.match(/^.*\bSOURCE\b.*$/gm) || [];
+  // Remove "SOURCE:" from lines
+  const sources = [
+    ...new Set(lines.map((line) => line.replace(/SOURCE:/, "").trim())),
+  ];
+  const text = responseMessage.replace(/^.*\bSOURCE\b.*\n?/gm, "");
+  return { text, sources };
+};
+
+// Reads a Server-Sent Events response body and calls onEvent(event, data) for every complete event
+const readEventStream = async (response, onEvent) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = "message";
+      let data = "";
+      for (const line of frame.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data += line.slice(5).trim();
+      }
+      if (data) onEvent(event, JSON.parse(data));
+    }
+  }
+};
 
 function App() {
 
@@ -43,6 +76,7 @@ function App() {
   ]);
   const [input, setInput] = useState("");
   const [isLoading, setIsLoading] = useState(false);
+  const [isStreaming, setIsStreaming] = useState(false);
   const messagesEndRef = useRef(null);
   const inputRef = useRef(null);
 
@@ -84,46 +118,55 @@ function App() {
     setInput("");
     setIsLoading(true);
 
+    // the answer is rendered token by token as /respond/stream forwards them
+    const botId = messages.length + 2;
+    const requestStart = performance.now();
+    let firstTokenAt = null;
+    let responseMessage = "";
+
     try {
-      // Await the response from the POST request
-      const response = await axios.post("http://localhost:5000/respond", {
-        message: updatedMessage1,
+      const response = await fetch("http://localhost:5000/respond/stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ message: updatedMessage1 }),
       });
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
 
-      const responseMessage = response.data;
-      console.log(responseMessage);
+      await readEventStream(response, (event, data) => {
+        if (event === "token") {
+          if (firstTokenAt === null) {
+            firstTokenAt = performance.now();
+            setIsStreaming(true);
+            setMessages((prev) => [
+              ...prev,
+              { id: botId, text: "", sender: "bot", timestamp: new Date(), sources: [] },
+            ]);
+          }
+          responseMessage += data.text;
+          const { text, sources } = splitSources(responseMessage);
+          setMessages((prev) =>
+            prev.map((message) => (message.id === botId ? { ...message, text, sources } : message))
+          );
+        } else if (event === "done") {
+          // client-side numbers include the network, server-side ones start when the request arrived
+          console.log(
+            `time to first token: ${firstTokenAt === null ? "-" : Math.round(firstTokenAt - requestStart)} ms (server ${data.ttft_ms} ms), ` +
+              `total: ${Math.round(performance.now() - requestStart)} ms (server ${data.total_ms} ms)`
+          );
+        } else if (event === "error") {
+          console.error("Error while streaming the response:", data.message);
+        }
+      });
 
       setMessage1((prev) => [
         ...prev,
         { role: "system", content: responseMessage },
       ]);
-      const lines = responseMessage.match(/^.*\bSOURCE\b.*$/gm);
-      // Remove "SOURCE:" from lines
-      const cleanedLines = [
-        ...new Set(lines.map((line) => line.replace(/SOURCE:/, "").trim())),
-      ];
-
-      console.log(cleanedLines);
-
-      const cleanedMessage = responseMessage.replace(
-        /^.*\bSOURCE\b.*\n?/gm,
-        ""
-      );
-
-      // Add bot response
-      const botResponse = {
-        id: messages.length + 2,
-        text: cleanedMessage, // Assuming the response has the text as data
-        sender: "bot",
-        timestamp: new Date(),
-        sources: cleanedLines,
-      };
-
-      setMessages((prev) => [...prev, botResponse]);
     } catch (error) {
       console.error("Error sending request:", error);
     } finally {
       setIsLoading(false);
+      setIsStreaming(false);
     }
   };
 
@@ -175,7 +218,7 @@ function App() {
             </div>
           ))}
 
-          {isLoading && (
+          {isLoading && !isStreaming && (
             <div className="message bot-message">
               <div className="message-bubble loading">
                 <div className="typing-indicator">
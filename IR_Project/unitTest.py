@@ -1,24 +1,8 @@
 import re
-import pdfplumber
-import pandas as pd
+from pdfExtraction import extract_contents
 
-def extract_content_from_pdf(pdf_path: str) -> str: # here... could extract bullet points separately from text and tables, and append separately to table
-    full_content = []
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text() or ""
-                if text:
-                    full_content.append(text)
-                tables = page.extract_tables()
-                for table in tables:
-                    if table:
-                        df = pd.DataFrame(table).fillna('').replace(r'^\s*$', '', regex=True) # remove empty strings 
-                        full_content.append(f"\n@TABLE_START:\n{df.to_string(index=False, header=False)}\n@TABLE_END\n") # this will convert the table to a string and remove the index and header. The index is the row number, and the header is the column names. This is done to make the table easier to read.
-    except Exception as e:
-        print(f"Error processing PDF {pdf_path}: {e}")
-        return ""
-    return "\n".join(full_content) # this will join all the text and tables extracted from the pdf into a single string. The tables are formatted as strings with headers and indices removed. 
+def extract_content_from_pdf(pdf_path: str) -> str: # tables are wrapped in @TABLE_START/@TABLE_END so the hybrid chunker keeps them whole
+    return extract_contents([pdf_path], table_format="marked", workers=1)[pdf_path]
 
 
 def mark_bullet_points_and_table(text):